@@ -0,0 +1,58 @@
+"""Latency and throughput of a fixed number of requests in flight against
+an adaptive `ConcurrencyLimiter`, with a service that serves a few
+requests at a time and queues the rest.
+
+```console
+$ python benchmarks/bench_adaptive.py --pieces 2000 --capacity 4 --workers 32
+```
+"""
+
+import argparse
+import time
+
+from bench_suite import RecordingStats, percentile
+from fake_spanglish import FakeSpanglish
+
+from translate_md.client import SpanglishClient
+from translate_md.concurrency import ConcurrencyLimiter
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pieces", type=int, default=2000)
+    parser.add_argument("--capacity", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--target-latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    texts = [f"This is the sentence number {i}." for i in range(args.pieces)]
+    print(
+        f"{args.pieces} pieces, service serving {args.capacity} at a time "
+        f"in {args.latency * 1000:.0f}ms"
+    )
+    print(f"{'':>10} {'pieces/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'limit':>6}")
+    with FakeSpanglish(latency=args.latency, capacity=args.capacity) as server:
+        for name in ("fixed", "adaptive"):
+            limiter = None
+            if name == "adaptive":
+                limiter = ConcurrencyLimiter(
+                    max_limit=args.workers, target_latency=args.target_latency
+                )
+            stats = RecordingStats()
+            with SpanglishClient(
+                server.url, max_workers=args.workers, limiter=limiter, stats=stats
+            ) as client:
+                start = time.perf_counter()
+                client._multi_request("/single", texts)
+                elapsed = time.perf_counter() - start
+                print(
+                    f"{name:>10} {args.pieces / elapsed:>9.0f}"
+                    f" {percentile(stats.latencies, 0.5) * 1000:>8.2f}"
+                    f" {percentile(stats.latencies, 0.99) * 1000:>8.2f}"
+                    f" {client.concurrency_limit:>6}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Throughput of `translate` called from many threads at once, one request
+per call against calls coalesced in batches for `/batched`.
+
+The fake spanglish serves `--capacity` requests at a time and takes the
+same `--latency` for a batch as for a single text, as a model running a
+batch on a GPU roughly does.
+
+```console
+$ python benchmarks/bench_coalesce.py --threads 32 --capacity 4 --latency 0.01
+```
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_suite import percentile
+from fake_spanglish import FakeSpanglish
+
+from translate_md.client import SpanglishClient
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--capacity", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--delays", type=float, nargs="+", default=[0.001, 0.005])
+    args = parser.parse_args()
+
+    texts = [f"Short sentence number {i}." for i in range(args.texts)]
+    print(
+        f"{args.texts} texts from {args.threads} threads, "
+        f"{args.capacity} requests at a time, {args.latency * 1000:.0f}ms each"
+    )
+    header = ("texts/s", "requests", "p50 ms", "p99 ms")
+    print(f"{'coalescing':>12}" + "".join(f"{h:>9}" for h in header))
+    for delay in [None, *args.delays]:
+        latencies: list[float] = []
+
+        with FakeSpanglish(latency=args.latency, capacity=args.capacity) as server:
+            client = SpanglishClient(
+                server.url, max_workers=args.capacity, coalesce_delay=delay
+            )
+
+            def translate(text: str) -> str:
+                start = time.perf_counter()
+                translation = client.translate(text)
+                latencies.append(time.perf_counter() - start)
+                return translation
+
+            with client, ThreadPoolExecutor(args.threads) as executor:
+                start = time.perf_counter()
+                list(executor.map(translate, texts))
+                elapsed = time.perf_counter() - start
+            requests = server.requests
+        name = "off" if delay is None else f"{delay * 1000:g}ms"
+        print(
+            f"{name:>12}{args.texts / elapsed:>9.0f}{requests:>9}"
+            f"{percentile(latencies, 0.5) * 1000:>9.1f}"
+            f"{percentile(latencies, 0.99) * 1000:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Inline tokens classified per second by `MarkdownProcessor.get_pieces`,
+against checking each token with the `is_*` helper functions one by one.
+
+```console
+$ python benchmarks/bench_get_pieces.py --blocks 50000
+```
+"""
+
+import argparse
+import time
+
+from corpus import make_post
+
+import translate_md.markdown as md
+
+
+def helpers_pieces(tokens: list[md.Token]) -> list[str]:
+    """What `get_pieces` did before the classifier."""
+    pieces = []
+    for t in tokens:
+        if t.type == "inline":
+            if any(
+                (
+                    md.is_front_matter(t.content),
+                    md.is_figure(t.content),
+                    md.is_code(t.content),
+                    md.is_comment(t.content),
+                )
+            ):
+                continue
+            pieces.append(t.content)
+    return pieces
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--blocks", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tokens = md.MarkdownProcessor(make_post(args.blocks)).tokens
+    inline = sum(t.type == "inline" for t in tokens)
+    print(f"{inline} inline tokens")
+
+    def best(func) -> float:
+        return min(timeit(func) for _ in range(args.repeat))
+
+    def timeit(func) -> float:
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start
+
+    def classifier_pieces() -> list[str]:
+        mdproc = md.MarkdownProcessor("")
+        mdproc._tokens = tokens
+        return mdproc.get_pieces()
+
+    assert helpers_pieces(tokens) == classifier_pieces()
+    for name, func in (
+        ("helpers", lambda: helpers_pieces(tokens)),
+        ("classifier", classifier_pieces),
+    ):
+        print(f"{name:>12} {inline / best(func):>12,.0f} tokens/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Wall-clock time of `SpanglishClient._multi_request` against the number
+of workers, using a fake spanglish server with a fixed latency.
+
+```console
+$ python benchmarks/bench_multi_request.py --pieces 200 --latency 0.02
+```
+"""
+
+import argparse
+import time
+
+from fake_spanglish import FakeSpanglish
+
+from translate_md.client import SpanglishClient
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pieces", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    texts = [f"This is the paragraph number {i}." for i in range(args.pieces)]
+    with FakeSpanglish(latency=args.latency) as server:
+        print(f"{args.pieces} pieces, {args.latency * 1000:.0f} ms latency")
+        print(f"{'workers':>8} {'seconds':>8} {'speedup':>8}")
+        baseline = None
+        for workers in args.workers:
+            client = SpanglishClient(server.url, max_workers=workers)
+            start = time.perf_counter()
+            client._multi_request("/single", texts)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"{workers:>8} {elapsed:>8.3f} {baseline / elapsed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Time to get the pieces of a document parsing it against loading its
+tokens from a `ParseCache`, and the size of the entries.
+
+```console
+$ python benchmarks/bench_parse_cache.py --blocks 5000
+```
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from corpus import make_post
+
+import translate_md.markdown as md
+from translate_md.parse_cache import ParseCache
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--blocks", type=int, nargs="+", default=[500, 5000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    def best(func) -> float:
+        return min(timeit(func) for _ in range(args.repeat))
+
+    def timeit(func) -> float:
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start
+
+    header = ("parse ms", "cached ms", "speedup", "md KB", "entry KB")
+    print(f"{'blocks':>8}" + "".join(f"{h:>10}" for h in header))
+    for blocks in args.blocks:
+        content = make_post(blocks)
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ParseCache(Path(tmp))
+            expected = md.MarkdownProcessor(content, parse_cache=cache).get_pieces()
+            parsed = best(lambda: md.MarkdownProcessor(content).get_pieces())
+            cached = best(
+                lambda: md.MarkdownProcessor(content, parse_cache=cache).get_pieces()
+            )
+            pieces = md.MarkdownProcessor(content, parse_cache=cache).get_pieces()
+            assert pieces == expected and cache.hits > 0
+            size = cache.size
+        print(
+            f"{blocks:>8}{parsed * 1000:>10.1f}{cached * 1000:>10.1f}"
+            f"{parsed / cached:>10.1f}{len(content.encode()) / 1024:>10.0f}"
+            f"{size / 1024:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
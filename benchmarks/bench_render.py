@@ -0,0 +1,55 @@
+"""Rendering throughput on multi-MB documents: mdformat's default render
+plus removing every backslash (the previous behavior), against `render`
+and `render_to` with the verbatim paragraphs.
+
+```console
+$ python benchmarks/bench_render.py --blocks 40000
+```
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from corpus import make_post
+
+import translate_md.markdown as md
+
+
+def escaped_render(mdproc: md.MarkdownProcessor) -> str:
+    """What `MarkdownProcessor.render` did before the verbatim plugin."""
+    return md.md_renderer.render(mdproc.tokens, {}, {}).replace("\\", "")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--blocks", type=int, default=40_000)
+    args = parser.parse_args()
+
+    content = make_post(args.blocks)
+    mb = len(content.encode("utf-8")) / 1e6
+    mdproc = md.MarkdownProcessor(content)
+    mdproc.update(mdproc.get_pieces())
+    print(f"{mb:.1f} MB document")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "out.md")
+
+        def render_to() -> None:
+            with open(filename, "w") as f:
+                mdproc.render_to(f)
+
+        for name, func in (
+            ("escaped", lambda: escaped_render(mdproc)),
+            ("render", mdproc.render),
+            ("render_to", render_to),
+        ):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            print(f"{name:>10} {elapsed:>7.2f}s {mb / elapsed:>7.2f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
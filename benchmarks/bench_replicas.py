@@ -0,0 +1,58 @@
+"""Throughput with one or several replicas of the service, each serving
+a few requests at a time, and with one of the replicas down.
+
+```console
+$ python benchmarks/bench_replicas.py --pieces 1000 --capacity 2 --latency 0.01
+```
+"""
+
+import argparse
+import socket
+import time
+from contextlib import ExitStack
+
+from fake_spanglish import FakeSpanglish
+
+from translate_md.client import SpanglishClient
+
+
+def dead_url() -> str:
+    """Url of a port where nobody listens."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}/"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pieces", type=int, default=1000)
+    parser.add_argument("--capacity", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--replicas", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    texts = [f"This is the sentence number {i}." for i in range(args.pieces)]
+    print(f"{args.pieces} pieces, {args.capacity} requests at a time per replica")
+    print(f"{'replicas':>14} {'pieces/s':>9}")
+    for n in args.replicas:
+        for down in (False, True):
+            with ExitStack() as stack:
+                urls = [
+                    stack.enter_context(
+                        FakeSpanglish(latency=args.latency, capacity=args.capacity)
+                    ).url
+                    for _ in range(n)
+                ]
+                if down:
+                    urls.append(dead_url())
+                workers = 2 * args.capacity * n
+                with SpanglishClient(urls, max_workers=workers) as client:
+                    start = time.perf_counter()
+                    client._multi_request("/single", texts)
+                    elapsed = time.perf_counter() - start
+            name = f"{n}" + (" + 1 down" if down else "")
+            print(f"{name:>14} {args.pieces / elapsed:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
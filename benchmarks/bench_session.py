@@ -0,0 +1,61 @@
+"""Per-call latency of repeated `SpanglishClient.translate` calls, opening
+a new session for every request (the previous behavior) against reusing
+the client's pooled keep-alive session.
+
+```console
+$ python benchmarks/bench_session.py --calls 500
+```
+"""
+
+import argparse
+import statistics
+import time
+from urllib.parse import urljoin
+
+import requests
+from fake_spanglish import FakeSpanglish
+
+from translate_md.client import SpanglishClient
+
+
+def fresh_session_translate(url: str, text: str) -> str:
+    """What `SpanglishClient._request` did before keeping a session."""
+    with requests.Session() as session:
+        response = session.request("GET", urljoin(url, "/single"), params={"text": text})
+        return response.json()
+
+
+def measure(func, calls: int) -> list[float]:
+    latencies = []
+    for i in range(calls):
+        start = time.perf_counter()
+        func(f"This is the sentence number {i}.")
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(name: str, latencies: list[float]) -> None:
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"{name:>16} {p50:>8.3f} {p99:>8.3f} {sum(latencies):>8.3f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=500)
+    args = parser.parse_args()
+
+    with FakeSpanglish() as server:
+        print(f"{args.calls} calls to translate")
+        print(f"{'':>16} {'p50 ms':>8} {'p99 ms':>8} {'total s':>8}")
+        report(
+            "fresh session",
+            measure(lambda t: fresh_session_translate(server.url, t), args.calls),
+        )
+        with SpanglishClient(server.url) as client:
+            report("pooled session", measure(client.translate, args.calls))
+
+
+if __name__ == "__main__":
+    main()
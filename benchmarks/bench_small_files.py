@@ -0,0 +1,54 @@
+"""Per document overhead of processing many short posts, building a new
+parser and renderer per document (the previous behavior) against sharing
+them through a `ProcessorFactory`.
+
+```console
+$ python benchmarks/bench_small_files.py --files 2000 --blocks 10
+```
+"""
+
+import argparse
+import time
+from typing import Callable
+
+from corpus import make_post
+from markdown_it import MarkdownIt
+from mdformat.renderer import MDRenderer
+
+import translate_md.markdown as md
+
+
+def process(new_processor: Callable[[str], md.MarkdownProcessor], posts: list[str]) -> None:
+    for post in posts:
+        mdproc = new_processor(post)
+        mdproc.update(mdproc.get_pieces())
+        mdproc.render()
+
+
+def fresh_processor(content: str) -> md.MarkdownProcessor:
+    return md.MarkdownProcessor(content, parser=MarkdownIt("zero"), renderer=MDRenderer())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--blocks", type=int, default=10)
+    args = parser.parse_args()
+
+    posts = [make_post(args.blocks, seed=i) for i in range(args.files)]
+    print(f"{args.files} posts of {args.blocks} blocks")
+    print(f"{'':>10} {'us/doc':>8} {'docs/s':>8}")
+    for name, new_processor in (
+        ("fresh", fresh_processor),
+        ("shared", md.ProcessorFactory()),
+    ):
+        start = time.perf_counter()
+        process(new_processor, posts)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name:>10} {elapsed / args.files * 1e6:>8.0f} {args.files / elapsed:>8.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""Throughput of `translate_file`, `translate_batch` and the CLI against a
+fake spanglish, over synthetic corpora of several sizes.
+
+Each scenario runs in a process of its own, so the peak RSS reported is
+the one of the scenario alone (for the CLI, the one of the CLI process).
+The latency percentiles are those of the requests to the service, as
+measured by the client; the ones of the CLI come from its `--stats`
+histogram, so they are the upper bound of a bucket.
+
+```console
+$ python benchmarks/bench_suite.py --output results.json
+$ python benchmarks/bench_suite.py --latency 0.01 --failure-rate 0.01
+$ python benchmarks/bench_suite.py --compare baseline.json
+```
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from corpus import write_corpus
+from fake_spanglish import FakeSpanglish
+
+import translate_md.markdown as md
+from translate_md.client import SpanglishClient
+from translate_md.stats import Stats
+
+# Number of files and blocks per file of each corpus.
+CORPORA = {
+    "small": (50, 10),
+    "medium": (200, 40),
+    "large": (10, 1000),
+}
+SCENARIOS = ("translate_file", "translate_batch", "cli")
+# Metrics compared against the baseline, and whether higher is better.
+COMPARED = {"files_per_s": True, "pieces_per_s": True, "p99_ms": False, "peak_rss_mb": False}
+
+
+class RecordingStats(Stats):
+    """Stats keeping every latency, to compute exact percentiles."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.latencies: list[float] = []
+
+    def observe_request(self, seconds: float, sent: int, received: int) -> None:
+        super().observe_request(seconds, sent, received)
+        self.latencies.append(seconds)
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def peak_rss_mb(who: int = resource.RUSAGE_SELF) -> float:
+    return resource.getrusage(who).ru_maxrss / 1024  # KiB on linux
+
+
+def new_client(url: str, stats: Stats, workers: int) -> SpanglishClient:
+    return SpanglishClient(url, max_workers=workers, backoff_factor=0.01, stats=stats)
+
+
+def bench_translate_file(url: str, files: list[Path], workers: int) -> dict[str, Any]:
+    stats = RecordingStats()
+    errors = 0
+    with new_client(url, stats, workers) as client:
+        start = time.perf_counter()
+        for filename in files:
+            try:
+                client.translate_file(filename)
+            except ValueError:
+                errors += 1
+        seconds = time.perf_counter() - start
+    return {
+        "seconds": seconds,
+        "pieces": stats.pieces.sum,
+        "errors": errors,
+        "p50_ms": percentile(stats.latencies, 0.5) * 1000,
+        "p99_ms": percentile(stats.latencies, 0.99) * 1000,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def bench_translate_batch(url: str, files: list[Path], workers: int) -> dict[str, Any]:
+    stats = RecordingStats()
+    documents = [md.MarkdownProcessor(md.read_file(f)).get_pieces() for f in files]
+    errors = 0
+    with new_client(url, stats, workers) as client:
+        start = time.perf_counter()
+        for pieces in documents:
+            try:
+                client.translate_batch(pieces)
+            except ValueError:
+                errors += 1
+        seconds = time.perf_counter() - start
+    return {
+        "seconds": seconds,
+        "pieces": sum(len(p) for p in documents),
+        "errors": errors,
+        "p50_ms": percentile(stats.latencies, 0.5) * 1000,
+        "p99_ms": percentile(stats.latencies, 0.99) * 1000,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def bench_cli(url: str, files: list[Path], workers: int) -> dict[str, Any]:
+    command = [
+        sys.executable,
+        "-m",
+        "translate_md.main",
+        str(files[0].parent),
+        f"--url={url}",
+        f"--workers={workers}",
+        "--stats",
+        "--stats-format=json",
+    ]
+    start = time.perf_counter()
+    proc = subprocess.run(command, capture_output=True, text=True)
+    seconds = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"the CLI failed:\n{proc.stderr}")
+    stats = json.loads(proc.stdout.splitlines()[-1])
+    latency = Stats().latency
+    latency.counts = list(_bucket_counts(stats["latency_seconds"]["buckets"]))
+    latency.count = stats["latency_seconds"]["count"]
+    return {
+        "seconds": seconds,
+        "pieces": stats["pieces_per_file"]["sum"],
+        "errors": 0,
+        "p50_ms": latency.quantile(0.5) * 1000,
+        "p99_ms": latency.quantile(0.99) * 1000,
+        "peak_rss_mb": peak_rss_mb(resource.RUSAGE_CHILDREN),
+    }
+
+
+def _bucket_counts(cumulative: dict[str, int]):
+    previous = 0
+    for count in cumulative.values():
+        yield count - previous
+        previous = count
+
+
+BENCHMARKS = {
+    "translate_file": bench_translate_file,
+    "translate_batch": bench_translate_batch,
+    "cli": bench_cli,
+}
+
+
+def run_scenario(
+    scenario: str, corpus: str, latency: float, failure_rate: float, workers: int
+) -> dict[str, Any]:
+    """Run a scenario in this process, over a corpus written to a temporary
+    directory, against a fake spanglish running in a thread."""
+    n_files, n_blocks = CORPORA[corpus]
+    with tempfile.TemporaryDirectory() as tmp:
+        files = write_corpus(Path(tmp), n_files, n_blocks)
+        with FakeSpanglish(latency=latency, failure_rate=failure_rate) as server:
+            result = BENCHMARKS[scenario](server.url, files, workers)
+            result["requests"] = server.requests
+            result["failures"] = server.failures
+    result.update(
+        scenario=scenario,
+        corpus=corpus,
+        files=n_files,
+        files_per_s=n_files / result["seconds"],
+        pieces_per_s=result["pieces"] / result["seconds"],
+    )
+    return result
+
+
+def run_isolated(scenario: str, corpus: str, args: argparse.Namespace) -> dict[str, Any]:
+    """Run a scenario in a new process and return its result."""
+    command = [
+        sys.executable,
+        __file__,
+        f"--run={scenario}:{corpus}",
+        f"--latency={args.latency}",
+        f"--failure-rate={args.failure_rate}",
+        f"--workers={args.workers}",
+    ]
+    proc = subprocess.run(command, capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout)
+
+
+def print_results(results: list[dict[str, Any]]) -> None:
+    header = ("scenario", "corpus", "files/s", "pieces/s", "p50 ms", "p99 ms", "RSS MB")
+    print(f"{header[0]:>16} {header[1]:>7}" + "".join(f"{h:>10}" for h in header[2:]))
+    for r in results:
+        print(
+            f"{r['scenario']:>16} {r['corpus']:>7} {r['files_per_s']:>10.1f}"
+            f"{r['pieces_per_s']:>10.0f}{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+            f"{r['peak_rss_mb']:>10.1f}"
+            + (f"  ({r['errors']} files failed)" if r["errors"] else "")
+        )
+
+
+def compare(
+    results: list[dict[str, Any]], baseline: list[dict[str, Any]], tolerance: float
+) -> list[str]:
+    """Print the change of each metric against the baseline.
+
+    Returns:
+        list[str]: Metrics that got worse by more than `tolerance`.
+    """
+    previous = {(r["scenario"], r["corpus"]): r for r in baseline}
+    regressions = []
+    print(f"\nchange against the baseline (tolerance {tolerance:.0%}):")
+    for r in results:
+        base = previous.get((r["scenario"], r["corpus"]))
+        if base is None:
+            continue
+        changes = []
+        for metric, higher_is_better in COMPARED.items():
+            if not base[metric]:
+                continue
+            change = r[metric] / base[metric] - 1
+            changes.append(f"{metric} {change:+.1%}")
+            worse = -change if higher_is_better else change
+            if worse > tolerance:
+                regressions.append(f"{r['scenario']}/{r['corpus']} {metric}")
+        print(f"{r['scenario']:>16} {r['corpus']:>7}  " + ", ".join(changes))
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--corpora", nargs="+", choices=CORPORA, default=list(CORPORA))
+    parser.add_argument("--latency", type=float, default=0.002)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--output", type=Path, help="Write the results as json.")
+    parser.add_argument("--compare", type=Path, help="Results of a previous run.")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run:
+        scenario, corpus = args.run.split(":")
+        result = run_scenario(
+            scenario, corpus, args.latency, args.failure_rate, args.workers
+        )
+        print(json.dumps(result))
+        return 0
+
+    print(
+        f"latency {args.latency * 1000:.1f}ms, failure rate {args.failure_rate:.1%}, "
+        f"{args.workers} workers"
+    )
+    results = [
+        run_isolated(scenario, corpus, args)
+        for corpus in args.corpora
+        for scenario in args.scenarios
+    ]
+    print_results(results)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(results, indent=2))
+    if args.compare:
+        if not args.compare.is_file():
+            print(f"\nno baseline at {args.compare}, nothing to compare")
+            return 0
+        regressions = compare(results, json.loads(args.compare.read_text()), args.tolerance)
+        if regressions:
+            print("\nregressions: " + ", ".join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""Bytes on the wire and latency of the `/batched` payloads sent as GET
+query parameters, POSTed as json and POSTed compressed, for large documents.
+
+Each document is sent whole in a single request (`translate_batch`) and
+packed in batches of `--batch-chars` characters. A last row POSTs to a
+service without POST support, to show the cost of falling back to GET.
+
+```console
+$ python benchmarks/bench_transport.py --blocks 200 1000 5000 --latency 0.005
+```
+"""
+
+import argparse
+import time
+
+from corpus import make_post
+from fake_spanglish import FakeSpanglish
+
+import translate_md.markdown as md
+from translate_md.client import SpanglishClient
+from translate_md.stats import Stats
+from translate_md.transport import Transport, zstandard
+
+REPEAT = 5
+
+
+def transports() -> dict[str, object]:
+    """Transports to compare, None is the default GET."""
+    options = {"GET": None, "POST": "", "POST gzip": "gzip"}
+    if zstandard is not None:
+        options["POST zstd"] = "zstd"
+    return options
+
+
+def bench(
+    url: str, pieces: list[str], compression, batch_chars
+) -> tuple[float, float, int]:
+    """Send the pieces REPEAT times.
+
+    Returns:
+        tuple[float, float, int]: Mean seconds per document and per request,
+            and bytes sent per document. The bytes are -1 if it failed.
+    """
+    stats = Stats()
+    transport = None if compression is None else Transport(compression or None)
+    client = SpanglishClient(
+        url, max_workers=4, batch_chars=batch_chars, stats=stats, transport=transport
+    )
+    with client:
+        start = time.perf_counter()
+        try:
+            for _ in range(REPEAT):
+                client.translate_batch(pieces)
+        except ValueError:
+            return 0.0, 0.0, -1
+        seconds = time.perf_counter() - start
+    latency = stats.latency.sum / stats.requests
+    return seconds / REPEAT, latency, stats.bytes_sent // REPEAT
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--blocks", type=int, nargs="+", default=[200, 1000, 5000])
+    parser.add_argument("--batch-chars", type=int, default=20_000)
+    parser.add_argument("--latency", type=float, default=0.005)
+    args = parser.parse_args()
+
+    header = f"{'document':>22} {'transport':>10}" + "".join(
+        f"{h:>9}" for h in ("KB sent", "ms/doc", "ms/req")
+    )
+    for blocks in args.blocks:
+        pieces = md.MarkdownProcessor(make_post(blocks)).get_pieces()
+        chars = sum(len(p) for p in pieces)
+        print(f"\n{blocks} blocks, {len(pieces)} pieces, {chars / 1024:.0f} KB of text")
+        print(header)
+        for batch_chars in (None, args.batch_chars):
+            layout = "whole" if batch_chars is None else f"batches of {batch_chars}"
+            with FakeSpanglish(latency=args.latency) as server:
+                for name, compression in transports().items():
+                    doc, req, sent = bench(server.url, pieces, compression, batch_chars)
+                    if sent < 0:
+                        print(f"{layout:>22} {name:>10}   (failed, payload too large)")
+                        continue
+                    print(
+                        f"{layout:>22} {name:>10} {sent / 1024:>9.1f}"
+                        f"{doc * 1000:>9.1f}{req * 1000:>9.2f}"
+                    )
+        with FakeSpanglish(latency=args.latency, post=False) as server:
+            doc, req, sent = bench(server.url, pieces, "gzip", args.batch_chars)
+            name = "fallback"
+            print(
+                f"{'no POST support':>22} {name:>10} {sent / 1024:>9.1f}"
+                f"{doc * 1000:>9.1f}{req * 1000:>9.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
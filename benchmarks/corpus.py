@@ -0,0 +1,38 @@
+"""Synthetic hugo posts to benchmark the markdown processing. """
+
+import random
+from pathlib import Path
+
+PARAGRAPH = (
+    "This is the paragraph number {i} of the post, with some `inline code`, a "
+    "[link](https://example.com/{i}) and enough words to look like a real one."
+)
+BLOCKS = [
+    "## Section {i}",
+    PARAGRAPH,
+    PARAGRAPH,
+    "![figure {i}](/images/figure-{i}.png)",
+    "```python\nprint({i})\n```",
+    "<!-- comment {i} -->",
+    "- item {i}\n- another item",
+]
+FRONT_MATTER = '---\ntitle: "Post {n}"\ndate: 2023-03-10\ndraft: false\n---'
+
+
+def make_post(n_blocks: int, seed: int = 0) -> str:
+    """A markdown post with front matter and `n_blocks` random blocks."""
+    rng = random.Random(seed)
+    blocks = [FRONT_MATTER.format(n=seed)]
+    blocks += [rng.choice(BLOCKS).format(i=i) for i in range(n_blocks)]
+    return "\n\n".join(blocks) + "\n"
+
+
+def write_corpus(directory: Path, n_files: int, n_blocks: int) -> list[Path]:
+    """Write `n_files` posts of `n_blocks` blocks in a directory."""
+    directory.mkdir(parents=True, exist_ok=True)
+    files = []
+    for i in range(n_files):
+        filename = directory / f"post-{i:05d}.md"
+        filename.write_text(make_post(n_blocks, seed=i))
+        files.append(filename)
+    return files
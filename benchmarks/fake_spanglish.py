@@ -0,0 +1,216 @@
+"""Local stand-in for the spanglish service, for benchmarking purposes.
+
+It exposes the same endpoints as spanglish (`/single` and `/batched`),
+but instead of running a model it waits for a fixed latency and returns
+the text prefixed with `es: `. A fraction of the requests can be made to
+fail with a 503, as an overloaded service would. `/batched` also accepts
+its parameters POSTed as json, plain or compressed with gzip (or zstd,
+if zstandard is installed), unless started with `--no-post`.
+
+Run it standalone with:
+
+```console
+$ python benchmarks/fake_spanglish.py --port 8000 --latency 0.05 --failure-rate 0.01
+```
+"""
+
+import argparse
+import gzip
+import json
+import random
+import threading
+import time
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DECODERS = {"identity": lambda body: body, "gzip": gzip.decompress}
+if zstandard is not None:
+    DECODERS["zstd"] = lambda body: zstandard.ZstdDecompressor().decompress(body)
+
+
+def fake_translation(text: str) -> str:
+    return f"es: {text}"
+
+
+class FakeSpanglishHandler(BaseHTTPRequestHandler):
+    # Keep-alive, as uvicorn does.
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        self._answer(url.path, params)
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        server = self.server
+        server.count_received(len(body))  # type: ignore[attr-defined]
+        if not server.post or urlparse(self.path).path != "/batched":  # type: ignore
+            self.send_error(405)
+            return
+        decode = DECODERS.get(self.headers.get("Content-Encoding", "identity"))
+        if decode is None:
+            self.send_error(415)
+            return
+        self._answer("/batched", json.loads(decode(body)))
+
+    def _answer(self, path: str, params: dict[str, str]) -> None:
+        server = self.server
+        with server.slots:  # type: ignore[attr-defined]
+            time.sleep(server.latency)  # type: ignore[attr-defined]
+        if server.should_fail():  # type: ignore[attr-defined]
+            self.send_error(503)
+        elif path == "/single":
+            self._send_json(fake_translation(params.get("text", "")))
+        elif path == "/batched":
+            texts = json.loads(params.get("texts", "[]"))
+            # spanglish returns the json encoded list as a string.
+            self._send_json(json.dumps([fake_translation(t) for t in texts]))
+        else:
+            self.send_error(404)
+
+    def _send_json(self, content: object) -> None:
+        body = json.dumps(content).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+class FakeSpanglishServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        latency: float,
+        failure_rate: float,
+        seed: int,
+        capacity: Optional[int],
+        post: bool,
+    ) -> None:
+        super().__init__(address, FakeSpanglishHandler)
+        self.latency = latency
+        self.post = post
+        # A model serves a few requests at once, the rest wait in a queue.
+        self.slots = threading.Semaphore(capacity) if capacity else nullcontext()
+        self.failure_rate = failure_rate
+        self.requests = 0
+        self.failures = 0
+        self.bytes_received = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def count_received(self, n_bytes: int) -> None:
+        with self._lock:
+            self.bytes_received += n_bytes
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            fail = self._rng.random() < self.failure_rate
+            self.failures += fail
+            return fail
+
+
+class FakeSpanglish:
+    """Fake spanglish server running on a background thread.
+
+    Args:
+        latency (float, optional):
+            Seconds to wait before answering each request. Defaults to 0.
+        port (int, optional):
+            Port to bind to. Defaults to 0, a free port chosen by the OS.
+        failure_rate (float, optional):
+            Fraction of the requests answered with a 503. Defaults to 0.
+        seed (int, optional):
+            Seed of the failures, for repeatable runs. Defaults to 0.
+        capacity (Optional[int], optional):
+            Requests served at the same time, the rest wait their turn
+            so their latency grows. Defaults to None, no limit.
+        post (bool, optional):
+            Accept the parameters of `/batched` POSTed as json, otherwise
+            POST is answered with a 405. Defaults to True.
+
+    Examples:
+        ```python
+        >>> with FakeSpanglish(latency=0.01) as server:
+        ...     client = SpanglishClient(server.url)
+        ```
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        port: int = 0,
+        failure_rate: float = 0.0,
+        seed: int = 0,
+        capacity: Optional[int] = None,
+        post: bool = True,
+    ) -> None:
+        self._server = FakeSpanglishServer(
+            ("127.0.0.1", port), latency, failure_rate, seed, capacity, post
+        )
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    @property
+    def requests(self) -> int:
+        """Requests received, including the failed ones."""
+        return self._server.requests
+
+    @property
+    def failures(self) -> int:
+        """Requests answered with a 503."""
+        return self._server.failures
+
+    @property
+    def bytes_received(self) -> int:
+        """Bytes of the bodies POSTed."""
+        return self._server.bytes_received
+
+    def __enter__(self) -> "FakeSpanglish":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--capacity", type=int, default=None)
+    parser.add_argument("--no-post", dest="post", action="store_false")
+    args = parser.parse_args()
+    with FakeSpanglish(
+        latency=args.latency,
+        port=args.port,
+        failure_rate=args.failure_rate,
+        capacity=args.capacity,
+        post=args.post,
+    ) as server:
+        print(f"fake spanglish listening at {server.url}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
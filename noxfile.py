@@ -59,3 +59,20 @@ def build(session):
 def publish(session):
     session.notify("build")
     session.run("hatch", "publish")
+
+
+@nox.session
+def benchmark(session):
+    """Run the benchmark suite and compare it against the saved baseline.
+
+    Save the current results as the new baseline with:
+    `nox -s benchmark -- --output benchmarks/baseline.json`
+    """
+    install(session, cli=True)
+    session.run(
+        "python",
+        "benchmarks/bench_suite.py",
+        "--compare",
+        "benchmarks/baseline.json",
+        *session.posargs,
+    )
@@ -0,0 +1,202 @@
+"""Asyncio client for spanglish.
+
+Requires [httpx](https://www.python-httpx.org/), install it with
+`pip install translate_md[async]`.
+"""
+
+import asyncio
+import json
+from pathlib import Path
+from typing import Any, Optional
+from urllib.parse import urljoin
+
+import translate_md.markdown as md
+from translate_md.client import SPANGLISH_URL, TranslationError, translated_filename
+from translate_md.logger import get_logger
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None  # type: ignore
+
+
+logger = get_logger("async_client")
+
+
+def _read_pieces(filename: Path) -> tuple[md.MarkdownProcessor, list[str]]:
+    mdproc = md.MarkdownProcessor(md.read_file(filename))
+    return mdproc, mdproc.get_pieces()
+
+
+def _write_translation(
+    mdproc: md.MarkdownProcessor, translations: list[str], new_filename: Path
+) -> None:
+    mdproc.update(translations)
+    mdproc.write_to(new_filename)
+
+
+class AsyncSpanglishClient:
+    r"""Asyncio counterpart of [`SpanglishClient`][translate_md.client.SpanglishClient].
+
+    All the requests share a single pooled HTTP connection, created the first
+    time it's needed, and a semaphore limits the requests in flight, so many
+    files can be translated at once without spawning a thread per request.
+
+    Args:
+        url (str, optional):
+            URL where the service is exposed. Defaults to SPANGLISH_URL.
+        max_concurrency (int, optional):
+            Maximum number of requests in flight. Defaults to 4.
+        timeout (float, optional):
+            Seconds to wait for each response. Defaults to 60.
+
+    Examples:
+        ```python
+        >>> async with AsyncSpanglishClient() as client:
+        ...     await client.translate("hello world")
+        'hola mundo'
+        ```
+    """
+
+    def __init__(
+        self,
+        url: str = SPANGLISH_URL,
+        max_concurrency: int = 4,
+        timeout: float = 60.0,
+    ) -> None:
+        if httpx is None:  # pragma: no cover
+            raise ImportError(
+                "AsyncSpanglishClient requires httpx: "
+                "pip install translate_md[async]"
+            )
+        if max_concurrency < 1:
+            raise ValueError(
+                f"max_concurrency must be a positive integer: {max_concurrency}"
+            )
+        self._spanglish_url = url
+        self._max_concurrency = max_concurrency
+        self._timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def translate(self, text: str) -> str:
+        """Translate a piece of text from english to spanish.
+
+        Args:
+            text (str): string to translate.
+
+        Returns:
+            str: translated text
+        """
+        return await self._request("/single", payload={"text": text})
+
+    async def translate_batch(self, texts: list[str]) -> list[str]:
+        """Translates a batch of texts through the `/batched` endpoint.
+
+        Args:
+            texts (list[str]): Texts to translate
+
+        Returns:
+            list[str]: list of texts translated.
+        """
+        result = await self._request("/batched", payload={"texts": json.dumps(texts)})
+
+        try:
+            return json.loads(result)
+        except json.decoder.JSONDecodeError as e:
+            raise ValueError(f"Couldn't load the json encoded list: {result}") from e
+
+    async def translate_file(
+        self, filename: Path, new_filename: Optional[Path] = None
+    ) -> None:
+        """Translate a markdown file and write the new document to disk.
+
+        The pieces of the file are sent concurrently, bounded by the
+        client's `max_concurrency`, which is shared among all the files
+        being translated at the same time. Reading, parsing and writing
+        the file run in a thread, so they don't block the event loop.
+
+        Args:
+            filename (Path): Path to the markdown file.
+            new_filename (Optional[Path], optional):
+                Filename for the new markdown file to be generated.
+                Defaults to None, in which case it is generated
+                internally.
+        """
+        logger.info(f"reading file: {filename}")
+        mdproc, pieces = await asyncio.to_thread(_read_pieces, filename)
+        translated_text = await self._multi_request("/single", pieces)
+        if new_filename is None:
+            new_filename = translated_filename(filename)
+        await asyncio.to_thread(
+            _write_translation, mdproc, translated_text, new_filename
+        )
+        logger.info(f"file written at: {new_filename}")
+
+    async def aclose(self) -> None:
+        """Close the underlying HTTP connection pool."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self) -> "AsyncSpanglishClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"({self._spanglish_url})"
+
+    def _get_client(self) -> "httpx.AsyncClient":
+        if self._client is None:
+            limits = httpx.Limits(max_connections=self._max_concurrency)
+            self._client = httpx.AsyncClient(limits=limits, timeout=self._timeout)
+        return self._client
+
+    async def _request(self, endpoint: str, payload: dict[str, str]) -> Any:
+        """Internal method to deal with the requests.
+
+        Args:
+            endpoint (str): Endpoint of the app (`/single` or `/batched`)
+            payload (str): The parameter values of the endpoint.
+
+        Returns:
+            str: API response.
+
+        Raises:
+            ValueError: If the service answered with an error, or the
+                response isn't json.
+        """
+        url = urljoin(self._spanglish_url, endpoint)
+        async with self._semaphore:
+            response = await self._get_client().get(url, params=payload)
+        if response.is_error:
+            logger.error(f"the service answered {response.status_code}")
+            raise ValueError(f"the service answered {response.status_code}")
+        try:
+            return response.json()
+        except Exception as exc:
+            logger.error("Error parsing a request to json")
+            raise ValueError("Unexpected error on the response") from exc
+
+    async def _multi_request(self, endpoint: str, texts: list[str]) -> list[str]:
+        """Send one request per text concurrently, keeping the order.
+
+        Raises:
+            TranslationError: If any of the pieces fails, with the index
+                of the piece.
+        """
+
+        async def fetch(i: int, text: str) -> str:
+            try:
+                return await self._request(endpoint, payload={"text": text})
+            except Exception as exc:
+                raise TranslationError(i, "Unexpected error on the response") from exc
+
+        tasks = [asyncio.ensure_future(fetch(i, t)) for i, t in enumerate(texts)]
+        try:
+            return list(await asyncio.gather(*tasks))
+        finally:
+            for task in tasks:
+                task.cancel()
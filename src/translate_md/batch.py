@@ -0,0 +1,282 @@
+"""Translation of many markdown files at once.
+
+Parsing and rendering run in a pool of processes, while the pieces of the
+files already parsed are being translated, so the CPU bound work overlaps
+with the requests to the service.
+
+Examples:
+    ```python
+    >>> from translate_md.batch import BatchTranslator
+    >>> with SpanglishClient(max_workers=8) as client:
+    ...     result = BatchTranslator(client).run([Path("content/posts")])
+    >>> result
+    BatchResult(files=120, skipped=3, failed=0, pieces=2410, unique_pieces=1830, ...)
+    ```
+"""
+
+import glob
+import os
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable, Iterable, Optional
+
+import translate_md.markdown as md
+from translate_md.client import SpanglishClient, translated_filename
+from translate_md.dedup import Deduplicator
+from translate_md.logger import get_logger
+from translate_md.manifest import manifest_filename
+from translate_md.masking import Masker
+from translate_md.parse_cache import ParseCache
+from translate_md.stats import timed_call
+
+logger = get_logger("batch")
+
+ProgressCallback = Callable[[Path, int], None]
+
+
+def collect_files(paths: Iterable[Path], suffix: str = ".md") -> list[Path]:
+    """Expand the paths given into the markdown files to translate.
+
+    Directories are searched recursively for files ending in `suffix`, and
+    paths containing wildcards are expanded as (recursive) globs. Files
+    already translated (`*.es.md`) are left out of the directories and globs.
+
+    Args:
+        paths (Iterable[Path]): Files, directories or glob patterns.
+        suffix (str, optional): Suffix of the markdown files. Defaults to ".md".
+
+    Returns:
+        list[Path]: Sorted files, without duplicates.
+    """
+    files: set[Path] = set()
+    for path in paths:
+        if path.is_dir():
+            candidates = list(path.rglob(f"*{suffix}"))
+        elif glob.has_magic(str(path)):
+            candidates = [Path(p) for p in glob.glob(str(path), recursive=True)]
+        else:
+            files.add(path)
+            continue
+        files.update(
+            p for p in candidates if p.is_file() and not p.name.endswith(f".es{suffix}")
+        )
+    return sorted(files)
+
+
+def is_up_to_date(filename: Path, new_filename: Path) -> bool:
+    """Check if the translated file is newer than the original one."""
+    try:
+        return new_filename.stat().st_mtime >= filename.stat().st_mtime
+    except FileNotFoundError:
+        return False
+
+
+def extract_pieces(
+    filename: Path,
+    masker: Optional[Masker] = None,
+    parse_cache: Optional[ParseCache] = None,
+) -> tuple[list[str], int]:
+    """Read and parse a file, returning its pieces and their number of
+    characters before masking. Runs in the workers."""
+    mdproc = md.MarkdownProcessor(
+        md.read_file(filename), masker=masker, parse_cache=parse_cache
+    )
+    return mdproc.get_pieces(), mdproc.original_chars
+
+
+def render_file(
+    filename: Path,
+    translations: list[str],
+    new_filename: Path,
+    masker: Optional[Masker] = None,
+    parse_cache: Optional[ParseCache] = None,
+) -> None:
+    """Parse a file again, update it with the translations and write it.
+
+    Runs in the workers, the tokens aren't sent back and forth between
+    processes as they are more expensive to pickle than to parse again.
+    With a parse cache, the tokens stored by `extract_pieces` are loaded.
+    """
+    mdproc = md.MarkdownProcessor(
+        md.read_file(filename), masker=masker, parse_cache=parse_cache
+    )
+    mdproc.get_pieces()
+    mdproc.update(translations)
+    mdproc.write_to(new_filename)
+
+
+@dataclass
+class BatchResult:
+    """Summary of a batch run.
+
+    Attributes:
+        files (int): Number of files translated.
+        skipped (int): Number of files whose translation was up to date.
+        failed (int): Number of files that couldn't be translated.
+        pieces (int): Number of pieces translated.
+        unique_pieces (int): Number of those pieces sent to translate,
+            the rest were duplicates within or across files.
+        seconds (float): Wall time of the run.
+    """
+
+    files: int = 0
+    skipped: int = 0
+    failed: int = 0
+    pieces: int = 0
+    unique_pieces: int = 0
+    seconds: float = 0.0
+
+
+class BatchTranslator:
+    """Translates many markdown files reusing a single client.
+
+    Args:
+        client (SpanglishClient): Client used to translate the pieces.
+        processes (Optional[int], optional):
+            Number of processes to parse and render the files. Defaults to
+            None, as many as CPUs. With 1 everything runs in this process.
+        max_files (int, optional):
+            Files whose pieces are being translated at the same time.
+            Defaults to 4.
+        force (bool, optional):
+            Translate the files even if their translation is up to date.
+            Defaults to False.
+        incremental (bool, optional):
+            Translate only the edited pieces of each file, see
+            `SpanglishClient.translate_file`. Defaults to False.
+    """
+
+    def __init__(
+        self,
+        client: SpanglishClient,
+        processes: Optional[int] = None,
+        max_files: int = 4,
+        force: bool = False,
+        incremental: bool = False,
+    ) -> None:
+        self._client = client
+        self._processes = processes or os.cpu_count() or 1
+        self._max_files = max_files
+        self._force = force
+        self._incremental = incremental
+
+    def pending(self, paths: Iterable[Path]) -> tuple[list[Path], int]:
+        """Files that need to be translated.
+
+        Args:
+            paths (Iterable[Path]): Files, directories or glob patterns.
+
+        Returns:
+            tuple[list[Path], int]: The files and the number of files skipped.
+        """
+        files = collect_files(paths)
+        if self._force:
+            return files, 0
+        pending = [f for f in files if not is_up_to_date(f, translated_filename(f))]
+        return pending, len(files) - len(pending)
+
+    def run(
+        self,
+        paths: Iterable[Path],
+        progress: Optional[ProgressCallback] = None,
+    ) -> BatchResult:
+        """Translate the files, writing each one next to the original.
+
+        Args:
+            paths (Iterable[Path]): Files, directories or glob patterns.
+            progress (Optional[ProgressCallback], optional):
+                Called with each file written and its number of pieces.
+
+        Returns:
+            BatchResult: Summary of the run. The files that fail are logged
+                and counted, but don't stop the rest.
+
+        The time spent per file in each stage (extract: read, parse and get
+        the pieces; translate; render) is added to the stats of the client.
+        """
+        start = perf_counter()
+        files, skipped = self.pending(paths)
+        result = BatchResult(skipped=skipped)
+        logger.info(f"translating {len(files)} files, {skipped} up to date")
+        if not files:
+            return result
+
+        dedup = Deduplicator()
+        stats = self._client.stats
+        masker = self._client.masker
+        parse_cache = self._client.parse_cache
+        processes = min(self._processes, len(files))
+        pool: Executor = (
+            ProcessPoolExecutor(processes) if processes > 1 else ThreadPoolExecutor(1)
+        )
+        with pool, ThreadPoolExecutor(self._max_files) as network:
+            # Each future is tagged with its stage, the file and its pieces.
+            extract = partial(timed_call, extract_pieces)
+            jobs: dict[Future[Any], tuple[str, Path, int]] = {
+                pool.submit(extract, f, masker, parse_cache): ("extract", f, 0)
+                for f in files
+            }
+            job: Future[Any]
+            while jobs:
+                done, _ = wait(jobs, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, filename, n_pieces = jobs.pop(future)
+                    try:
+                        output, seconds = future.result()
+                    except Exception as exc:
+                        logger.error(f"couldn't {stage} {filename}: {exc!r}")
+                        result.failed += 1
+                        continue
+                    stats.add_time(stage, seconds)
+                    if stage == "extract":
+                        pieces, original_chars = output
+                        stats.observe_file(len(pieces))
+                        stats.observe_chars(original_chars, sum(map(len, pieces)))
+                        job = network.submit(
+                            timed_call, self._translate, filename, pieces, dedup
+                        )
+                        jobs[job] = ("translate", filename, len(pieces))
+                    elif stage == "translate":
+                        new_filename = translated_filename(filename)
+                        job = pool.submit(
+                            timed_call,
+                            render_file,
+                            filename,
+                            output,
+                            new_filename,
+                            masker,
+                            parse_cache,
+                        )
+                        jobs[job] = ("render", filename, n_pieces)
+                    else:
+                        if self._client.journal is not None:
+                            self._client.journal.finish(filename)
+                        result.files += 1
+                        result.pieces += n_pieces
+                        if progress is not None:
+                            progress(filename, n_pieces)
+
+        result.seconds = perf_counter() - start
+        result.unique_pieces = dedup.unique
+        logger.info(f"batch finished: {result}, dedup ratio: {dedup.ratio:.2f}")
+        return result
+
+    def _translate(
+        self, filename: Path, pieces: list[str], dedup: Deduplicator
+    ) -> list[str]:
+        if self._incremental:
+            manifest = manifest_filename(translated_filename(filename))
+            return self._client._translate_incremental(
+                pieces, manifest, dedup, filename
+            )
+        return self._client._translate_pieces(pieces, dedup, filename)
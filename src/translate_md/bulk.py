@@ -0,0 +1,211 @@
+"""Extraction of the pieces of a tree to a JSONL file, and application of
+their translations, to translate offline with any batch runner.
+
+`extract` writes a json line per piece of each file, with the file, the
+position of the piece (its index in `MarkdownProcessor.get_pieces`), the
+hash of its text and the text. The lines can be translated anywhere (i.e.
+on a machine with a GPU, far from the docs), keeping the other fields and
+replacing the text or adding a `translation`. A file without pieces
+(i.e. only front matter) gets a single line with `"pieces": 0` and no
+text, to be kept as it is. `apply` reads the lines translated back, and
+writes the translated version of each file.
+
+Both stream the lines, holding a single file at a time, so the memory
+doesn't grow with the size of the corpus. `apply` expects the lines of a
+file to be consecutive, as `extract` writes them. The hash of each piece
+is checked against the file, a file edited since it was extracted isn't
+written.
+
+Examples:
+    ```python
+    >>> with open("pieces.jsonl", "w") as f:
+    ...     extract([Path("content")], f)
+    ExtractResult(files=12, pieces=1530)
+    >>> # Translate pieces.jsonl to translated.jsonl.
+    >>> with open("translated.jsonl") as f:
+    ...     apply(f)
+    ApplyResult(files=12, pieces=1530, failed=0)
+    ```
+"""
+
+import json
+from dataclasses import dataclass
+from itertools import groupby
+from pathlib import Path
+from typing import IO, Any, Iterable, Iterator, Optional
+
+import translate_md.markdown as md
+from translate_md.batch import collect_files
+from translate_md.client import translated_filename
+from translate_md.errors import InvalidRecordError
+from translate_md.logger import get_logger
+from translate_md.manifest import piece_hash
+from translate_md.masking import Masker
+from translate_md.parse_cache import ParseCache
+
+logger = get_logger("bulk")
+
+
+@dataclass
+class ExtractResult:
+    """Summary of an extraction.
+
+    Attributes:
+        files (int): Number of files read.
+        pieces (int): Number of pieces written.
+    """
+
+    files: int = 0
+    pieces: int = 0
+
+
+@dataclass
+class ApplyResult:
+    """Summary of the application of the translations.
+
+    Attributes:
+        files (int): Number of translated files written.
+        pieces (int): Number of pieces applied.
+        failed (int): Number of files that couldn't be written.
+    """
+
+    files: int = 0
+    pieces: int = 0
+    failed: int = 0
+
+
+def extract(
+    paths: Iterable[Path],
+    output: IO[str],
+    masker: Optional[Masker] = None,
+    parse_cache: Optional[ParseCache] = None,
+) -> ExtractResult:
+    """Write the pieces of the files as json lines.
+
+    Args:
+        paths (Iterable[Path]): Files, directories or glob patterns, as
+            in `collect_files`.
+        output (IO[str]): Text file to write the lines to.
+        masker (Optional[Masker], optional): Masks the pieces written.
+            `apply` must be given the same masker. Defaults to None.
+        parse_cache (Optional[ParseCache], optional): Cache of the files
+            parsed, `apply` loads them from it. Defaults to None.
+
+    Returns:
+        ExtractResult: Files and pieces extracted.
+    """
+    factory = md.ProcessorFactory(masker=masker, parse_cache=parse_cache)
+    result = ExtractResult()
+    for filename in collect_files(paths):
+        pieces = factory.from_file(filename).get_pieces()
+        if not pieces:
+            # Otherwise `apply` wouldn't know of the file.
+            record = {"file": str(filename), "pieces": 0}
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        for position, text in enumerate(pieces):
+            record = {
+                "file": str(filename),
+                "position": position,
+                "hash": piece_hash(text),
+                "text": text,
+            }
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        result.files += 1
+        result.pieces += len(pieces)
+    logger.info(f"extracted {result}")
+    return result
+
+
+def read_records(lines: Iterable[str]) -> Iterator[dict[str, Any]]:
+    """Parse the json lines, skipping the blank ones.
+
+    Raises:
+        InvalidRecordError: If a line isn't a json object with the fields
+            written by `extract`.
+    """
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            record["file"]
+            if record.get("pieces") != 0:
+                record["position"], record["hash"]
+        except (ValueError, TypeError, KeyError) as exc:
+            raise InvalidRecordError(number, repr(exc)) from exc
+        yield record
+
+
+def apply(
+    lines: Iterable[str],
+    masker: Optional[Masker] = None,
+    parse_cache: Optional[ParseCache] = None,
+) -> ApplyResult:
+    """Write the translated files from the translated json lines.
+
+    The translation of each piece is its `translation` field, or the
+    `text` if there is none. Each file is written next to the original
+    one, see `translated_filename`.
+
+    Args:
+        lines (Iterable[str]): Lines written by `extract`, translated.
+        masker (Optional[Masker], optional): The masker given to `extract`.
+            Defaults to None.
+        parse_cache (Optional[ParseCache], optional): Cache of the files
+            parsed. Defaults to None.
+
+    Returns:
+        ApplyResult: Files written and failed.
+
+    Raises:
+        InvalidRecordError: If a line is invalid. The files whose lines
+            were read before are written.
+    """
+    factory = md.ProcessorFactory(masker=masker, parse_cache=parse_cache)
+    result = ApplyResult()
+    seen: set[str] = set()
+    for file, records in groupby(read_records(lines), key=lambda r: r["file"]):
+        try:
+            if file in seen:
+                raise ValueError("its lines aren't consecutive")
+            seen.add(file)
+            result.pieces += _apply_file(factory, Path(file), records)
+            result.files += 1
+        except InvalidRecordError:
+            raise
+        except (ValueError, OSError) as exc:
+            logger.error(f"couldn't apply the translations of {file}: {exc}")
+            result.failed += 1
+    logger.info(f"applied {result}")
+    return result
+
+
+def _apply_file(
+    factory: md.ProcessorFactory, filename: Path, records: Iterable[dict[str, Any]]
+) -> int:
+    """Update a file with the translations of its pieces and write it,
+    returning the number of pieces."""
+    mdproc = factory.from_file(filename)
+    pieces = mdproc.get_pieces()
+    positions, texts = [], []
+    for record in records:
+        if record.get("pieces") == 0:
+            continue  # The file had no pieces, checked below.
+        position = record["position"]
+        found = (
+            isinstance(position, int)
+            and position in range(len(pieces))
+            and piece_hash(pieces[position])
+        )
+        if found != record["hash"]:
+            raise ValueError(f"piece {position} changed since it was extracted")
+        translation = record.get("translation", record.get("text"))
+        if not isinstance(translation, str):
+            raise ValueError(f"piece {position} has no translation")
+        positions.append(position)
+        texts.append(translation)
+    if sorted(positions) != list(range(len(pieces))):
+        raise ValueError(f"{len(positions)} translations for {len(pieces)} pieces")
+    mdproc.update_pieces(positions, texts)
+    mdproc.write_to(translated_filename(filename))
+    return len(pieces)
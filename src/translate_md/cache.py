@@ -0,0 +1,206 @@
+"""Translation memory, a cache of the pieces already translated.
+
+The pieces are stored by a hash of their content together with the URL
+of the service (and optionally the model name), so a piece is sent to
+spanglish only the first time it's seen.
+
+Examples:
+    ```python
+    >>> from translate_md.cache import LRUCache, SQLiteCache, TieredCache
+    >>> cache = TieredCache([LRUCache(), SQLiteCache(Path("translations.db"))])
+    >>> client = SpanglishClient(cache=cache)
+    >>> client.translate_file(filename)
+    >>> cache.stats
+    CacheStats(hits=120, misses=16, saved_characters=10240)
+    ```
+"""
+
+import hashlib
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Sequence
+
+
+def cache_key(text: str, url: str, model: str = "") -> str:
+    """Key of a piece of text in the cache.
+
+    Args:
+        text (str): Text to translate.
+        url (str): URL of the service translating the text.
+        model (str, optional): Name of the model behind the service.
+            Defaults to "".
+
+    Returns:
+        str: sha256 hex digest.
+    """
+    content = "\0".join((url, model, text))
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    """Counters of the cache lookups.
+
+    Attributes:
+        hits (int): Number of lookups found in the cache.
+        misses (int): Number of lookups not found in the cache.
+        saved_characters (int): Characters of translated text served
+            from the cache instead of the service.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    saved_characters: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of the lookups found in the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class TranslationCache(ABC):
+    """Base class for the translation caches.
+
+    Subclasses must implement `_get` and `_set`, the counters of hits
+    and misses are kept here. The methods must be safe to call
+    from multiple threads.
+    """
+
+    def __init__(self) -> None:
+        self.stats = CacheStats()
+        self._stats_lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        """Get the translation stored under `key`, or None if missing."""
+        value = self._get(key)
+        with self._stats_lock:
+            if value is None:
+                self.stats.misses += 1
+            else:
+                self.stats.hits += 1
+                self.stats.saved_characters += len(value)
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        """Store a translation under `key`."""
+        self._set(key, value)
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[str]:
+        """Stored translation, or None if missing."""
+
+    @abstractmethod
+    def _set(self, key: str, value: str) -> None:
+        """Store a translation."""
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"({self.stats})"
+
+
+class LRUCache(TranslationCache):
+    """In memory cache, discards the least recently used translations.
+
+    Args:
+        maxsize (int, optional): Maximum number of translations kept.
+            Defaults to 10000.
+    """
+
+    def __init__(self, maxsize: int = 10_000) -> None:
+        super().__init__()
+        self._maxsize = maxsize
+        self._data: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+
+
+class SQLiteCache(TranslationCache):
+    """On disk cache stored in a SQLite database.
+
+    Args:
+        path (Path): Database file, created if it doesn't exist.
+    """
+
+    def __init__(self, path: Path) -> None:
+        super().__init__()
+        self._path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations "
+                "(key TEXT PRIMARY KEY, translation TEXT NOT NULL)"
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    def close(self) -> None:
+        """Close the connection to the database."""
+        with self._lock:
+            self._conn.close()
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT translation FROM translations WHERE key = ?", (key,)
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def _set(self, key: str, value: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO translations (key, translation) VALUES (?, ?)",
+                (key, value),
+            )
+
+
+class TieredCache(TranslationCache):
+    """Cache made of several tiers, from the fastest to the slowest.
+
+    Lookups go through the tiers in order, a translation found in a slower
+    tier is copied to the faster ones. New translations are stored in
+    every tier.
+
+    Args:
+        tiers (Sequence[TranslationCache]): The caches, i.e. an `LRUCache`
+            in front of a `SQLiteCache`.
+    """
+
+    def __init__(self, tiers: Sequence[TranslationCache]) -> None:
+        super().__init__()
+        self._tiers = list(tiers)
+
+    def _get(self, key: str) -> Optional[str]:
+        for i, tier in enumerate(self._tiers):
+            value = tier.get(key)
+            if value is not None:
+                for faster in self._tiers[:i]:
+                    faster.set(key, value)
+                return value
+        return None
+
+    def _set(self, key: str, value: str) -> None:
+        for tier in self._tiers:
+            tier.set(key, value)
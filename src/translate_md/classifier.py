@@ -0,0 +1,186 @@
+"""Classification of the inline tokens that shouldn't be translated.
+
+All the skip rules are compiled in a single regular expression, so each
+token is checked in one pass. Besides the default rules (front matter,
+figures, code and comments), new ones can be registered, i.e. for hugo
+shortcodes, math or html blocks:
+
+Examples:
+    ```python
+    >>> classifier = PieceClassifier()
+    >>> classifier.register("shortcode", SHORTCODE)
+    >>> classifier.skip_reason('{{< youtube w7Ft2ymGmfc >}}')
+    'shortcode'
+    >>> mdproc = MarkdownProcessor(content, classifier=classifier)
+    ```
+"""
+
+import hashlib
+import re
+from types import CodeType
+from typing import Callable, Optional, Union
+
+
+def delimited(start: str, end: str) -> str:
+    """Pattern for a text that starts with `start` and ends with `end`.
+
+    The delimiters may overlap, i.e. "```" is both a start and an end
+    of a code block, as it happens with `str.startswith/endswith`.
+    """
+    return rf"(?={re.escape(start)})[\s\S]*(?<={re.escape(end)})"
+
+
+FRONT_MATTER = delimited("---\n", "\n---")
+FIGURE = delimited("![", ")")
+CODE = delimited("```", "```")
+COMMENT = delimited("<!--", "-->")
+
+# Opt-in rules, not registered by default.
+SHORTCODE = r"\{\{[<%][\s\S]*[>%]\}\}"
+MATH_BLOCK = delimited("$$", "$$")
+HTML_BLOCK = (
+    r"<(?P<html_tag>[a-zA-Z][\w-]*)[^>]*>[\s\S]*</(?P=html_tag)\s*>"
+    r"|<[a-zA-Z][\w-]*[^>]*/>"
+)
+
+DEFAULT_RULES = {
+    "front_matter": FRONT_MATTER,
+    "figure": FIGURE,
+    "code": CODE,
+    "comment": COMMENT,
+}
+
+SkipRule = Union[str, "re.Pattern[str]", Callable[[str], bool]]
+
+
+def _code_key(code: CodeType) -> tuple:
+    """Content of a code object, the nested ones (i.e. of lambdas) included
+    by their content instead of their address."""
+    consts = tuple(
+        _code_key(c) if isinstance(c, CodeType) else c for c in code.co_consts
+    )
+    return (code.co_code, consts, code.co_names)
+
+
+def function_fingerprint(func: Callable[[str], bool]) -> str:
+    """Name of a rule function with a hash of what it does.
+
+    Two lambdas or closures of the same scope share their name, so the
+    hash covers the bytecode, constants, defaults and the values captured
+    by the closure. Callables without code (i.e. builtins or objects with
+    `__call__`) are described by their repr.
+    """
+    name = getattr(func, "__qualname__", type(func).__qualname__)
+    name = f"{getattr(func, '__module__', '')}.{name}"
+    code = getattr(func, "__code__", None)
+    if code is None:
+        return f"{name}:{func!r}"
+    cells = []
+    for cell in getattr(func, "__closure__", None) or ():
+        try:
+            cells.append(cell.cell_contents)
+        except ValueError:  # Not assigned yet.
+            cells.append(None)
+    content = repr((_code_key(code), getattr(func, "__defaults__", None), cells))
+    return f"{name}:{hashlib.sha256(content.encode('utf-8')).hexdigest()[:16]}"
+
+
+class PieceClassifier:
+    """Decides which pieces of text are skipped from the translation.
+
+    A rule is either a regular expression that must match the whole
+    (stripped) text, or a function that receives the stripped text and
+    returns True if it must be skipped. The regular expressions are
+    joined in a single compiled pattern.
+
+    Args:
+        rules (Optional[dict[str, SkipRule]], optional):
+            Rules by name. Defaults to None, which uses `DEFAULT_RULES`.
+    """
+
+    def __init__(self, rules: Optional[dict[str, SkipRule]] = None) -> None:
+        self._patterns: dict[str, str] = {}
+        self._functions: dict[str, Callable[[str], bool]] = {}
+        self._compiled: Optional[re.Pattern[str]] = None
+        self._group_names: dict[str, str] = {}
+        for name, rule in (DEFAULT_RULES if rules is None else rules).items():
+            self.register(name, rule)
+
+    @property
+    def rules(self) -> list[str]:
+        """Names of the rules registered."""
+        return [*self._patterns, *self._functions]
+
+    @property
+    def fingerprint(self) -> str:
+        """Description of the rules, changes whenever the pieces skipped
+        may change. Functions are identified by their name and a hash of
+        their code, defaults and closure, see `function_fingerprint`."""
+        patterns = sorted(self._patterns.items())
+        functions = sorted(
+            (name, function_fingerprint(f)) for name, f in self._functions.items()
+        )
+        return repr((patterns, functions))
+
+    def register(self, name: str, rule: SkipRule) -> None:
+        """Add a new rule, or replace the one with the same name.
+
+        Args:
+            name (str): Name of the rule, returned by `skip_reason`.
+            rule (SkipRule): Regular expression or function.
+        """
+        self.unregister(name)
+        if isinstance(rule, re.Pattern):
+            self._patterns[name] = rule.pattern
+        elif isinstance(rule, str):
+            re.compile(rule)  # Fail early on invalid patterns.
+            self._patterns[name] = rule
+        else:
+            self._functions[name] = rule
+        self._compiled = None
+
+    def unregister(self, name: str) -> None:
+        """Remove a rule, if registered."""
+        self._patterns.pop(name, None)
+        self._functions.pop(name, None)
+        self._compiled = None
+
+    def skip_reason(self, text: str) -> Optional[str]:
+        """Name of the rule that skips the text, or None if it
+        must be translated.
+
+        Args:
+            text (str): Content of an inline token.
+        """
+        pattern = self._pattern()
+        if pattern is not None:
+            match = pattern.fullmatch(text)
+            if match is not None:
+                return self._group_names[match.lastgroup]  # type: ignore[index]
+        if self._functions:
+            text = text.strip()
+            for name, func in self._functions.items():
+                if func(text):
+                    return name
+        return None
+
+    def is_skipped(self, text: str) -> bool:
+        """Check if the text must be left untranslated."""
+        return self.skip_reason(text) is not None
+
+    def _pattern(self) -> Optional["re.Pattern[str]"]:
+        if self._compiled is None and self._patterns:
+            # Named groups tell which of the rules matched, the surrounding
+            # whitespace is matched instead of stripping (copying) the text.
+            self._group_names = {f"_rule{i}": n for i, n in enumerate(self._patterns)}
+            rules = "|".join(
+                f"(?P<_rule{i}>{p})" for i, p in enumerate(self._patterns.values())
+            )
+            self._compiled = re.compile(rf"\s*(?:{rules})\s*")
+        return self._compiled
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"({self.rules})"
+
+
+default_classifier = PieceClassifier()
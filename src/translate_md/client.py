@@ -1,32 +1,311 @@
 """Client for spanglish. """
 
 import json
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import Optional
+from time import perf_counter
+from typing import Any, Callable, Optional, Sequence, Union
 from urllib.parse import urljoin
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 import translate_md.markdown as md
+from translate_md.cache import TranslationCache, cache_key
+from translate_md.coalesce import Coalescer
+from translate_md.concurrency import OVERLOAD_STATUS, ConcurrencyLimiter, retry_after
+from translate_md.dedup import Deduplicator
+from translate_md.endpoints import Endpoint, EndpointPool
+from translate_md.errors import TranslationError
+from translate_md.journal import Journal
 from translate_md.logger import get_logger
+from translate_md.manifest import Manifest, manifest_filename
+from translate_md.masking import Masker
+from translate_md.packing import PackedPieces
+from translate_md.parse_cache import ParseCache
+from translate_md.stats import NULL_STATS, Stats
+from translate_md.transport import Transport
 
 SPANGLISH_URL = r"http://localhost:8000/"
 
+# Pieces per section and sections translated ahead when streaming a file.
+STREAM_SECTION_PIECES = 32
+STREAM_LOOKAHEAD = 2
+
 
 logger = get_logger("client")
 
 
+def translated_filename(filename: Path) -> Path:
+    """Default name for the translated version of a markdown file.
+
+    Args:
+        filename (Path): Path to the original markdown file.
+
+    Returns:
+        Path: File in the same directory with `.es` before the suffix.
+
+    Examples:
+        ```python
+        >>> translated_filename(Path("posts/post.md"))
+        PosixPath('posts/post.es.md')
+        ```
+    """
+    return filename.parent / f"{filename.stem}.es{filename.suffix}"
+
+
+def _decode(response: requests.Response) -> Any:
+    """Json body of a response of the service.
+
+    Raises:
+        ValueError: If the service answered with an error, or the body
+            isn't json.
+    """
+    if response.status_code >= 400:
+        logger.error(f"the service answered {response.status_code}")
+        raise ValueError(f"the service answered {response.status_code}")
+    try:
+        return response.json()
+    except Exception as exc:
+        logger.error("Error parsing a request to json")
+        raise ValueError("Unexpected error on the response") from exc
+
+
+def _call_on_result(
+    on_result: Callable[[int, Any], None], index: int, future: Future
+) -> None:
+    if not future.cancelled() and future.exception() is None:
+        on_result(index, future.result())
+
+
 class SpanglishClient:
     r"""Client to interact with the [Spanglish](https://github.com/plaguss/spanglish)
     service.
 
+    The client keeps a pool of connections open with the service, which
+    is reused across calls. Close it with `close`, or use the client as
+    a context manager:
+
+    ```python
+    with SpanglishClient() as client:
+        client.translate_file(filename)
+    ```
+
     Args:
-        url (str, optional):
+        url (Union[str, Sequence[str]], optional):
             URL where the service is exposed. Defaults to SPANGLISH_URL.
+            Several urls are replicas of the service: each request goes to
+            the one with the fewest requests in flight, and a request that
+            fails is retried on another one, see `translate_md.endpoints`.
+            The first url keys the cached translations.
+        max_workers (int, optional):
+            Maximum number of requests in flight when translating multiple
+            pieces (i.e. in `translate_file`). Defaults to 4, use 1 to
+            send the requests one after the other. With a `limiter`, the
+            pool of threads grows to its `max_limit` if needed.
+        pool_size (Optional[int], optional):
+            Number of connections kept alive with the service.
+            Defaults to None, in which case it's equal to `max_workers`.
+        timeout (float, optional):
+            Seconds to wait for each response. Defaults to 60.
+        retries (int, optional):
+            Number of times a request is retried on connection errors
+            or 429/502/503/504 responses. Defaults to 3.
+        backoff_factor (float, optional):
+            Factor of the exponential backoff between retries, in seconds.
+            Defaults to 0.5.
+        cache (Optional[TranslationCache], optional):
+            Translation memory consulted before sending any text to the
+            service, see `translate_md.cache`. Defaults to None.
+        model (str, optional):
+            Name of the model served by spanglish, used together with the
+            url to key the cached translations. Defaults to "".
+        batch_chars (Optional[int], optional):
+            If given, the pieces of a file (and the texts of `translate_batch`)
+            are packed in batches of up to `batch_chars` characters and sent
+            to the `/batched` endpoint, see `translate_md.packing`. A batch
+            that fails is sent again piece by piece to `/single`. Defaults
+            to None, one request to `/single` per piece.
+        stats (Optional[Stats], optional):
+            Collects the time spent per stage, the latency and bytes of the
+            requests and the pieces per file, see `translate_md.stats`.
+            Defaults to None, nothing is measured.
+        limiter (Optional[ConcurrencyLimiter], optional):
+            Adapts the number of requests in flight to keep their latency
+            under a target, see `translate_md.concurrency`. The 429 and 503
+            responses are retried by the client, pausing the requests and
+            lowering the limit. Defaults to None, `max_workers` requests
+            are sent at once.
+        journal (Optional[Journal], optional):
+            Appends every piece translated to a journal on disk, and skips
+            the pieces found in it, so a job that died halfway can be
+            resumed. See `translate_md.journal`. With `batch_chars`, the
+            pieces of a file are journaled once all its batches arrive.
+            Defaults to None.
+        transport (Optional[Transport], optional):
+            Sends the payloads of `/batched` (with `batch_chars`, the packed
+            batches) POSTing json, optionally compressed, instead of as
+            query parameters. It falls back to GET if the service doesn't
+            support it, see `translate_md.transport`. Defaults to None,
+            every request is a GET.
+        coalesce_delay (Optional[float], optional):
+            If given, the calls to `translate` made at about the same time
+            from several threads are gathered for up to these seconds and
+            sent together through `translate_batch`, see
+            `translate_md.coalesce`. Defaults to None, one request per call.
+        coalesce_max_batch (int, optional):
+            Calls to `translate` gathered at most in a batch. Defaults to 32.
+        masker (Optional[Masker], optional):
+            Masks the inline code, link destinations and URLs of the pieces
+            of the files before sending them, restoring them in the
+            translations, see `translate_md.masking`. Defaults to None.
+        parse_cache (Optional[ParseCache], optional):
+            Loads the tokens of the files parsed in previous runs from disk
+            instead of parsing them again, see `translate_md.parse_cache`.
+            Defaults to None.
+        health_interval (Optional[float], optional):
+            With several urls, seconds between the health checks of the
+            replicas (see `check_endpoints`), run in a thread while the
+            client is open. Defaults to None, the replicas are only
+            checked by their requests.
     """
 
-    def __init__(self, url: str = SPANGLISH_URL) -> None:
-        self._spanglish_url = url
+    def __init__(
+        self,
+        url: Union[str, Sequence[str]] = SPANGLISH_URL,
+        max_workers: int = 4,
+        pool_size: Optional[int] = None,
+        timeout: float = 60.0,
+        retries: int = 3,
+        backoff_factor: float = 0.5,
+        cache: Optional[TranslationCache] = None,
+        model: str = "",
+        batch_chars: Optional[int] = None,
+        stats: Optional[Stats] = None,
+        limiter: Optional[ConcurrencyLimiter] = None,
+        journal: Optional[Journal] = None,
+        transport: Optional[Transport] = None,
+        coalesce_delay: Optional[float] = None,
+        coalesce_max_batch: int = 32,
+        masker: Optional[Masker] = None,
+        parse_cache: Optional[ParseCache] = None,
+        health_interval: Optional[float] = None,
+    ) -> None:
+        if max_workers < 1:
+            raise ValueError(f"max_workers must be a positive integer: {max_workers}")
+        urls = [url] if isinstance(url, str) else list(url)
+        self._spanglish_url = urls[0] if urls else ""
+        self._endpoints = EndpointPool(urls) if len(urls) > 1 else None
+        self._limiter = limiter
+        if limiter is not None:
+            max_workers = max(max_workers, limiter.max_limit)
+        self._max_workers = max_workers
+        self._pool_size = pool_size or max_workers
+        self._timeout = timeout
+        self._retries = retries
+        self._backoff_factor = backoff_factor
+        self._session: Optional[requests.Session] = None
+        self._session_lock = threading.Lock()
+        self._cache = cache
+        self._model = model
+        self._batch_chars = batch_chars
+        self._stats = stats or NULL_STATS
+        self._journal = journal
+        self._transport = transport
+        self._masker = masker
+        self._parse_cache = parse_cache
+        self._health_interval = health_interval
+        self._health_checks: Optional[tuple[threading.Thread, threading.Event]] = None
+        self._coalescer = None
+        if coalesce_delay is not None:
+            self._coalescer = Coalescer(
+                self.translate_batch,
+                max_delay=coalesce_delay,
+                max_batch=coalesce_max_batch,
+                max_in_flight=max_workers,
+            )
+
+    @property
+    def cache(self) -> Optional[TranslationCache]:
+        """The translation cache, its `stats` keep the hits and misses."""
+        return self._cache
+
+    @property
+    def journal(self) -> Optional[Journal]:
+        """Journal of the pieces translated, to resume unfinished files."""
+        return self._journal
+
+    @property
+    def masker(self) -> Optional[Masker]:
+        """Masks the pieces of the files, None if sent as they are."""
+        return self._masker
+
+    @property
+    def parse_cache(self) -> Optional[ParseCache]:
+        """Cache of the files parsed, None if parsed every time."""
+        return self._parse_cache
+
+    @property
+    def coalescer(self) -> Optional[Coalescer]:
+        """Gathers the calls to `translate` in batches, None if not coalesced."""
+        return self._coalescer
+
+    @property
+    def transport(self) -> Optional[Transport]:
+        """Transport of the payloads of `/batched`, None if sent as GET."""
+        return self._transport
+
+    @property
+    def endpoints(self) -> Optional[EndpointPool]:
+        """The replicas of the service, None if there is a single url."""
+        return self._endpoints
+
+    def check_endpoints(self, path: str = "/", timeout: float = 5.0) -> dict[str, bool]:
+        """Send a request to each replica, ejecting the ones that don't
+        answer (or answer with an error 5xx) and re-admitting the rest.
+        With `health_interval`, the client runs them periodically.
+
+        Args:
+            path (str, optional): Path requested. Defaults to "/".
+            timeout (float, optional): Seconds to wait per replica. Defaults to 5.
+
+        Returns:
+            dict[str, bool]: Whether each replica is healthy.
+        """
+        return self._check_endpoints(self.session, path, timeout)
+
+    def _check_endpoints(
+        self, session: requests.Session, path: str, timeout: float
+    ) -> dict[str, bool]:
+        if self._endpoints is None:
+            return {}
+        health = {}
+        for endpoint in self._endpoints.endpoints:
+            try:
+                url = urljoin(endpoint.url, path)
+                response = session.get(url, timeout=timeout)
+                ok = response.status_code < 500
+            except requests.RequestException:
+                ok = False
+            self._endpoints.report(endpoint, ok)
+            health[endpoint.url] = ok
+        return health
+
+    @property
+    def concurrency_limit(self) -> int:
+        """Requests allowed in flight, changes over time with a `limiter`."""
+        if self._limiter is None:
+            return self._max_workers
+        return self._limiter.limit
+
+    @property
+    def stats(self) -> Stats:
+        """Metrics of the translations, `NULL_STATS` if not measured."""
+        return self._stats
 
     def translate(self, text: str) -> str:
         """Translate a piece of text from english to spanish.
@@ -43,7 +322,16 @@ class SpanglishClient:
             'hola mundo'
             ```
         """
-        return self._request("/single", payload={"text": text})
+        if self._coalescer is not None:
+            return self._coalescer.translate(text)
+        if self._cache is None:
+            return self._request("/single", payload={"text": text})
+        key = self._cache_key(text)
+        translation = self._cache.get(key)
+        if translation is None:
+            translation = self._request("/single", payload={"text": text})
+            self._cache.set(key, translation)
+        return translation
 
     def translate_batch(self, texts: list[str]) -> list[str]:
         """Translates a batch of texts.
@@ -64,17 +352,17 @@ class SpanglishClient:
             ["hola", "mundo", "uno", "dos"]
             ```
         """
-        result = self._request("/batched", payload={"texts": json.dumps(texts)})
-
-        try:
-            return json.loads(result)
-        except json.decoder.JSONDecodeError as e:
-            # There are some errors when retrieving a batch of texts.
-            # The service returns a list of texts
-            raise ValueError(f"Couldn't load the json encoded list: {result}") from e
+        translate = self._packed_request if self._batch_chars else self._batched_request
+        if self._cache is None:
+            return translate(texts)
+        return self._cached(texts, translate)
 
     def translate_file(
-        self, filename: Path, new_filename: Optional[Path] = None
+        self,
+        filename: Path,
+        new_filename: Optional[Path] = None,
+        incremental: bool = False,
+        stream: bool = False,
     ) -> None:
         """Takes the filename of a markdown file in disk and processes to
         obtain the paragraphs which contain text, sends them to translate
@@ -87,24 +375,550 @@ class SpanglishClient:
                 Filename for the new markdown file to be generated.
                 Defaults to None, in which case it is generated
                 internally.
+            incremental (bool, optional):
+                Reuse the translations from the previous run, stored in a
+                manifest next to the new file (see `translate_md.manifest`),
+                and send only the new or edited pieces. Defaults to False.
+            stream (bool, optional):
+                Write the new document section by section, as soon as the
+                pieces of each section are translated, instead of waiting
+                for the whole document. Only a few sections are translated
+                ahead of the one being written, so the translations of big
+                files aren't held in memory. If a piece fails, the new file
+                keeps the sections written so far. Can't be combined with
+                `incremental`. Defaults to False.
         """
+        if incremental and stream:
+            raise ValueError("incremental and stream can't be used together")
         logger.info("reading file")
-        md_content = md.read_file(filename)
-        mdproc = md.MarkdownProcessor(md_content)
-        pieces = mdproc.get_pieces()
-        # TODO: Check if the file is big (say more than 5000 characters)
-        # and send the content in pieces.
-        translated_text = self._multi_request("/single", pieces)
-        logger.info("updating content")
-        mdproc.update(translated_text)
+        stats = self._stats
+        with stats.timer("read_file"):
+            md_content = md.read_file(filename)
+        mdproc = md.MarkdownProcessor(
+            md_content, masker=self._masker, parse_cache=self._parse_cache
+        )
+        with stats.timer("parse"):
+            mdproc.tokens
+        with stats.timer("get_pieces"):
+            pieces = mdproc.get_pieces()
+        stats.observe_file(len(pieces))
+        sent_chars = sum(len(p) for p in pieces)
+        stats.observe_chars(mdproc.original_chars, sent_chars)
+        if self._masker is not None:
+            logger.info(
+                f"masked {mdproc.original_chars - sent_chars} of "
+                f"{mdproc.original_chars} characters"
+            )
         if new_filename is None:
-            new_filename = filename.parent / f"{filename.stem}.es{filename.suffix}"
-        mdproc.write_to(new_filename)
+            new_filename = translated_filename(filename)
+        if stream:
+            self._stream_file(mdproc, pieces, new_filename, filename)
+        else:
+            with stats.timer("translate"):
+                if incremental:
+                    translated_text = self._translate_incremental(
+                        pieces, manifest_filename(new_filename), filename=filename
+                    )
+                else:
+                    translated_text = self._translate_pieces(pieces, filename=filename)
+            logger.info("updating content")
+            with stats.timer("render"):
+                mdproc.update(translated_text)
+                mdproc.write_to(new_filename)
+        if self._journal is not None:
+            self._journal.finish(filename)
         logger.info(f"file written at: {new_filename}")
+        if self._cache is not None:
+            logger.info(f"cache: {self._cache.stats}")
+
+    def close(self) -> None:
+        """Close the connections with the service.
+
+        The client can still be used afterwards, a new pool of connections
+        will be created when needed.
+        """
+        if self._coalescer is not None:
+            self._coalescer.close()
+        with self._session_lock:
+            health_checks, self._health_checks = self._health_checks, None
+        if health_checks is not None:
+            thread, stop = health_checks
+            stop.set()
+            thread.join()
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def __enter__(self) -> "SpanglishClient":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
 
     def __repr__(self) -> str:
+        if self._endpoints is not None:
+            return type(self).__name__ + f"({', '.join(self._endpoints.urls)})"
         return type(self).__name__ + f"({self._spanglish_url})"
 
+    @property
+    def session(self) -> requests.Session:
+        """Session shared by all the requests, created on first use."""
+        with self._session_lock:
+            if self._session is None:
+                self._session = self._new_session()
+                self._start_health_checks()
+            return self._session
+
+    def _start_health_checks(self) -> None:
+        if self._endpoints is None or self._health_interval is None:
+            return
+        stop = threading.Event()
+        thread = threading.Thread(
+            target=self._check_periodically, args=(stop,), daemon=True
+        )
+        self._health_checks = (thread, stop)
+        thread.start()
+
+    def _check_periodically(self, stop: threading.Event) -> None:
+        """Check the replicas until `stop` is set. The checks have a
+        session of their own, using `self.session` would open it again
+        after `close`."""
+        interval = self._health_interval
+        assert interval is not None
+        with requests.Session() as session:
+            while not stop.wait(interval):
+                health = self._check_endpoints(
+                    session, "/", min(interval, self._timeout)
+                )
+                logger.debug(f"health of the replicas: {health}")
+
+    def _cache_key(self, text: str) -> str:
+        return cache_key(text, self._spanglish_url, self._model)
+
+    def _cached(
+        self, texts: list[str], translate: Callable[[list[str]], list[str]]
+    ) -> list[str]:
+        """Look up the texts in the cache and translate only the missing ones.
+
+        Args:
+            texts (list[str]): Texts to translate.
+            translate (Callable[[list[str]], list[str]]):
+                Function sending the missing texts to the service.
+
+        Returns:
+            list[str]: The texts translated, in the same order.
+        """
+        assert self._cache is not None
+        keys = [self._cache_key(t) for t in texts]
+        translations = [self._cache.get(k) for k in keys]
+        for i in self._fill_missing(texts, translations, translate):
+            self._cache.set(keys[i], translations[i])  # type: ignore[arg-type]
+        return translations  # type: ignore[return-value]
+
+    def _fill_missing(
+        self,
+        texts: list[str],
+        translations: list[Optional[str]],
+        translate: Callable[[list[str]], list[str]],
+    ) -> list[int]:
+        """Translate the texts whose translation is None, in place.
+
+        Args:
+            texts (list[str]): Texts to translate.
+            translations (list[Optional[str]]): Translations already known.
+            translate (Callable[[list[str]], list[str]]):
+                Function sending the missing texts to the service.
+
+        Returns:
+            list[int]: Positions of the texts translated.
+
+        Raises:
+            TranslationError: With the index relative to `texts`.
+        """
+        missing = [i for i, t in enumerate(translations) if t is None]
+        if not missing:
+            return missing
+        try:
+            new = translate([texts[i] for i in missing])
+        except TranslationError as exc:
+            raise TranslationError(missing[exc.index], exc.message) from exc
+        for i, translation in zip(missing, new):
+            translations[i] = translation
+        return missing
+
+    def _translate_pieces(
+        self,
+        pieces: list[str],
+        dedup: Optional[Deduplicator] = None,
+        filename: Optional[Path] = None,
+        indices: Optional[list[int]] = None,
+    ) -> list[str]:
+        """Translate the pieces of a document, sending each unique text once.
+
+        Args:
+            pieces (list[str]): Texts to translate.
+            dedup (Optional[Deduplicator], optional):
+                Translations shared with other documents, i.e. the other
+                files of a batch run. Defaults to None, only the duplicates
+                within `pieces` are removed.
+            filename (Optional[Path], optional):
+                File the pieces come from, to journal their translations
+                if the client has a journal. Defaults to None.
+            indices (Optional[list[int]], optional):
+                Position of each piece in the document, journaled with its
+                translation. Defaults to None, the pieces are the whole
+                document.
+        """
+        dedup = dedup or Deduplicator()
+        if self._journal is None or filename is None:
+            translations = dedup.translate(pieces, self._translate_unique)
+        else:
+            translations = self._translate_journaled(
+                pieces, dedup, filename, indices or list(range(len(pieces)))
+            )
+        logger.info(f"dedup: {dedup.total} pieces, {dedup.unique} sent")
+        return translations
+
+    def _translate_journaled(
+        self,
+        pieces: list[str],
+        dedup: Deduplicator,
+        filename: Path,
+        indices: list[int],
+    ) -> list[str]:
+        """Translate the pieces missing from the journal, appending each
+        translation to it as soon as it arrives, with the position of the
+        piece in the document (`indices`)."""
+        journal = self._journal
+        assert journal is not None
+        translations = [journal.get(filename, p) for p in pieces]
+        position = {p: indices[i] for i, p in reversed(list(enumerate(pieces)))}
+
+        def record(text: str, translation: str) -> None:
+            journal.record(filename, position[text], text, translation)
+
+        translate_unique = partial(self._translate_unique, on_result=record)
+        missing = self._fill_missing(
+            pieces, translations, partial(dedup.translate, translate=translate_unique)
+        )
+        # Pieces translated for other files, or packed in batches.
+        for i in missing:
+            journal.record(filename, indices[i], pieces[i], translations[i])  # type: ignore[arg-type]
+        if len(missing) < len(pieces):
+            logger.info(
+                f"journal: {len(pieces) - len(missing)} of {len(pieces)} pieces resumed"
+            )
+        return translations  # type: ignore[return-value]
+
+    def _stream_file(
+        self,
+        mdproc: md.MarkdownProcessor,
+        pieces: list[str],
+        new_filename: Path,
+        filename: Optional[Path] = None,
+    ) -> None:
+        """Translate and write a document one section at a time.
+
+        The next `STREAM_LOOKAHEAD` sections are being translated in the
+        background while the current one is rendered and flushed to disk.
+        """
+        dedup = Deduplicator()
+        sections = mdproc.iter_sections(STREAM_SECTION_PIECES)
+        pending: deque[tuple[int, int, list[int], Future]] = deque()
+
+        def submit(executor: ThreadPoolExecutor) -> None:
+            section = next(sections, None)
+            if section is not None:
+                start, end, indices = section
+                texts = [pieces[i] for i in indices]
+                future = executor.submit(
+                    self._translate_pieces, texts, dedup, filename, indices
+                )
+                pending.append((start, end, indices, future))
+
+        with ThreadPoolExecutor(max_workers=1) as executor, open(
+            new_filename, "w"
+        ) as f:
+            for _ in range(STREAM_LOOKAHEAD + 1):
+                submit(executor)
+            written = False
+            while pending:
+                start, end, indices, future = pending.popleft()
+                try:
+                    translations = future.result()
+                except TranslationError as exc:
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    raise TranslationError(indices[exc.index], exc.message) from exc
+                submit(executor)
+                with self._stats.timer("render"):
+                    mdproc.update_pieces(indices, translations)
+                    output_markdown = mdproc.render_section(start, end)
+                if output_markdown:
+                    if written:
+                        f.write("\n\n")
+                    f.write(output_markdown)
+                    f.flush()
+                    written = True
+            if written:
+                f.write("\n")
+
+    def _translate_unique(
+        self,
+        texts: list[str],
+        on_result: Optional[Callable[[str, str], None]] = None,
+    ) -> list[str]:
+        """Translate the texts, one request per text or packed in batches
+        if `batch_chars` was given.
+
+        Texts found in the cache aren't sent to the service. `on_result`
+        is called with each text and its translation as they arrive, when
+        sent one per request.
+        """
+        translate: Callable[[list[str]], list[str]]
+        if self._batch_chars:
+            translate = self._packed_request
+        elif on_result is None:
+            translate = partial(self._multi_request, "/single")
+        else:
+            translate = partial(self._multi_request, "/single", on_result=on_result)
+        if self._cache is None:
+            return translate(texts)
+        return self._cached(texts, translate)
+
+    def _packed_request(self, texts: list[str]) -> list[str]:
+        """Translate the texts packed in batches through `/batched`.
+
+        Batches whose response can't be decoded, or doesn't contain a
+        translation per text, are sent again one text at a time to `/single`.
+
+        Raises:
+            TranslationError: With the index of the first text of the
+                batch that failed.
+        """
+        assert self._batch_chars is not None
+        packed = PackedPieces(texts, self._batch_chars)
+        logger.info(f"sending {len(texts)} texts in {len(packed.batches)} batches")
+
+        def fetch(batch: list[str]) -> list[str]:
+            try:
+                result = self._batched_request(batch)
+                if len(result) != len(batch):
+                    raise ValueError(f"expected {len(batch)} texts, got {len(result)}")
+                return result
+            except TranslationError:
+                raise  # Overloaded, sending the texts one by one won't help.
+            except ValueError as exc:
+                logger.warning(f"batch failed ({exc}), sending the texts to /single")
+                return [self._request("/single", payload={"text": t}) for t in batch]
+
+        try:
+            translations = self._run_concurrently(fetch, packed.batches)
+        except TranslationError as exc:
+            raise TranslationError(packed.piece_index(exc.index), exc.message) from exc
+        return packed.unpack(translations)
+
+    def _run_concurrently(
+        self,
+        func: Callable[[Any], Any],
+        items: list[Any],
+        on_result: Optional[Callable[[int, Any], None]] = None,
+    ) -> list[Any]:
+        """Apply `func` to the items in a pool of `max_workers` threads.
+
+        If given, `on_result` is called with the index and the result of
+        each item as soon as it's done, from the thread that ran it.
+
+        Returns:
+            list[Any]: The results in the same order as the items.
+
+        Raises:
+            TranslationError: With the index of the first item that failed.
+        """
+        with self._stats.timer("network"), ThreadPoolExecutor(
+            max_workers=self._max_workers
+        ) as executor:
+            futures = [executor.submit(func, item) for item in items]
+            if on_result is not None:
+                for i, future in enumerate(futures):
+                    future.add_done_callback(partial(_call_on_result, on_result, i))
+            results = []
+            for i, future in enumerate(futures):
+                try:
+                    results.append(future.result())
+                except Exception as exc:
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    logger.error(f"Error translating piece {i}")
+                    raise TranslationError(
+                        i, "Unexpected error on the response"
+                    ) from exc
+        return results
+
+    def _translate_incremental(
+        self,
+        pieces: list[str],
+        manifest_path: Path,
+        dedup: Optional[Deduplicator] = None,
+        filename: Optional[Path] = None,
+    ) -> list[str]:
+        """Translate the pieces missing from the manifest of a previous run.
+
+        The manifest is rewritten with the translations of the current
+        pieces only, so the ones removed from the document are dropped.
+        """
+        previous = Manifest.load(manifest_path)
+        translations = [previous.get(p) for p in pieces]
+        # Journaled with their position in the document, not among the missing.
+        missing = [i for i, t in enumerate(translations) if t is None]
+        translate = partial(
+            self._translate_pieces, dedup=dedup, filename=filename, indices=missing
+        )
+        changed = self._fill_missing(pieces, translations, translate)
+        logger.info(f"{len(changed)} of {len(pieces)} pieces changed")
+        manifest = Manifest()
+        for piece, translation in zip(pieces, translations):
+            manifest.set(piece, translation)  # type: ignore[arg-type]
+        manifest.save(manifest_path)
+        return translations  # type: ignore[return-value]
+
+    def _batched_request(self, texts: list[str]) -> list[str]:
+        result = self._request("/batched", payload={"texts": json.dumps(texts)})
+
+        try:
+            return json.loads(result)
+        except json.decoder.JSONDecodeError as e:
+            # There are some errors when retrieving a batch of texts.
+            # The service returns a list of texts
+            raise ValueError(f"Couldn't load the json encoded list: {result}") from e
+
+    def _new_session(self) -> requests.Session:
+        # With a limiter, the client retries the overload responses itself.
+        status = (502, 504) if self._limiter is not None else (429, 502, 503, 504)
+        # With replicas, the failed requests are retried on other replicas.
+        retry = Retry(
+            total=self._retries if self._endpoints is None else 0,
+            backoff_factor=self._backoff_factor,
+            status_forcelist=status,
+            allowed_methods=("GET", "POST"),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=self._pool_size, max_retries=retry
+        )
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _get(
+        self, session: requests.Session, path: str, params: dict[str, str]
+    ) -> requests.Response:
+        """Send a request to an endpoint of the service, choosing the
+        replica if there are several.
+
+        Raises:
+            ValueError: If the request failed with a 5xx or 429 on the
+                last replica tried.
+            requests.RequestException: If it failed with a connection error.
+        """
+        # Only the bulk payloads go through the transport.
+        bulk = self._transport is not None and path == "/batched"
+        if self._endpoints is None:
+            url = urljoin(self._spanglish_url, path)
+            return self._limited(session, url, params, bulk)
+        pool = self._endpoints
+        tried: list[Endpoint] = []
+        error: Optional[Exception] = None
+        for _ in range(self._retries + 1):
+            endpoint = pool.acquire(exclude=tried)
+            try:
+                url = urljoin(endpoint.url, path)
+                response = self._limited(session, url, params, bulk)
+            except (requests.RequestException, TranslationError) as exc:
+                pool.release(endpoint, ok=False)
+                error = exc
+            else:
+                ok = response.status_code < 500 and response.status_code != 429
+                pool.release(endpoint, ok)
+                if ok:
+                    return response
+                error = ValueError(f"the service answered {response.status_code}")
+            logger.warning(f"request to {endpoint.url} failed, trying another replica")
+            tried.append(endpoint)
+            if len(tried) == len(pool):
+                tried.clear()
+        logger.error("every replica failed")
+        assert error is not None
+        raise error
+
+    def _limited(
+        self,
+        session: requests.Session,
+        url: str,
+        params: dict[str, str],
+        bulk: bool = False,
+    ) -> requests.Response:
+        """Send a request, waiting for a slot of the limiter if any.
+
+        Raises:
+            TranslationError: If the service is still overloaded after the
+                last retry.
+        """
+        if self._limiter is None:
+            return self._send(session, url, params, bulk)
+        limiter = self._limiter
+        for attempt in range(self._retries + 1):
+            start = limiter.acquire()
+            try:
+                response = self._send(session, url, params, bulk)
+            except BaseException:
+                limiter.release(start, overloaded=True)
+                raise
+            if response.status_code not in OVERLOAD_STATUS:
+                limiter.release(start)
+                return response
+            pause = retry_after(response.headers.get("Retry-After"))
+            if pause is None:
+                pause = self._backoff_factor * 2**attempt
+            limiter.release(start, overloaded=True, pause=pause)
+            logger.warning(
+                f"service overloaded ({response.status_code}), "
+                f"limit lowered to {limiter.limit}, pausing {pause:.2f}s"
+            )
+        raise TranslationError(
+            0, f"service overloaded ({response.status_code}) after {attempt} retries"
+        )
+
+    def _send(
+        self,
+        session: requests.Session,
+        url: str,
+        params: dict[str, str],
+        bulk: bool = False,
+    ) -> requests.Response:
+        """Send a request, GET or through the transport for bulk payloads,
+        recording its latency and size in the stats."""
+        if bulk:
+            assert self._transport is not None
+            send = partial(self._transport.send, session, url, params, self._timeout)
+        else:
+            send = partial(
+                session.request, "GET", url, params=params, timeout=self._timeout
+            )
+        if not self._stats.enabled:
+            return send()
+        start = perf_counter()
+        response = send()
+        request = response.request
+        # The body may be a stream, then its size isn't known here.
+        body = request.body if isinstance(request.body, (bytes, str)) else b""
+        self._stats.observe_request(
+            perf_counter() - start,
+            len(request.url or "") + len(body),
+            len(response.content),
+        )
+        return response
+
     # fmt: off
     def _request(
         self,
@@ -120,41 +934,52 @@ class SpanglishClient:
 
         Returns:
             str: API response.
+
+        Raises:
+            ValueError: If the service answered with an error, or the
+                response isn't json.
         """
-        url = urljoin(self._spanglish_url, endpoint)
-        with requests.Session() as session:
-            logger.info(f"sending request to url: {url}")
-            response = session.request("GET", url, params=payload)
-            try:
-                return response.json()
-            except Exception as exc:
-                logger.error("Error parsing a request to json")
-                raise ValueError("Unexpected error on the response") from exc
+        logger.info(f"sending request to endpoint: {endpoint}")
+        return _decode(self._get(self.session, endpoint, payload))
 
     def _multi_request(
-        self, endpoint: str, texts: list[str]
+        self,
+        endpoint: str,
+        texts: list[str],
+        on_result: Optional[Callable[[str, str], None]] = None,
     ) -> list[str]:  # pragma: no cover
         """Internal method to deal with the requests.
 
+        The texts are sent concurrently, with at most `max_workers` requests
+        in flight, and the responses are returned in the same order.
+
         Args:
             endpoint (str): Endpoint of the app (`/single` or `/batched`)
-            payload (str): The parameter values of the endpoint.
+            texts (list[str]): The texts to send, one per request.
+            on_result (Optional[Callable[[str, str], None]], optional):
+                Called with each text and its response as soon as it arrives.
 
         Returns:
-            str | list[str]: API response.
+            list[str]: API responses.
+
+        Raises:
+            TranslationError: If any of the pieces fails, with the index
+                of the first failing piece.
 
         Note:
             This method shouldn't be necessary, but there appear some errors
             translating markown texts with multiple headings or a high number
             of symbols through the `/batched` endpoint. For the time being,
-            this would do the trick. Let a single method which uses
-            properly a ThreadPoolExecutor for multiple requests.
+            this would do the trick.
         """
-        url = urljoin(self._spanglish_url, endpoint)
-        with requests.Session() as session:
-            logger.info(f"sending requests to url: {url}")
-            responses = [session.request("GET", url, params={"text": t}) for t in texts]
-            try:
-                return [r.json() for r in responses]
-            except Exception as exc:
-                raise ValueError("Unexpected error on the response") from exc
+        session = self.session
+
+        def fetch(text: str) -> str:
+            return _decode(self._get(session, endpoint, {"text": text}))
+
+        logger.info(f"sending {len(texts)} requests to endpoint: {endpoint}")
+        if on_result is None:
+            return self._run_concurrently(fetch, texts)
+        return self._run_concurrently(
+            fetch, texts, lambda i, result: on_result(texts[i], result)
+        )
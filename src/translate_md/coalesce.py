@@ -0,0 +1,174 @@
+"""Micro-batching of the texts translated one by one from several threads.
+
+Each call to `SpanglishClient.translate` is a request to `/single`. When
+many threads translate short texts at the same time, a `Coalescer` gathers
+them for up to `max_delay` seconds (or until `max_batch` texts are
+waiting) and sends them together in a single call to a batch function,
+i.e. `SpanglishClient.translate_batch` and its request to `/batched`.
+Every caller gets a future resolved with its own translation.
+
+A lone call waits `max_delay` for company, so keep it to a few
+milliseconds: under load the service sees fewer, bigger requests, and the
+throughput grows.
+
+Examples:
+    ```python
+    >>> client = SpanglishClient(coalesce_delay=0.005, coalesce_max_batch=32)
+    >>> with ThreadPoolExecutor(16) as executor:
+    ...     list(executor.map(client.translate, texts))
+    ```
+"""
+
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from time import monotonic
+from typing import Callable, Optional
+
+from translate_md.logger import get_logger
+
+logger = get_logger("coalesce")
+
+BatchFunction = Callable[[list[str]], list[str]]
+
+
+class Coalescer:
+    """Gathers the texts submitted at about the same time in batches.
+
+    A thread starts dispatching the batches with the first text submitted,
+    the batches are sent from a pool of `max_in_flight` threads. While all
+    of them are busy the texts keep waiting, so the batches grow with the
+    load.
+
+    Args:
+        translate_batch (BatchFunction):
+            Translates a list of texts, returning the translations in the
+            same order.
+        max_delay (float, optional):
+            Seconds the first text of a batch waits for more texts.
+            Defaults to 0.005.
+        max_batch (int, optional):
+            Texts per batch, a full batch is sent right away. Defaults to 32.
+        max_in_flight (int, optional):
+            Batches being translated at the same time. Defaults to 4.
+    """
+
+    def __init__(
+        self,
+        translate_batch: BatchFunction,
+        max_delay: float = 0.005,
+        max_batch: int = 32,
+        max_in_flight: int = 4,
+    ) -> None:
+        if max_batch < 1:
+            raise ValueError(f"max_batch must be a positive integer: {max_batch}")
+        self._translate_batch = translate_batch
+        self._max_delay = max_delay
+        self._max_batch = max_batch
+        self._max_in_flight = max_in_flight
+        # Texts waiting, with their future and the time they arrived.
+        self._pending: deque[tuple[str, Future, float]] = deque()
+        self._cond = threading.Condition()
+        self._slots = threading.Semaphore(max_in_flight)
+        self._closing = False
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.batches = 0
+        self.texts = 0
+
+    @property
+    def mean_batch(self) -> float:
+        """Average number of texts per batch sent."""
+        return self.texts / self.batches if self.batches else 0.0
+
+    def submit(self, text: str) -> "Future[str]":
+        """Add a text to the next batch.
+
+        Returns:
+            Future[str]: Resolved with the translation, or the exception
+                raised translating the batch.
+        """
+        future: Future[str] = Future()
+        with self._cond:
+            self._pending.append((text, future, monotonic()))
+            if self._thread is None:
+                self._start()
+            # The first text starts the delay, a full batch ends it.
+            if len(self._pending) in (1, self._max_batch):
+                self._cond.notify()
+        return future
+
+    def translate(self, text: str) -> str:
+        """Translate a text along with the others submitted meanwhile."""
+        return self.submit(text).result()
+
+    def close(self) -> None:
+        """Send the texts waiting and wait for their batches.
+
+        The coalescer can still be used afterwards, submitting a text
+        starts it again.
+        """
+        with self._cond:
+            thread, executor = self._thread, self._executor
+            if thread is None:
+                return
+            self._closing = True
+            self._cond.notify()
+        thread.join()
+        executor.shutdown(wait=True)  # type: ignore[union-attr]
+        with self._cond:
+            self._closing = False
+            self._thread = self._executor = None
+            # Texts submitted after the thread sent the last batch.
+            if self._pending:
+                self._start()
+
+    def _start(self) -> None:
+        self._executor = ThreadPoolExecutor(
+            self._max_in_flight, thread_name_prefix="coalescer"
+        )
+        self._thread = threading.Thread(target=self._dispatch, daemon=True)
+        self._thread.start()
+
+    def _dispatch(self) -> None:
+        while True:
+            self._slots.acquire()
+            with self._cond:
+                while not self._pending and not self._closing:
+                    self._cond.wait()
+                if not self._pending:
+                    self._slots.release()
+                    return
+                deadline = self._pending[0][2] + self._max_delay
+                while len(self._pending) < self._max_batch and not self._closing:
+                    remaining = deadline - monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                size = min(len(self._pending), self._max_batch)
+                batch = [self._pending.popleft() for _ in range(size)]
+                self.batches += 1
+                self.texts += size
+                executor = self._executor
+            executor.submit(self._send, batch)  # type: ignore[union-attr]
+
+    def _send(self, batch: list[tuple[str, Future, float]]) -> None:
+        texts = [text for text, _, _ in batch]
+        try:
+            translations = self._translate_batch(texts)
+            if len(translations) != len(texts):
+                raise ValueError(
+                    f"expected {len(texts)} texts, got {len(translations)}"
+                )
+        except Exception as exc:
+            logger.error(f"batch of {len(texts)} texts failed: {exc}")
+            for _, future, _ in batch:
+                future.set_exception(exc)
+            return
+        finally:
+            self._slots.release()
+        for (_, future, _), translation in zip(batch, translations):
+            future.set_result(translation)
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"(batches={self.batches}, texts={self.texts})"
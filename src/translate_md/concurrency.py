@@ -0,0 +1,149 @@
+"""Adaptive limit of the requests in flight to the service.
+
+Spanglish runs a model on a finite box: past some number of parallel
+requests its latency grows while the throughput stays flat. A
+`ConcurrencyLimiter` looks for that number with AIMD (additive increase,
+multiplicative decrease), as TCP does with its congestion window:
+
+- Every response under `target_latency`, while the limit is in use,
+  grows the limit by `1 / limit`, that is, by one per round of requests.
+- A response over `target_latency`, a 429 or a 503 shrinks the limit by
+  `decrease` (at most once per round). 429 and 503 also pause the
+  requests for the time given in their `Retry-After` header, or the
+  backoff of the client.
+
+Examples:
+    ```python
+    >>> limiter = ConcurrencyLimiter(max_limit=32, target_latency=0.5)
+    >>> client = SpanglishClient(max_workers=32, limiter=limiter)
+    >>> client.translate_file(filename)
+    >>> client.concurrency_limit
+    11
+    ```
+"""
+
+import email.utils
+import threading
+from time import monotonic, time
+from typing import Optional
+
+# Status codes of an overloaded service, retried after a pause.
+OVERLOAD_STATUS = (429, 503)
+
+
+def retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from the value of a `Retry-After` header, either
+    a number of seconds or an HTTP date. None if missing or invalid."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, date.timestamp() - time())
+
+
+class ConcurrencyLimiter:
+    """Limit of requests in flight that adapts to the latency of the service.
+
+    It can be shared by all the threads sending requests, `acquire` blocks
+    while the limit is reached or the requests are paused.
+
+    Args:
+        initial (int, optional): Starting limit. Defaults to 4.
+        min_limit (int, optional): Lowest limit. Defaults to 1.
+        max_limit (int, optional): Highest limit. Defaults to 32.
+        target_latency (float, optional):
+            Seconds a response may take before the limit is decreased.
+            Defaults to 1.
+        decrease (float, optional):
+            Factor applied to the limit on overload. Defaults to 0.5.
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        target_latency: float = 1.0,
+        decrease: float = 0.5,
+    ) -> None:
+        if not 1 <= min_limit <= initial <= max_limit:
+            raise ValueError(
+                "expected 1 <= min_limit <= initial <= max_limit, got "
+                f"{min_limit}, {initial}, {max_limit}"
+            )
+        if not 0 < decrease < 1:
+            raise ValueError(f"decrease must be between 0 and 1: {decrease}")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self._decrease = decrease
+        self._limit = float(initial)
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        """Current number of requests allowed in flight."""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        """Requests sent and not answered yet."""
+        return self._in_flight
+
+    def acquire(self) -> float:
+        """Wait for a free slot.
+
+        Returns:
+            float: Time the slot was taken, to pass to `release`.
+        """
+        with self._cond:
+            while True:
+                pause = self._paused_until - monotonic()
+                if pause > 0:
+                    self._cond.wait(pause)
+                elif self._in_flight < int(self._limit):
+                    break
+                else:
+                    self._cond.wait()
+            self._in_flight += 1
+        return monotonic()
+
+    def release(
+        self, start: float, overloaded: bool = False, pause: Optional[float] = None
+    ) -> None:
+        """Free a slot, adjusting the limit with the outcome of the request.
+
+        Args:
+            start (float): Value returned by `acquire`.
+            overloaded (bool, optional):
+                The service rejected the request (429, 503) or it failed.
+                Defaults to False.
+            pause (Optional[float], optional):
+                Seconds to wait before sending more requests. Defaults to None.
+        """
+        now = monotonic()
+        with self._cond:
+            saturated = self._in_flight >= int(self._limit)
+            self._in_flight -= 1
+            if overloaded or now - start > self.target_latency:
+                # Requests sent before the previous decrease saw the old limit.
+                if start >= self._last_decrease:
+                    self._limit = max(self.min_limit, self._limit * self._decrease)
+                    self._last_decrease = now
+            elif saturated:
+                self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+            if pause:
+                self._paused_until = max(self._paused_until, now + pause)
+            self._cond.notify_all()
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"(limit={self.limit}, in_flight={self.in_flight})"
@@ -0,0 +1,293 @@
+"""Daemon translating the jobs of the CLI with a client kept warm.
+
+Each run of `translate-md` pays for importing its dependencies, opening
+new connections to the service and starting with empty caches, which
+takes longer than translating a small post. `translate-md serve` starts
+a `Daemon` that keeps a single `SpanglishClient` (its session, cache of
+translations and parse cache) and accepts jobs over a Unix socket. While
+it runs, `translate-md` sends its jobs to it (see
+`translate_md.daemon_client`) instead of translating them itself.
+
+The files of the jobs are translated by a `Scheduler`, a few at a time,
+in order of priority: a single file (i.e. a post saved from the editor)
+is interactive and goes before the files of the bulk jobs still waiting,
+even if they were sent before.
+
+Examples:
+    ```python
+    >>> with SpanglishClient(cache=LRUCache()) as client:
+    ...     Daemon(client).serve_forever()
+    ```
+"""
+
+import itertools
+import math
+import os
+import queue
+import socketserver
+import threading
+from concurrent.futures import Future, as_completed
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable, Optional
+
+from translate_md.batch import BatchTranslator
+from translate_md.client import SpanglishClient
+from translate_md.daemon_client import (
+    DaemonClient,
+    default_socket_path,
+    read_message,
+    write_message,
+)
+from translate_md.errors import DaemonError
+from translate_md.logger import get_logger
+
+logger = get_logger("daemon")
+
+# Priorities of the files of the jobs, lower first.
+INTERACTIVE = 0
+BULK = 10
+
+Event = dict[str, Any]
+
+
+class Scheduler:
+    """Runs tasks in a few threads, lower priorities first and in order of
+    arrival for the same priority.
+
+    Args:
+        workers (int, optional): Tasks run at the same time. Defaults to 2.
+    """
+
+    def __init__(self, workers: int = 2) -> None:
+        if workers < 1:
+            raise ValueError(f"workers must be a positive integer: {workers}")
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        self._counter = itertools.count()
+        self._threads = [
+            threading.Thread(target=self._work, name=f"scheduler-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(
+        self, priority: int, func: Callable[..., Any], *args: Any, **kwargs: Any
+    ) -> Future:
+        """Schedule a call, returning the future of its result."""
+        future: Future = Future()
+        self._queue.put((priority, next(self._counter), future, func, args, kwargs))
+        return future
+
+    @property
+    def pending(self) -> int:
+        """Tasks waiting to run."""
+        return self._queue.qsize()
+
+    def close(self) -> None:
+        """Run the tasks pending and stop the threads."""
+        for _ in self._threads:
+            self._queue.put((math.inf, next(self._counter), None, None, (), {}))
+        for thread in self._threads:
+            thread.join()
+
+    def _work(self) -> None:
+        while True:
+            _, _, future, func, args, kwargs = self._queue.get()
+            if future is None:
+                return
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func(*args, **kwargs))
+            except BaseException as exc:
+                future.set_exception(exc)
+
+
+def _timed_translate(client: SpanglishClient, filename: Path, **kwargs: Any) -> float:
+    start = perf_counter()
+    client.translate_file(filename, **kwargs)
+    return perf_counter() - start
+
+
+class Daemon:
+    """Serves the jobs sent by `DaemonClient` with a single client.
+
+    Args:
+        client (SpanglishClient): Client translating the files, the caller
+            closes it once the daemon stops.
+        socket_path (Optional[Path], optional): Socket to listen to.
+            Defaults to None, `default_socket_path()`.
+        jobs (int, optional): Files translated at the same time.
+            Defaults to 2.
+        options (Optional[dict[str, Any]], optional):
+            Configuration of the client, jobs expecting a different one
+            are rejected (the CLI then runs them by itself). Defaults to
+            None, every job is accepted.
+
+    Raises:
+        DaemonError: If no socket is given and the default one isn't safe,
+            see `default_socket_path`.
+    """
+
+    def __init__(
+        self,
+        client: SpanglishClient,
+        socket_path: Optional[Path] = None,
+        jobs: int = 2,
+        options: Optional[dict[str, Any]] = None,
+    ) -> None:
+        self._client = client
+        self.socket_path = socket_path or default_socket_path()
+        self._jobs = jobs
+        self._options = options
+        self._scheduler: Optional[Scheduler] = None
+        self._server: Optional[socketserver.UnixStreamServer] = None
+        self._ready = threading.Event()
+
+    def serve_forever(self) -> None:
+        """Listen to the socket until `shutdown` is called or requested.
+
+        Raises:
+            DaemonError: If another daemon is listening to the socket.
+        """
+        if self.socket_path.exists():
+            if DaemonClient(self.socket_path).is_running():
+                raise DaemonError(f"a daemon is already listening: {self.socket_path}")
+            self.socket_path.unlink()  # Left by a daemon that died.
+        # Only the user can connect, from the moment the socket exists.
+        umask = os.umask(0o177)
+        try:
+            self._server = _Server(str(self.socket_path), _Handler)
+        finally:
+            os.umask(umask)
+        self._server.owner = self  # type: ignore[attr-defined]
+        self._scheduler = Scheduler(self._jobs)
+        logger.info(f"listening in {self.socket_path}")
+        self._ready.set()
+        try:
+            self._server.serve_forever(poll_interval=0.2)
+        finally:
+            self._server.server_close()
+            self._scheduler.close()
+            self._scheduler = None
+            self.socket_path.unlink(missing_ok=True)
+            self._ready.clear()
+            logger.info("daemon stopped")
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the daemon listens, for a daemon run in a thread."""
+        return self._ready.wait(timeout)
+
+    def shutdown(self) -> None:
+        """Stop serving, from another thread than `serve_forever`."""
+        if self._server is not None:
+            self._server.shutdown()
+
+    def handle(self, message: Any, send: Callable[[Event], None]) -> None:
+        """Answer a request, sending the events of its job. An invalid
+        request is answered with an error."""
+        if not isinstance(message, dict):
+            send({"error": "invalid request: expected a json object"})
+            return
+        command = message.get("command")
+        if self._scheduler is None:
+            send({"error": "the daemon isn't serving"})
+        elif command == "ping":
+            send({"ok": True, "pid": os.getpid(), "pending": self._scheduler.pending})
+        elif command == "translate":
+            self._translate(message, send)
+        elif command == "shutdown":
+            send({"ok": True})
+            threading.Thread(target=self.shutdown).start()
+        else:
+            send({"error": f"unknown command: {command!r}"})
+
+    def _translate(self, message: Event, send: Callable[[Event], None]) -> None:
+        if not (
+            isinstance(message.get("cwd"), str)
+            and isinstance(message.get("paths"), list)
+            and all(isinstance(p, str) for p in message["paths"])
+            and isinstance(message.get("new_filename"), (str, type(None)))
+        ):
+            send({"error": "invalid request: translate needs a cwd and paths"})
+            return
+        options = message.get("options")
+        if None not in (options, self._options) and options != self._options:
+            send({"error": f"the daemon's client is configured as {self._options}"})
+            return
+        start = perf_counter()
+        cwd = Path(message["cwd"])
+        paths = [cwd / p for p in message["paths"]]
+        new_filename = message.get("new_filename")
+        kwargs = {
+            "new_filename": None if new_filename is None else cwd / new_filename,
+            "incremental": message.get("incremental", False),
+            "stream": message.get("stream", False),
+        }
+        if len(paths) == 1 and paths[0].is_file():
+            files, skipped = paths, 0
+        elif kwargs["new_filename"] is not None or kwargs["stream"]:
+            send({"error": "new_filename and stream require a single file"})
+            return
+        else:
+            force = message.get("force", False)
+            files, skipped = BatchTranslator(self._client, force=force).pending(paths)
+        priority = INTERACTIVE if message.get("interactive") else BULK
+        logger.info(f"job of {len(files)} files with priority {priority}")
+
+        submit = self._scheduler.submit  # type: ignore[union-attr]
+        futures = {
+            submit(priority, _timed_translate, self._client, f, **kwargs): f
+            for f in files
+        }
+        failed = 0
+        try:
+            for future in as_completed(futures):
+                filename = futures[future]
+                try:
+                    seconds = future.result()
+                except Exception as exc:
+                    logger.error(f"couldn't translate {filename}: {exc!r}")
+                    failed += 1
+                    send({"file": str(filename), "error": repr(exc)})
+                else:
+                    send({"file": str(filename), "seconds": round(seconds, 3)})
+        except OSError:
+            # The client went away, its files still waiting are dropped.
+            for future in futures:
+                future.cancel()
+            raise
+        send(
+            {
+                "done": True,
+                "files": len(files) - failed,
+                "skipped": skipped,
+                "failed": failed,
+                "seconds": round(perf_counter() - start, 3),
+            }
+        )
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"({self.socket_path}, jobs={self._jobs})"
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        try:
+            message = read_message(self.rfile)
+        except ValueError as exc:
+            write_message(self.wfile, {"error": f"invalid request: {exc}"})
+            return
+        if message is None:
+            return
+        try:
+            self.server.owner.handle(  # type: ignore[attr-defined]
+                message, lambda event: write_message(self.wfile, event)
+            )
+        except OSError:
+            logger.info("client disconnected")
@@ -0,0 +1,232 @@
+"""Client of the `translate-md serve` daemon.
+
+The daemon and its clients talk over a Unix socket, a json line per
+message: the client sends a request and the daemon answers with a line
+per event, the last one with `"done": true`. Only the standard library
+is imported here, so the CLI connects to the daemon without paying for
+the imports of requests, markdown-it or mdformat.
+
+Examples:
+    ```python
+    >>> daemon = DaemonClient()
+    >>> if daemon.is_running():
+    ...     for event in daemon.translate([Path("content/posts/post.md")]):
+    ...         print(event)
+    {'file': '/home/me/content/posts/post.md', 'seconds': 0.08}
+    {'done': True, 'files': 1, 'skipped': 0, 'failed': 0, 'seconds': 0.08}
+    ```
+"""
+
+import json
+import os
+import socket
+import stat
+import tempfile
+from pathlib import Path
+from typing import Any, Generator, Iterator, Optional, Protocol
+
+from translate_md.errors import DaemonError
+
+SOCKET_ENVVAR = "TRANSLATE_MD_SOCKET"
+
+
+def default_socket_path() -> Path:
+    """Socket of the daemon.
+
+    `$TRANSLATE_MD_SOCKET` if set, else a file in `$XDG_RUNTIME_DIR`, else
+    a file in a directory of the user in the temporary directory, created
+    private. The temporary directory is shared, so that directory must be
+    owned by the user and reachable by nobody else.
+
+    Raises:
+        DaemonError: If the directory of the user isn't safe, i.e. someone
+            else created it first.
+    """
+    path = os.environ.get(SOCKET_ENVVAR)
+    if path:
+        return Path(path)
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return Path(runtime_dir) / "translate-md.sock"
+    directory = Path(tempfile.gettempdir()) / f"translate-md-{os.getuid()}"
+    try:
+        directory.mkdir(mode=0o700)
+    except FileExistsError:
+        pass
+    info = directory.lstat()
+    if (
+        not stat.S_ISDIR(info.st_mode)
+        or info.st_uid != os.getuid()
+        or info.st_mode & 0o077
+    ):
+        raise DaemonError(f"unsafe directory for the socket: {directory}")
+    return directory / "daemon.sock"
+
+
+def client_options(
+    url: list[str],
+    workers: int,
+    batch_chars: Optional[int],
+    post: bool,
+    compression: Optional[str],
+    mask: bool,
+    parse_cache: Optional[Path],
+) -> dict[str, Any]:
+    """Options of the CLI configuring the client, a job is only sent to a
+    daemon whose client was started with the same ones."""
+    return {
+        "url": list(url),
+        "workers": workers,
+        "batch_chars": batch_chars,
+        "post": post or compression is not None,
+        "compression": compression,
+        "mask": mask,
+        "parse_cache": None if parse_cache is None else str(parse_cache.resolve()),
+    }
+
+
+class MessageStream(Protocol):
+    """Binary file of a connection, i.e. made by `socket.makefile`."""
+
+    def readline(self) -> bytes: ...
+
+    def write(self, data: bytes, /) -> Any: ...
+
+    def flush(self) -> Any: ...
+
+
+def write_message(f: MessageStream, message: dict[str, Any]) -> None:
+    f.write(json.dumps(message).encode("utf-8") + b"\n")
+    f.flush()
+
+
+def read_message(f: MessageStream) -> Optional[Any]:
+    """Next message, or None if the connection was closed. The message
+    may be any json value but null, the daemon validates the requests.
+
+    Raises:
+        ValueError: If the line isn't json, or is null.
+    """
+    line = f.readline()
+    if not line:
+        return None
+    message = json.loads(line)
+    if message is None:
+        raise ValueError("null message")
+    return message
+
+
+class DaemonClient:
+    """Sends jobs to a running daemon.
+
+    Args:
+        socket_path (Optional[Path], optional): Socket of the daemon.
+            Defaults to None, `default_socket_path()`.
+        timeout (float, optional): Seconds to wait for the connection.
+            The jobs themselves can take any time. Defaults to 1.0.
+    """
+
+    def __init__(
+        self, socket_path: Optional[Path] = None, timeout: float = 1.0
+    ) -> None:
+        self.socket_path = socket_path or default_socket_path()
+        self._timeout = timeout
+
+    def is_running(self) -> bool:
+        """Check if a daemon answers in the socket."""
+        try:
+            answer = self.request({"command": "ping"}, timeout=self._timeout)
+        except (OSError, ValueError):
+            return False
+        return answer.get("ok", False)
+
+    def request(
+        self, message: dict[str, Any], timeout: Optional[float] = None
+    ) -> dict[str, Any]:
+        """Send a request answered with a single message."""
+        events = self._events(message, timeout)
+        try:
+            return next(events)
+        except StopIteration:
+            raise DaemonError("the daemon closed the connection") from None
+        finally:
+            events.close()
+
+    def translate(
+        self,
+        paths: list[Path],
+        new_filename: Optional[Path] = None,
+        incremental: bool = False,
+        stream: bool = False,
+        force: bool = False,
+        interactive: Optional[bool] = None,
+        options: Optional[dict[str, Any]] = None,
+    ) -> Iterator[dict[str, Any]]:
+        """Translate files in the daemon, as `translate-md translate`.
+
+        Args:
+            paths (list[Path]): Files, directories or glob patterns, the
+                relative ones from the current directory.
+            new_filename (Optional[Path], optional): Name of the translation
+                of a single file. Defaults to None.
+            incremental (bool, optional): Only send the pieces edited.
+            stream (bool, optional): Write a single file section by section.
+            force (bool, optional): Translate the files up to date too.
+            interactive (Optional[bool], optional): Run ahead of the bulk
+                jobs. Defaults to None, True for a single file.
+            options (Optional[dict[str, Any]], optional): Configuration of
+                the client expected, the daemon rejects the job if its
+                client was configured differently. Defaults to None.
+
+        Yields:
+            dict[str, Any]: An event per file translated (`file`, `seconds`
+                and the `error` if it failed), and a last one with
+                `"done": true` and the counts of files.
+
+        Raises:
+            DaemonError: If the daemon rejected the job.
+        """
+        if interactive is None:
+            interactive = len(paths) == 1 and Path(paths[0]).is_file()
+        message = {
+            "command": "translate",
+            "cwd": os.getcwd(),
+            "paths": [str(p) for p in paths],
+            "new_filename": None if new_filename is None else str(new_filename),
+            "incremental": incremental,
+            "stream": stream,
+            "force": force,
+            "interactive": interactive,
+            "options": options,
+        }
+        done = False
+        for event in self._events(message):
+            if "error" in event and "file" not in event:
+                raise DaemonError(event["error"])
+            done = bool(event.get("done"))
+            yield event
+        if not done:
+            raise DaemonError("the daemon closed the connection")
+
+    def shutdown(self) -> None:
+        """Stop the daemon once the jobs in progress finish."""
+        self.request({"command": "shutdown"})
+
+    def _events(
+        self, message: dict[str, Any], timeout: Optional[float] = None
+    ) -> Generator[dict[str, Any], None, None]:
+        """Answers to a request, waiting up to `timeout` seconds for each."""
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self._timeout)
+            sock.connect(str(self.socket_path))
+            sock.settimeout(timeout)
+            with sock.makefile("rwb") as f:
+                write_message(f, message)
+                while True:
+                    event = read_message(f)
+                    if event is None:
+                        return
+                    yield event
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"({self.socket_path})"
@@ -0,0 +1,99 @@
+"""Deduplication of the pieces sent to the service.
+
+Headings like "Table of contents", notes or list items are repeated
+within a document and across the documents of a site. A `Deduplicator`
+sends each unique text once, and shares its translation with every
+position (and every file) where it appears.
+"""
+
+import threading
+from concurrent.futures import Future
+from typing import Callable
+
+from translate_md.errors import TranslationError
+
+
+class Deduplicator:
+    """Translations shared among the calls made through it.
+
+    It can be used by several threads at once, i.e. for the files of a
+    batch run: a text already sent by another thread isn't sent again,
+    its translation is awaited instead.
+
+    Attributes:
+        total (int): Number of pieces seen.
+        unique (int): Number of pieces actually sent to translate.
+
+    Examples:
+        ```python
+        >>> dedup = Deduplicator()
+        >>> dedup.translate(["Note:", "text", "Note:"], client._translate_unique)
+        ['Nota:', 'texto', 'Nota:']
+        >>> dedup.ratio
+        1.5
+        ```
+    """
+
+    def __init__(self) -> None:
+        self._translations: dict[str, Future[str]] = {}
+        self._lock = threading.Lock()
+        self.total = 0
+        self.unique = 0
+
+    @property
+    def ratio(self) -> float:
+        """Pieces seen per piece sent, 1 means there were no duplicates."""
+        return self.total / self.unique if self.unique else 1.0
+
+    def translate(
+        self, pieces: list[str], translate: Callable[[list[str]], list[str]]
+    ) -> list[str]:
+        """Translate the pieces sending only those not seen before.
+
+        Args:
+            pieces (list[str]): Texts to translate.
+            translate (Callable[[list[str]], list[str]]):
+                Function sending a list of unique texts to the service.
+
+        Returns:
+            list[str]: A translation per piece, in the same order.
+
+        Raises:
+            TranslationError: With the index of the first piece
+                that couldn't be translated.
+        """
+        own: list[str] = []
+        with self._lock:
+            for piece in dict.fromkeys(pieces):
+                if piece not in self._translations:
+                    self._translations[piece] = Future()
+                    own.append(piece)
+            futures = [self._translations[p] for p in pieces]
+            self.total += len(pieces)
+            self.unique += len(own)
+
+        if own:
+            try:
+                translations = translate(own)
+            except BaseException as exc:
+                with self._lock:
+                    # Let the following calls try these pieces again.
+                    for piece in own:
+                        self._translations.pop(piece).set_exception(exc)
+                if isinstance(exc, TranslationError):
+                    index = pieces.index(own[exc.index])
+                    raise TranslationError(index, exc.message) from exc
+                raise
+            for piece, translation in zip(own, translations):
+                self._translations[piece].set_result(translation)
+
+        results = []
+        for i, future in enumerate(futures):
+            try:
+                results.append(future.result())
+            except Exception as exc:
+                raise TranslationError(i, "Failed in another request") from exc
+        return results
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"(total={self.total}, unique={self.unique})"
@@ -0,0 +1,146 @@
+"""Balancing of the requests among several replicas of spanglish.
+
+Each request goes to the replica with the fewest requests in flight
+(least outstanding requests), so a slow replica gets less work. A
+replica failing `eject_after` requests in a row is ejected for a while,
+doubling the time on every new ejection. Once the time is over it gets
+requests again, and the first failure ejects it again while the first
+success re-admits it for good.
+
+Examples:
+    ```python
+    >>> pool = EndpointPool(["http://box1:8000/", "http://box2:8000/"])
+    >>> endpoint = pool.acquire()
+    >>> endpoint
+    Endpoint(url='http://box1:8000/', outstanding=1, failures=0)
+    >>> pool.release(endpoint, ok=True)
+    ```
+"""
+
+import threading
+from dataclasses import dataclass, field
+from time import monotonic
+from typing import Collection, Iterable
+
+from translate_md.logger import get_logger
+
+logger = get_logger("endpoints")
+
+
+@dataclass(eq=False)
+class Endpoint:
+    """A replica of spanglish.
+
+    Attributes:
+        url (str): Base url of the replica.
+        outstanding (int): Requests in flight.
+        failures (int): Consecutive failed requests.
+        requests (int): Requests sent in total.
+        ejections (int): Consecutive times it was ejected.
+        ejected_until (float): Monotonic time until which it doesn't get requests.
+    """
+
+    url: str
+    outstanding: int = 0
+    failures: int = 0
+    requests: int = field(default=0, repr=False)
+    ejections: int = field(default=0, repr=False)
+    ejected_until: float = field(default=0.0, repr=False)
+
+    @property
+    def admitted(self) -> bool:
+        """Whether it can get requests."""
+        return self.ejected_until <= monotonic()
+
+
+class EndpointPool:
+    """Replicas of the service, shared by the threads sending requests.
+
+    Args:
+        urls (Iterable[str]): Base url of each replica.
+        eject_after (int, optional):
+            Consecutive failures that eject a replica. Defaults to 3.
+        eject_seconds (float, optional):
+            Time a replica is ejected the first time, it's doubled on
+            each ejection in a row. Defaults to 5.
+        max_eject_seconds (float, optional):
+            Maximum time a replica is ejected. Defaults to 60.
+    """
+
+    def __init__(
+        self,
+        urls: Iterable[str],
+        eject_after: int = 3,
+        eject_seconds: float = 5.0,
+        max_eject_seconds: float = 60.0,
+    ) -> None:
+        self.endpoints = [Endpoint(url) for url in dict.fromkeys(urls)]
+        if not self.endpoints:
+            raise ValueError("at least one url is needed")
+        self._eject_after = eject_after
+        self._eject_seconds = eject_seconds
+        self._max_eject_seconds = max_eject_seconds
+        self._lock = threading.Lock()
+
+    @property
+    def urls(self) -> list[str]:
+        return [e.url for e in self.endpoints]
+
+    def acquire(self, exclude: Collection[Endpoint] = ()) -> Endpoint:
+        """Choose the replica for a request, counting it as in flight.
+
+        Args:
+            exclude (Collection[Endpoint], optional):
+                Replicas to avoid, i.e. those that already failed this
+                request. They are chosen anyway if no other replica is
+                admitted.
+
+        Returns:
+            Endpoint: Admitted replica with the fewest requests in flight.
+        """
+        with self._lock:
+            candidates = (
+                [e for e in self.endpoints if e.admitted and e not in exclude]
+                or [e for e in self.endpoints if e not in exclude]
+                or self.endpoints
+            )
+            endpoint = min(candidates, key=lambda e: (e.outstanding, e.requests))
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def release(self, endpoint: Endpoint, ok: bool) -> None:
+        """Count a request as finished, with its outcome."""
+        with self._lock:
+            endpoint.outstanding -= 1
+            self._report(endpoint, ok)
+
+    def report(self, endpoint: Endpoint, ok: bool) -> None:
+        """Update the health of a replica, i.e. after a health check."""
+        with self._lock:
+            self._report(endpoint, ok)
+
+    def _report(self, endpoint: Endpoint, ok: bool) -> None:
+        if ok:
+            if endpoint.ejections:
+                logger.info(f"replica re-admitted: {endpoint.url}")
+            endpoint.failures = endpoint.ejections = 0
+            endpoint.ejected_until = 0.0
+            return
+        if not endpoint.admitted:
+            return  # Requests sent before its ejection.
+        endpoint.failures += 1
+        if endpoint.failures >= self._eject_after or endpoint.ejections:
+            seconds = min(
+                self._max_eject_seconds, self._eject_seconds * 2**endpoint.ejections
+            )
+            endpoint.ejections += 1
+            endpoint.failures = 0
+            endpoint.ejected_until = monotonic() + seconds
+            logger.warning(f"replica ejected for {seconds:.1f}s: {endpoint.url}")
+
+    def __len__(self) -> int:
+        return len(self.endpoints)
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"({self.urls})"
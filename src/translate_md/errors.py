@@ -0,0 +1,34 @@
+"""Errors raised by translate-md. """
+
+
+class TranslationError(ValueError):
+    """Error raised when a single piece of a multi request couldn't be translated.
+
+    Args:
+        index (int): Position of the piece in the list of texts sent.
+        message (str): Description of the error.
+    """
+
+    def __init__(self, index: int, message: str) -> None:
+        super().__init__(f"piece {index}: {message}")
+        self.index = index
+        self.message = message
+
+
+class InvalidRecordError(ValueError):
+    """Error raised when a line of a JSONL file of pieces can't be read.
+
+    Args:
+        line (int): Number of the line, starting at 1.
+        message (str): Description of the error.
+    """
+
+    def __init__(self, line: int, message: str) -> None:
+        super().__init__(f"invalid record in line {line}: {message}")
+        self.line = line
+        self.message = message
+
+
+class DaemonError(ValueError):
+    """Error raised when the daemon rejects a job or goes away, or its
+    socket isn't safe to use."""
@@ -0,0 +1,155 @@
+"""Append-only journal of the pieces translated, to resume a job.
+
+Each piece translated is appended to the journal as soon as its response
+arrives, as a json line with the file, the index of the piece, the hash
+of its text and the translation. When a file is written, a line marks
+it as finished and its pieces are dropped. If the run dies halfway, the
+next one (with the same journal) only sends the pieces that weren't
+translated yet.
+
+Examples:
+    ```python
+    >>> with Journal(Path(".translate-md.journal")) as journal:
+    ...     client = SpanglishClient(journal=journal)
+    ...     BatchTranslator(client).run([Path("content")])
+    ```
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import IO, Any, Optional
+
+from translate_md.logger import get_logger
+from translate_md.manifest import piece_hash
+
+logger = get_logger("journal")
+
+
+def _key(filename: Path) -> str:
+    """Files are journaled by absolute path, to resume from any directory."""
+    return str(filename.resolve())
+
+
+class Journal:
+    """Translations of the pieces of unfinished files, persisted on disk.
+
+    The journal is read when opened; files marked as finished are
+    dropped, rewriting the journal without them. It can be shared by
+    several threads.
+
+    Args:
+        path (Path): File of the journal, created if it doesn't exist.
+        fsync (bool, optional):
+            Force every line to the disk, to survive a crash of the system
+            and not only of the process. Defaults to False.
+    """
+
+    def __init__(self, path: Path, fsync: bool = False) -> None:
+        self.path = path
+        self._fsync = fsync
+        self._lock = threading.Lock()
+        # Index and translation of the pieces by file and hash of the text.
+        self._pieces: dict[str, dict[str, tuple[int, str]]] = {}
+        self._file: Optional[IO[str]] = None
+        self._load()
+
+    def get(self, filename: Path, text: str) -> Optional[str]:
+        """Translation of a piece of a file, if it was journaled."""
+        entry = self._pieces.get(_key(filename), {}).get(piece_hash(text))
+        return None if entry is None else entry[1]
+
+    def record(self, filename: Path, index: int, text: str, translation: str) -> None:
+        """Append the translation of a piece, unless it's already journaled.
+
+        Args:
+            filename (Path): Original markdown file.
+            index (int): Position of the piece in the file.
+            text (str): Text of the piece.
+            translation (str): Its translation.
+        """
+        key, digest = _key(filename), piece_hash(text)
+        with self._lock:
+            pieces = self._pieces.setdefault(key, {})
+            if pieces.get(digest, (None, None))[1] == translation:
+                return
+            pieces[digest] = (index, translation)
+            entry = {"file": key, "index": index, "hash": digest}
+            self._write({**entry, "translation": translation})
+
+    def finish(self, filename: Path) -> None:
+        """Mark a file as written, its pieces aren't needed anymore."""
+        key = _key(filename)
+        with self._lock:
+            if self._pieces.pop(key, None) is not None:
+                self._write({"file": key, "done": True})
+
+    def pending(self) -> dict[str, int]:
+        """Number of pieces journaled per unfinished file."""
+        return {f: len(p) for f, p in self._pieces.items()}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self) -> "Journal":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"({self.path}, files={len(self._pieces)})"
+
+    def _load(self) -> None:
+        finished, damaged = 0, False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        entry = None
+                    if entry is None or not line.endswith("\n"):
+                        # The last line may be cut short by a crash, it's
+                        # rewritten so the next lines don't follow it.
+                        damaged = True
+                        continue
+                    if entry.get("done"):
+                        finished += 1
+                        self._pieces.pop(entry["file"], None)
+                    else:
+                        pieces = self._pieces.setdefault(entry["file"], {})
+                        pieces[entry["hash"]] = (entry["index"], entry["translation"])
+        except FileNotFoundError:
+            return
+        if self._pieces:
+            logger.info(f"resuming {len(self._pieces)} files from {self.path}")
+        if finished or damaged:
+            self._compact()
+
+    def _compact(self) -> None:
+        """Rewrite the journal with the pieces of the unfinished files only."""
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for filename, pieces in self._pieces.items():
+                for digest, (index, translation) in pieces.items():
+                    entry = {
+                        "file": filename,
+                        "index": index,
+                        "hash": digest,
+                        "translation": translation,
+                    }
+                    f.write(json.dumps(entry) + "\n")
+        os.replace(tmp, self.path)
+
+    def _write(self, entry: dict[str, Any]) -> None:
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        if self._fsync:
+            os.fsync(self._file.fileno())
@@ -1,5 +1,11 @@
-"""Simple logging facilities for the client. """
+"""Simple logging facilities for the client.
 
+The library only creates its loggers, the handlers are set up by the
+CLI calling `configure_logging`, so importing translate_md doesn't
+change the logging configuration of the application using it.
+"""
+
+import copy
 import logging
 import logging.config
 
@@ -40,7 +46,25 @@ CONFIG = {
     },
 }
 
-logging.config.dictConfig(CONFIG)
+
+def configure_logging(level: str = "INFO", stream: str = "stdout") -> None:
+    """Send the logs to stdout (or stderr) with the format of the CLI.
+
+    Args:
+        level (str, optional): Minimum level of the messages shown.
+            Defaults to "INFO".
+        stream (str, optional): "stdout" or "stderr", the latter for the
+            commands writing their output to stdout. Defaults to "stdout".
+    """
+    if stream not in ("stdout", "stderr"):
+        raise ValueError(f"stream must be stdout or stderr: {stream}")
+    config = copy.deepcopy(CONFIG)
+    # The loggers of the modules already imported must keep working.
+    config["disable_existing_loggers"] = False
+    config["handlers"]["default"]["level"] = level  # type: ignore[index]
+    config["handlers"]["default"]["stream"] = f"ext://sys.{stream}"  # type: ignore[index]
+    config["loggers"][""]["level"] = level  # type: ignore[index]
+    logging.config.dictConfig(config)
 
 
 def get_logger(name: str = "client") -> logging.Logger:
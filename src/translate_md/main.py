@@ -1,32 +1,428 @@
-"""Command Line Application for translate-md. """
+"""Command Line Application for translate-md.
+
+Only typer is imported at startup, the rest of the modules (and their
+dependencies: requests, markdown-it, mdformat, rich) are imported when a
+command needs them, so `--help` or a mistyped option answer fast.
+
+The first argument not being a command runs `translate`, so
+`translate-md content/` keeps working as before the subcommands.
+"""
 
 from pathlib import Path
-from typing import Optional
+from typing import Annotated, List, Optional
 
 import typer
-from rich.progress import Progress
+from typer.core import TyperGroup
 
-from .client import SpanglishClient
+from .logger import configure_logging
 
-app = typer.Typer()
 
+class DefaultCommandGroup(TyperGroup):
+    """Group of commands falling back to `translate` when the first
+    argument isn't the name of a command."""
 
-@app.command()
+    default_command = "translate"
+
+    def parse_args(self, ctx, args: List[str]) -> List[str]:
+        if args and args[0] not in self.commands and not _is_group_option(ctx, args[0]):
+            args = [self.default_command, *args]
+        return super().parse_args(ctx, args)
+
+
+def _is_group_option(ctx, arg: str) -> bool:
+    return arg in ctx.help_option_names or arg.startswith(
+        ("--install-completion", "--show-completion")
+    )
+
+
+app = typer.Typer(cls=DefaultCommandGroup)
+
+# Method of `Stats` giving the report in each format of --stats-format.
+STATS_FORMATS = {"text": "summary", "json": "to_json", "prometheus": "to_prometheus"}
+
+# Options of the client shared by the commands.
+UrlOption = Annotated[
+    List[str],
+    typer.Option(
+        envvar="SPANGLISH_URL",
+        help="URL where the spanglish service is exposed, repeat it to balance "
+        "the requests among several replicas.",
+    ),
+]
+WorkersOption = Annotated[
+    int, typer.Option(help="Maximum number of requests in flight.")
+]
+BatchCharsOption = Annotated[
+    Optional[int],
+    typer.Option(
+        help="Pack the pieces in batches of up to this number of characters "
+        "for the /batched endpoint, instead of one request per piece.",
+    ),
+]
+
+
+@app.command("translate")
 def main(
-    filename: Path = typer.Argument(..., help="Path to markdown file to be translated"),
+    paths: List[Path] = typer.Argument(
+        ...,
+        help="Markdown files, directories or glob patterns to be translated",
+    ),
     new_filename: Optional[Path] = typer.Option(
         None,
         help="Filename for the new markdown file to be generated. If not given, "
-        "it is generated internally.",
+        "it is generated internally. Only valid when translating a single file.",
+    ),
+    url: UrlOption = ["http://localhost:8000/"],
+    workers: WorkersOption = 4,
+    target_latency: Optional[float] = typer.Option(
+        None,
+        help="Adapt the requests in flight (up to --workers) to keep their "
+        "latency under this number of seconds.",
+    ),
+    batch_chars: BatchCharsOption = None,
+    post: bool = typer.Option(
+        False,
+        help="POST the /batched payloads as json instead of query parameters, "
+        "falling back to GET if the service doesn't support it.",
+    ),
+    compression: Optional[str] = typer.Option(
+        None,
+        help="Compress the POSTed payloads with gzip or zstd (implies --post).",
+    ),
+    mask: bool = typer.Option(
+        False,
+        help="Replace the inline code, link destinations and URLs of the pieces "
+        "by placeholders before sending them, restoring them afterwards.",
+    ),
+    parse_cache: Optional[Path] = typer.Option(
+        None,
+        help="Directory to keep the files parsed, loaded instead of parsing "
+        "the unchanged files again in the next runs.",
+    ),
+    processes: Optional[int] = typer.Option(
+        None,
+        help="Processes to parse and render files. Defaults to the CPUs. "
+        "The daemon doesn't take it, the job runs in this process.",
+    ),
+    stream: bool = typer.Option(
+        False, help="Write a single file as its sections are translated."
+    ),
+    force: bool = typer.Option(
+        False, help="Translate files even if their translation is up to date."
+    ),
+    incremental: bool = typer.Option(
+        False, help="Only send the pieces edited since the previous translation."
+    ),
+    journal: Optional[Path] = typer.Option(
+        None,
+        help="Journal of the pieces translated. If the run dies, running it again "
+        "with the same journal only translates the pieces missing.",
+    ),
+    stats: bool = typer.Option(
+        False, help="Show the time per stage and the requests made at the end."
+    ),
+    stats_format: str = typer.Option(
+        "text", help="Format of the --stats report: text, json or prometheus."
+    ),
+    daemon: bool = typer.Option(
+        True,
+        help="Send the job to the `translate-md serve` daemon if it's running "
+        "with the same options, instead of starting a new client.",
+    ),
+):  # pragma: no cover
+    """Translate markdown files from the console (the default command)."""
+    configure_logging()
+    if compression not in (None, "gzip", "zstd"):
+        raise typer.BadParameter("--compression must be gzip or zstd")
+    # The daemon has no stats, journal, limiter or processes per job.
+    own_options = stats or journal is not None or target_latency is not None
+    if daemon and not own_options and processes is None:
+        from .daemon_client import client_options
+
+        options = client_options(
+            url, workers, batch_chars, post, compression, mask, parse_cache
+        )
+        if _translate_in_daemon(
+            paths, new_filename, incremental, stream, force, options
+        ):
+            return
+
+    from .batch import BatchTranslator
+    from .client import SpanglishClient
+    from .concurrency import ConcurrencyLimiter
+    from .journal import Journal
+    from .masking import Masker
+    from .parse_cache import ParseCache
+    from .progress import batch_progress, spinner
+    from .stats import Stats
+    from .transport import Transport
+
+    single_file = len(paths) == 1 and paths[0].is_file()
+    if new_filename is not None and not single_file:
+        raise typer.BadParameter("--new-filename requires a single file")
+    if stats_format not in STATS_FORMATS:
+        raise typer.BadParameter(f"--stats-format must be one of {STATS_FORMATS}")
+
+    run_stats = Stats() if stats else None
+    limiter = None
+    if target_latency is not None:
+        limiter = ConcurrencyLimiter(
+            initial=min(4, workers), max_limit=workers, target_latency=target_latency
+        )
+    run_journal = Journal(journal) if journal is not None else None
+    transport = Transport(compression) if post or compression else None
+    with SpanglishClient(
+        url,
+        max_workers=workers,
+        batch_chars=batch_chars,
+        stats=run_stats,
+        limiter=limiter,
+        journal=run_journal,
+        transport=transport,
+        masker=Masker() if mask else None,
+        parse_cache=ParseCache(parse_cache) if parse_cache is not None else None,
+    ) as client:
+        if single_file:
+            with spinner() as progress:
+                progress.add_task("Running...", total=None)
+                client.translate_file(
+                    paths[0],
+                    new_filename=new_filename,
+                    incremental=incremental,
+                    stream=stream,
+                )
+        else:
+            translator = BatchTranslator(
+                client, processes=processes, force=force, incremental=incremental
+            )
+            files, skipped = translator.pending(paths)
+            with batch_progress() as progress:
+                files_task = progress.add_task("files", total=len(files), unit="files")
+                pieces_task = progress.add_task("pieces", total=None, unit="pieces")
+
+                def advance(filename: Path, n_pieces: int) -> None:
+                    progress.advance(files_task)
+                    progress.advance(pieces_task, n_pieces)
+
+                result = translator.run(files, progress=advance)
+            typer.echo(
+                f"{result.files} files translated ({result.pieces} pieces, "
+                f"{result.unique_pieces} unique), "
+                f"{skipped} up to date, {result.failed} failed "
+                f"in {result.seconds:.1f}s"
+            )
+
+    if run_journal is not None:
+        run_journal.close()
+    if run_stats is not None:
+        typer.echo(getattr(run_stats, STATS_FORMATS[stats_format])())
+
+
+def _translate_in_daemon(
+    paths: List[Path],
+    new_filename: Optional[Path],
+    incremental: bool,
+    stream: bool,
+    force: bool,
+    options: dict,
+) -> bool:  # pragma: no cover
+    """Run a job in the daemon, returns False if there is no daemon or it
+    rejects the job, before translating anything."""
+    from .daemon_client import DaemonClient
+    from .errors import DaemonError
+
+    try:
+        remote = DaemonClient()
+    except DaemonError as exc:
+        typer.echo(f"running without the daemon: {exc}", err=True)
+        return False
+    if not remote.is_running():
+        return False
+    events = remote.translate(
+        paths, new_filename, incremental, stream, force, options=options
+    )
+    started = False
+    try:
+        for event in events:
+            started = True
+            if "error" in event:
+                typer.echo(f"couldn't translate {event['file']}: {event['error']}")
+    except DaemonError as exc:
+        if started:
+            raise
+        typer.echo(f"running without the daemon: {exc}", err=True)
+        return False
+    typer.echo(
+        f"{event['files']} files translated by the daemon, "
+        f"{event['skipped']} up to date, {event['failed']} failed "
+        f"in {event['seconds']:.1f}s"
+    )
+    return True
+
+
+@app.command()
+def serve(
+    socket: Optional[Path] = typer.Option(
+        None,
+        envvar="TRANSLATE_MD_SOCKET",
+        help="Unix socket to listen to. Defaults to one in $XDG_RUNTIME_DIR, or "
+        "in a private directory of the user in the temporary directory.",
+    ),
+    url: UrlOption = ["http://localhost:8000/"],
+    workers: WorkersOption = 4,
+    batch_chars: BatchCharsOption = None,
+    post: bool = typer.Option(
+        False, help="POST the /batched payloads as json instead of query parameters."
+    ),
+    compression: Optional[str] = typer.Option(
+        None, help="Compress the POSTed payloads with gzip or zstd (implies --post)."
+    ),
+    mask: bool = typer.Option(
+        False, help="Mask the inline code, link destinations and URLs of the pieces."
+    ),
+    parse_cache: Optional[Path] = typer.Option(
+        None, help="Directory to keep the files parsed."
+    ),
+    jobs: int = typer.Option(2, help="Files translated at the same time."),
+):  # pragma: no cover
+    """Keep a client warm and translate the jobs of `translate-md` sent
+    over a Unix socket, single files ahead of bigger jobs."""
+    from .cache import LRUCache
+    from .client import SpanglishClient
+    from .daemon import Daemon
+    from .daemon_client import client_options
+    from .errors import DaemonError
+    from .masking import Masker
+    from .parse_cache import ParseCache
+    from .transport import Transport
+
+    configure_logging()
+    if compression not in (None, "gzip", "zstd"):
+        raise typer.BadParameter("--compression must be gzip or zstd")
+    options = client_options(
+        url, workers, batch_chars, post, compression, mask, parse_cache
+    )
+    with SpanglishClient(
+        url,
+        max_workers=workers,
+        batch_chars=batch_chars,
+        cache=LRUCache(),
+        transport=Transport(compression) if post or compression else None,
+        masker=Masker() if mask else None,
+        parse_cache=ParseCache(parse_cache) if parse_cache is not None else None,
+    ) as client:
+        try:
+            Daemon(client, socket, jobs=jobs, options=options).serve_forever()
+        except DaemonError as exc:
+            raise typer.BadParameter(str(exc)) from exc
+        except KeyboardInterrupt:
+            pass
+
+
+@app.command()
+def watch(
+    paths: List[Path] = typer.Argument(
+        ..., help="Markdown files, directories or glob patterns to watch"
+    ),
+    url: UrlOption = ["http://localhost:8000/"],
+    workers: WorkersOption = 4,
+    batch_chars: BatchCharsOption = None,
+    interval: float = typer.Option(0.2, help="Seconds between scans of the files."),
+    debounce: float = typer.Option(
+        0.3, help="Seconds a file must stay untouched after a change."
     ),
 ):  # pragma: no cover
-    """CLI for SpanglishClient, translate markdown files
-    from the console.
-    """
-    with Progress(transient=True) as progress:
-        progress.add_task("Running...", total=None)
-        client = SpanglishClient()
-        client.translate_file(filename, new_filename=new_filename)
+    """Translate the files out of date, then each file again as it's
+    edited (only the pieces changed), until interrupted."""
+    from .cache import LRUCache
+    from .client import SpanglishClient
+    from .watch import Watcher
+
+    configure_logging()
+
+    def echo(filename: Path, seconds: float) -> None:
+        typer.echo(f"{filename} translated in {seconds:.2f}s")
+
+    with SpanglishClient(
+        url, max_workers=workers, batch_chars=batch_chars, cache=LRUCache()
+    ) as client:
+        watcher = Watcher(client, paths, interval, debounce, on_translated=echo)
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            pass
+
+
+@app.command()
+def extract(
+    paths: List[Path] = typer.Argument(
+        ..., help="Markdown files, directories or glob patterns to extract"
+    ),
+    output: Optional[Path] = typer.Option(
+        None, "--output", "-o", help="JSONL file to write. Defaults to stdout."
+    ),
+    mask: bool = typer.Option(
+        False, help="Mask the inline code, link destinations and URLs of the pieces."
+    ),
+    parse_cache: Optional[Path] = typer.Option(
+        None, help="Directory to keep the files parsed, reused by apply."
+    ),
+):  # pragma: no cover
+    """Write the pieces to translate as json lines (file, position, hash
+    and text), to be translated offline and applied with `apply`."""
+    import sys
+
+    from .bulk import extract as extract_pieces
+    from .masking import Masker
+    from .parse_cache import ParseCache
+
+    # The records go to stdout without -o, the logs mustn't get mixed in.
+    configure_logging(stream="stdout" if output is not None else "stderr")
+    masker = Masker() if mask else None
+    cache = ParseCache(parse_cache) if parse_cache is not None else None
+    if output is None:
+        result = extract_pieces(paths, sys.stdout, masker, cache)
+    else:
+        with open(output, "w", encoding="utf-8") as f:
+            result = extract_pieces(paths, f, masker, cache)
+    typer.echo(f"{result.pieces} pieces extracted from {result.files} files", err=True)
+
+
+@app.command("apply")
+def apply_translations(
+    translations: Path = typer.Argument(
+        ...,
+        help="JSONL file written by extract with the texts translated (or a "
+        "translation field added), - to read from stdin.",
+    ),
+    mask: bool = typer.Option(False, help="The pieces were extracted with --mask."),
+    parse_cache: Optional[Path] = typer.Option(
+        None, help="Directory to keep the files parsed."
+    ),
+):  # pragma: no cover
+    """Write the translated files from the json lines translated."""
+    import sys
+
+    from .bulk import apply
+    from .masking import Masker
+    from .parse_cache import ParseCache
+
+    configure_logging()
+    masker = Masker() if mask else None
+    cache = ParseCache(parse_cache) if parse_cache is not None else None
+    try:
+        if str(translations) == "-":
+            result = apply(sys.stdin, masker, cache)
+        else:
+            with open(translations, "r", encoding="utf-8") as f:
+                result = apply(f, masker, cache)
+    except ValueError as exc:
+        raise typer.BadParameter(str(exc)) from exc
+    typer.echo(
+        f"{result.files} files written ({result.pieces} pieces), {result.failed} failed"
+    )
+    if result.failed:
+        raise typer.Exit(1)
 
 
 if __name__ == "__main__":
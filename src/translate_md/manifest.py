@@ -0,0 +1,109 @@
+"""Sidecar manifest with the translations of a file from a previous run.
+
+Used by `SpanglishClient.translate_file(..., incremental=True)` to send
+to the service only the pieces that changed since the last translation.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+from translate_md.logger import get_logger
+
+logger = get_logger("manifest")
+
+MANIFEST_VERSION = 1
+
+
+def piece_hash(text: str) -> str:
+    """Hash identifying the content of a piece of text.
+
+    Args:
+        text (str): A piece obtained from `MarkdownProcessor.get_pieces`.
+
+    Returns:
+        str: sha256 hex digest.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def manifest_filename(new_filename: Path) -> Path:
+    """Path of the manifest for a translated file.
+
+    Args:
+        new_filename (Path): The translated markdown file.
+
+    Returns:
+        Path: Hidden json file next to the translated file.
+
+    Examples:
+        ```python
+        >>> manifest_filename(Path("posts/post.es.md"))
+        PosixPath('posts/.post.es.md.manifest.json')
+        ```
+    """
+    return new_filename.parent / f".{new_filename.name}.manifest.json"
+
+
+class Manifest:
+    """Translations of the pieces of a file, by the hash of the piece.
+
+    Args:
+        translations (Optional[dict[str, str]], optional):
+            Mapping from `piece_hash` to the translated text.
+            Defaults to None.
+    """
+
+    def __init__(self, translations: Optional[dict[str, str]] = None) -> None:
+        self._translations = translations or {}
+
+    @classmethod
+    def load(cls, filename: Path) -> "Manifest":
+        """Read a manifest from disk.
+
+        A missing or unreadable manifest yields an empty one, so
+        everything is translated again.
+
+        Args:
+            filename (Path): Path to the manifest.
+        """
+        try:
+            with open(filename, "r") as f:
+                content = json.load(f)
+        except FileNotFoundError:
+            return cls()
+        except (OSError, ValueError):
+            logger.warning(f"couldn't read the manifest, ignoring it: {filename}")
+            return cls()
+        if content.get("version") != MANIFEST_VERSION:
+            return cls()
+        return cls(content["translations"])
+
+    def save(self, filename: Path) -> None:
+        """Write the manifest to disk, replacing the previous one atomically.
+
+        Args:
+            filename (Path): Path to the manifest.
+        """
+        tmp = filename.with_name(filename.name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(
+                {"version": MANIFEST_VERSION, "translations": self._translations}, f
+            )
+        os.replace(tmp, filename)
+
+    def get(self, text: str) -> Optional[str]:
+        """Translation of a piece from the previous run, if any."""
+        return self._translations.get(piece_hash(text))
+
+    def set(self, text: str, translation: str) -> None:
+        """Store the translation of a piece."""
+        self._translations[piece_hash(text)] = translation
+
+    def __len__(self) -> int:
+        return len(self._translations)
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"({len(self)})"
@@ -1,13 +1,53 @@
 """Markdown related facilities. """
 
+import re
 from pathlib import Path
-from typing import Any, Mapping, MutableMapping
+from typing import IO, Any, Iterable, Iterator, Mapping, Optional
 
 from markdown_it import MarkdownIt
 from markdown_it.token import Token
-from mdformat.renderer import MDRenderer
+from mdformat.renderer import MDRenderer, RenderContext, RenderTreeNode
+from mdformat.renderer.typing import Render
 
+from translate_md.classifier import PieceClassifier, default_classifier
+from translate_md.masking import Masker, restore
+from translate_md.parse_cache import ParseCache
+
+# Parser and renderer shared by all the processors. Both can be used by
+# several threads at once, they don't keep state between documents.
 md = MarkdownIt("zero")
+md_renderer = MDRenderer()
+
+BLANK_LINES = re.compile(r"\n\s*\n")
+
+
+def _verbatim_text(node: RenderTreeNode, context: RenderContext) -> str:
+    return node.content
+
+
+def _verbatim_paragraph(node: RenderTreeNode, context: RenderContext) -> str:
+    text = node.children[0].render(context)
+    # A blank line in a translation would split the paragraph in two.
+    return BLANK_LINES.sub("\n", text)
+
+
+class VerbatimPlugin:
+    """mdformat plugin that writes the paragraphs as they are.
+
+    mdformat escapes any character of a text that could be read as
+    markdown syntax (`\\`, `*`, `#`, `<`...). With the "zero" preset
+    of the parser the whole paragraph is plain text, which already is
+    the original markdown, so the escapes are not needed. Everything
+    else is rendered by mdformat.
+    """
+
+    RENDERERS: Mapping[str, Render] = {
+        "text": _verbatim_text,
+        "paragraph": _verbatim_paragraph,
+    }
+
+
+RENDER_OPTIONS: Mapping[str, Any] = {"parser_extension": [VerbatimPlugin]}
 
 
 def read_file(filename: Path) -> str:
@@ -26,16 +66,52 @@ class MarkdownProcessor:
     Args:
         markdown_content (str):
             The content of a markdown file as a string.
+        classifier (Optional[PieceClassifier], optional):
+            Decides which pieces are left untranslated. Defaults to None,
+            which skips the front matter, figures, code and comments.
+        parser (Optional[MarkdownIt], optional):
+            Parser for the content. Defaults to None, the module's `md`
+            parser shared by all the processors.
+        renderer (Optional[MDRenderer], optional):
+            Renderer for the new content. Defaults to None, the module's
+            `md_renderer` shared by all the processors.
+        masker (Optional[Masker], optional):
+            Replaces the inline code, link destinations and URLs of the
+            pieces by placeholders, restored by `update`. See
+            `translate_md.masking`. Defaults to None, the pieces are sent
+            as they are.
+        parse_cache (Optional[ParseCache], optional):
+            Loads the tokens and the position of the pieces of a content
+            parsed before instead of parsing it, see
+            `translate_md.parse_cache`. Defaults to None.
 
     Notes:
         See [gohugo](https://gohugo.io/) for type of markdown files
     """
 
-    def __init__(self, markdown_content: str) -> None:
-        self.md = MarkdownIt("zero")
+    def __init__(
+        self,
+        markdown_content: str,
+        classifier: Optional[PieceClassifier] = None,
+        parser: Optional[MarkdownIt] = None,
+        renderer: Optional[MDRenderer] = None,
+        masker: Optional[Masker] = None,
+        parse_cache: Optional[ParseCache] = None,
+    ) -> None:
+        self.md = parser or md
+        self._renderer = renderer or md_renderer
+        self._masker = masker
+        self._parse_cache = parse_cache
+        self._cache_key: Optional[str] = None
+        self._cached_positions: Optional[list[int]] = None
         self._tokens: list[Token] = []
         self._positions: list[int] = []
+        self._pieces: Optional[list[str]] = None
+        # Spans masked in each piece.
+        self._masked: list[list[str]] = []
+        self._original_chars = 0
         self._content = markdown_content
+        self._classifier = classifier or default_classifier
 
     @property
     def tokens(self) -> list[Token]:
@@ -44,6 +120,14 @@ class MarkdownProcessor:
         created back.
         """
         if len(self._tokens) == 0:
+            if self._parse_cache is not None:
+                self._cache_key = self._parse_cache.key(
+                    self._content, self.md, self._classifier
+                )
+                cached = self._parse_cache.get(self._cache_key)
+                if cached is not None:
+                    self._tokens, self._cached_positions = cached
+                    return self._tokens
             self._tokens = self.md.parse(self._content)
         return self._tokens
 
@@ -54,27 +138,41 @@ class MarkdownProcessor:
         """Gets the pieces of the markdown file to be translated.
 
         The relevant pieces are those tokens considered of type
-        'inline' and which aren't the front matter, a figure, code
-        or markdown comments.
+        'inline' and which aren't skipped by the classifier (by default
+        the front matter, a figure, code or markdown comments).
 
         Internally stores the position of the corresponding tokens
-        for later use.
+        for later use. The pieces are computed once, successive calls
+        return the same pieces. With a masker, the pieces are masked.
         """
-        pieces = []
-        for i, t in enumerate(self.tokens):
-            if t.type == "inline":
-                if any(
-                    (
-                        is_front_matter(t.content),
-                        is_figure(t.content),
-                        is_code(t.content),
-                        is_comment(t.content),
-                    )
-                ):
-                    continue
-                pieces.append(t.content)
-                self._positions.append(i)
-        return pieces
+        if self._pieces is None:
+            tokens = self.tokens
+            if self._cached_positions is not None:
+                positions = self._cached_positions
+                pieces = [tokens[i].content for i in positions]
+            else:
+                is_skipped = self._classifier.is_skipped
+                pieces, positions = [], []
+                for i, t in enumerate(tokens):
+                    if t.type == "inline" and not is_skipped(t.content):
+                        pieces.append(t.content)
+                        positions.append(i)
+                if self._parse_cache is not None and self._cache_key is not None:
+                    # Stored before `update` changes the tokens.
+                    self._parse_cache.set(self._cache_key, tokens, positions)
+            self._original_chars = sum(len(p) for p in pieces)
+            if self._masker is not None:
+                masked = [self._masker.mask(p) for p in pieces]
+                pieces = [text for text, _ in masked]
+                self._masked = [originals for _, originals in masked]
+            self._pieces, self._positions = pieces, positions
+        return list(self._pieces)
+
+    @property
+    def original_chars(self) -> int:
+        """Characters of the pieces before masking them, `get_pieces`
+        must be called first."""
+        return self._original_chars
 
     def update(self, texts: list[str]) -> None:
         """Update the content with the translated pieces.
@@ -96,28 +194,97 @@ class MarkdownProcessor:
                 "There should be the same number of texts that you obtained from "
                 f"get_pieces: positions: {len(self._positions)}, texts: {len(texts)}"
             )
-        for i, t in zip(self._positions, texts):
+        self.update_pieces(range(len(texts)), texts)
+
+    def update_pieces(self, indices: Iterable[int], texts: Iterable[str]) -> None:
+        """Update only some of the pieces with their translations.
+
+        Args:
+            indices (Iterable[int]): Index of each piece in the list
+                returned by `get_pieces`.
+            texts (Iterable[str]): The translated texts. If the pieces
+                were masked, the spans masked are restored.
+        """
+        for index, t in zip(indices, texts):
+            if self._masked:
+                t = restore(t, self._masked[index])
+            i = self._positions[index]
             self._tokens[i].content = t
             # Not clear why it should be changed the children yet, but...
             self._tokens[i].children[0].content = t  # type: ignore
             # The previous type is ignored because we only deal with inline tokens here,
             # which in fact contain children
 
+    def iter_sections(self, min_pieces: int) -> Iterator[tuple[int, int, list[int]]]:
+        """Split the document in sections of consecutive top level blocks.
+
+        Each section contains at least `min_pieces` pieces (except maybe
+        the last one), so they can be translated and rendered one after
+        the other. `get_pieces` must be called first.
+
+        Args:
+            min_pieces (int): Minimum number of pieces per section.
+
+        Yields:
+            tuple[int, int, list[int]]: Start and end of the section in
+                `tokens`, and the index of the pieces it contains.
+        """
+        start, pieces = 0, []
+        positions = iter(enumerate(self._positions))
+        next_piece = next(positions, None)
+        for i, t in enumerate(self.tokens):
+            if next_piece is not None and next_piece[1] == i:
+                pieces.append(next_piece[0])
+                next_piece = next(positions, None)
+            # A top level token that doesn't open a block closes one.
+            if t.level == 0 and t.nesting <= 0 and len(pieces) >= min_pieces:
+                yield start, i + 1, pieces
+                start, pieces = i + 1, []
+        if start < len(self.tokens):
+            yield start, len(self.tokens), pieces
+
+    def render_section(self, start: int, end: int) -> str:
+        """Render the blocks in `tokens[start:end]`.
+
+        Joining the sections of `iter_sections` with a blank line, plus a
+        final line jump, gives the same result as `render`.
+
+        Args:
+            start (int): Index of the first token of the section.
+            end (int): Index after the last token of the section.
+        """
+        return self._renderer.render(
+            self.tokens[start:end], RENDER_OPTIONS, {}, finalize=False
+        )
+
     def render(self) -> str:
         """Get a new markdown file with the paragraphs translated.
 
+        The paragraphs are written as they are, only the escapes that
+        mdformat would add are left out, so backslashes in the content
+        (i.e. in code) are kept.
+        """
+        return self._renderer.render(self.tokens, RENDER_OPTIONS, {})
+
+    def render_to(self, f: IO[str], block_tokens: int = 3000) -> None:
+        """Write the markdown to a file object, a few blocks at a time,
+        without building the whole document in memory.
+
         Args:
-            texts (list[str]): List of texts to insert back to the
-            document translated.
+            f (IO[str]): Text file or buffer to write to.
+            block_tokens (int, optional): Approximate number of tokens
+                rendered at once. Defaults to 3000.
         """
-        # dummy variables for render
-        options: Mapping[str, Any] = {}
-        env: MutableMapping = {}
-        renderer = MDRenderer()
-        output_markdown = renderer.render(self.tokens, options, env)
-        # mdformat adds some extra \, remove it before writing the content back.
-        output_markdown = output_markdown.replace("\\", "")
-        return output_markdown
+        written = False
+        for start, end in self._iter_blocks(block_tokens):
+            output_markdown = self.render_section(start, end)
+            if output_markdown:
+                if written:
+                    f.write("\n\n")
+                f.write(output_markdown)
+                written = True
+        if written:
+            f.write("\n")
 
     def write_to(self, filename: Path) -> None:
         """Write the content of the updated markdown to disk.
@@ -125,9 +292,73 @@ class MarkdownProcessor:
         Args:
             filename (Path): Name of the new file.
         """
-        translated_file = self.render()
         with open(filename, "w") as f:
-            f.write(translated_file)
+            self.render_to(f)
+
+    def _iter_blocks(self, block_tokens: int) -> Iterator[tuple[int, int]]:
+        """Spans of consecutive top level blocks of about `block_tokens` tokens."""
+        start = 0
+        for i, t in enumerate(self.tokens):
+            if t.level == 0 and t.nesting <= 0 and i + 1 - start >= block_tokens:
+                yield start, i + 1
+                start = i + 1
+        if start < len(self.tokens):
+            yield start, len(self.tokens)
+
+
+class ProcessorFactory:
+    """Creates processors sharing the same configured parser, renderer
+    and classifier, so each document only pays for its own parsing.
+
+    The factory can be shared among threads.
+
+    Args:
+        parser (Optional[MarkdownIt], optional):
+            Defaults to None, the module's `md` parser.
+        renderer (Optional[MDRenderer], optional):
+            Defaults to None, the module's `md_renderer`.
+        classifier (Optional[PieceClassifier], optional):
+            Defaults to None, the default classifier.
+        masker (Optional[Masker], optional):
+            Defaults to None, the pieces aren't masked.
+        parse_cache (Optional[ParseCache], optional):
+            Defaults to None, every content is parsed.
+
+    Examples:
+        ```python
+        >>> factory = ProcessorFactory(classifier=my_classifier)
+        >>> processors = [factory.from_file(f) for f in filenames]
+        ```
+    """
+
+    def __init__(
+        self,
+        parser: Optional[MarkdownIt] = None,
+        renderer: Optional[MDRenderer] = None,
+        classifier: Optional[PieceClassifier] = None,
+        masker: Optional[Masker] = None,
+        parse_cache: Optional[ParseCache] = None,
+    ) -> None:
+        self._parser = parser or md
+        self._renderer = renderer or md_renderer
+        self._classifier = classifier or default_classifier
+        self._masker = masker
+        self._parse_cache = parse_cache
+
+    def __call__(self, markdown_content: str) -> MarkdownProcessor:
+        """Create a processor for the content of a markdown file."""
+        return MarkdownProcessor(
+            markdown_content,
+            classifier=self._classifier,
+            parser=self._parser,
+            renderer=self._renderer,
+            masker=self._masker,
+            parse_cache=self._parse_cache,
+        )
+
+    def from_file(self, filename: Path) -> MarkdownProcessor:
+        """Create a processor for a markdown file in disk."""
+        return self(read_file(filename))
 
 
 def is_front_matter(text: str) -> bool:
@@ -0,0 +1,165 @@
+"""Masking of the spans of the pieces that mustn't be translated.
+
+Inline code, the destinations of links and images, autolinks and bare
+URLs are sent to the model for nothing: they must come back untouched,
+and they can be long. A `Masker` replaces each of them by a placeholder
+(`{0}`, `{1}`...) before the piece is sent, and `restore` puts the
+originals back in the translation.
+
+The spans are found by the inline parser of markdown-it (the rules for
+backticks, links, images and autolinks), the same way it builds the
+children of the inline tokens, recording where each one starts and ends.
+Bare URLs are found with a regular expression in the rest of the text.
+The text of links and the alt text of images is still translated:
+
+```
+See [the docs](https://example.com/a/long/path) or run `pip install translate_md`.
+See [the docs]{0} or run {1}.
+```
+
+Examples:
+    ```python
+    >>> with SpanglishClient(masker=Masker()) as client:
+    ...     client.translate_file(filename)
+    ```
+"""
+
+import re
+from typing import Callable
+
+from markdown_it import MarkdownIt
+from markdown_it.rules_inline import StateInline, autolink, backtick, image, link
+
+from translate_md.logger import get_logger
+
+logger = get_logger("masking")
+
+PLACEHOLDER = "{{{}}}"
+PLACEHOLDER_RE = re.compile(r"\{(\d+)\}")
+# Trailing punctuation is left out, it's most likely part of the sentence.
+BARE_URL = re.compile(r"https?://[^\s<>()\[\]`]*[^\s<>()\[\]`.,;:!?'\"]")
+
+InlineRule = Callable[[StateInline, bool], bool]
+
+
+def _recording(rule: InlineRule, label_offset: int = -1) -> InlineRule:
+    """Wrap an inline rule to record the span it consumes in `env["spans"]`.
+
+    For links and images (`label_offset` 0 and 1) only the part after the
+    label is recorded, the destination and title, so the text is still
+    translated.
+    """
+
+    def recording_rule(state: StateInline, silent: bool) -> bool:
+        start = state.pos
+        if not rule(state, silent):
+            return False
+        if not silent:
+            if label_offset >= 0:
+                label_end = state.md.helpers.parseLinkLabel(
+                    state, start + label_offset, label_offset == 0
+                )
+                start = label_end + 1
+            state.env.setdefault("spans", []).append((start, state.pos))
+        return True
+
+    return recording_rule
+
+
+def _span_parser() -> MarkdownIt:
+    parser = MarkdownIt("zero").enable(["backticks", "link", "image", "autolink"])
+    ruler = parser.inline.ruler
+    ruler.at("backticks", _recording(backtick))
+    ruler.at("link", _recording(link, label_offset=0))
+    ruler.at("image", _recording(image, label_offset=1))
+    ruler.at("autolink", _recording(autolink))
+    return parser
+
+
+# Like the parser of the documents, it keeps no state between calls.
+span_parser = _span_parser()
+
+
+def restore(text: str, originals: list[str]) -> str:
+    """Put the original spans back in place of their placeholders.
+
+    Args:
+        text (str): Translation of a masked piece.
+        originals (list[str]): Spans masked, as returned by `Masker.mask`.
+
+    Returns:
+        str: The translation with the spans restored. The placeholders
+            dropped by the model can't be restored, they are logged.
+    """
+    if not originals:
+        return text
+    found = set()
+
+    def original(match: re.Match) -> str:
+        index = int(match.group(1))
+        if index >= len(originals):
+            return match.group(0)
+        found.add(index)
+        return originals[index]
+
+    restored = PLACEHOLDER_RE.sub(original, text)
+    if len(found) < len(originals):
+        missing = [originals[i] for i in range(len(originals)) if i not in found]
+        logger.warning(f"masked spans lost in the translation: {missing}")
+    return restored
+
+
+class Masker:
+    """Replaces the spans of a piece that mustn't be translated by
+    placeholders.
+
+    Args:
+        min_length (int, optional):
+            Spans shorter than this aren't masked, the placeholder would
+            save nothing. Defaults to 4.
+    """
+
+    def __init__(self, min_length: int = 4) -> None:
+        self.min_length = min_length
+
+    def mask(self, text: str) -> tuple[str, list[str]]:
+        """Mask the spans of a piece.
+
+        A piece already containing something like a placeholder is left as
+        it is, as it couldn't be restored unambiguously.
+
+        Args:
+            text (str): A piece obtained from `MarkdownProcessor.get_pieces`.
+
+        Returns:
+            tuple[str, list[str]]: The masked text and the spans masked,
+                the i-th one replaced by `{i}`.
+        """
+        if PLACEHOLDER_RE.search(text):
+            return text, []
+        env: dict = {}
+        span_parser.parseInline(text, env)
+        spans = sorted(env.get("spans", []))
+        spans += [
+            m.span() for m in BARE_URL.finditer(text) if not _covered(m.span(), spans)
+        ]
+        spans = [(s, e) for s, e in sorted(spans) if e - s >= self.min_length]
+        if not spans:
+            return text, []
+        parts: list[str] = []
+        originals: list[str] = []
+        pos = 0
+        for start, end in spans:
+            parts.append(text[pos:start])
+            parts.append(PLACEHOLDER.format(len(originals)))
+            originals.append(text[start:end])
+            pos = end
+        parts.append(text[pos:])
+        return "".join(parts), originals
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"(min_length={self.min_length})"
+
+
+def _covered(span: tuple[int, int], spans: list[tuple[int, int]]) -> bool:
+    return any(s < span[1] and span[0] < e for s, e in spans)
@@ -0,0 +1,133 @@
+"""Packing of pieces into batches for the `/batched` endpoint.
+
+The pieces of a document are grouped in batches whose total size stays
+under a budget of characters (roughly 4 characters per model token), so a
+document needs a few requests instead of one per piece. Pieces bigger
+than the budget are split at sentence boundaries and stitched back
+after translation.
+
+Examples:
+    ```python
+    >>> packed = PackedPieces(["One.", "Two. Three."], max_chars=5)
+    >>> packed.batches
+    [['One.'], ['Two.'], ['Three.']]
+    >>> packed.unpack([["Uno."], ["Dos."], ["Tres."]])
+    ['Uno.', 'Dos. Tres.']
+    ```
+"""
+
+import re
+
+SENTENCE_BOUNDARY = re.compile(r"((?<=[.!?])\s+)")
+WHITESPACE = re.compile(r"(\s+)")
+
+
+def _units(text: str, pattern: re.Pattern) -> list[tuple[str, str]]:
+    """Split a text in (chunk, separator) pairs, keeping the separators."""
+    parts = pattern.split(text)
+    return [
+        (parts[i], parts[i + 1] if i + 1 < len(parts) else "")
+        for i in range(0, len(parts), 2)
+    ]
+
+
+def split_text(text: str, max_chars: int) -> list[tuple[str, str]]:
+    """Split a text in segments of at most `max_chars` characters.
+
+    The text is cut at sentence boundaries, and only sentences longer than
+    `max_chars` are cut at whitespace. Consecutive sentences are merged
+    while they fit in the budget. A single word longer than the budget is
+    left as is.
+
+    Args:
+        text (str): Text to split.
+        max_chars (int): Maximum number of characters per segment.
+
+    Returns:
+        list[tuple[str, str]]: Segments with the whitespace that followed
+            them in the original text, so that joining `segment + separator`
+            gives back the text.
+    """
+    if len(text) <= max_chars:
+        return [(text, "")]
+    units = []
+    for sentence, sep in _units(text, SENTENCE_BOUNDARY):
+        if len(sentence) <= max_chars:
+            units.append((sentence, sep))
+        else:
+            words = _units(sentence, WHITESPACE)
+            words[-1] = (words[-1][0], sep)
+            units.extend(words)
+
+    segments: list[tuple[str, str]] = []
+    current, current_sep = "", ""
+    for chunk, sep in units:
+        if current and len(current) + len(current_sep) + len(chunk) > max_chars:
+            segments.append((current, current_sep))
+            current, current_sep = chunk, sep
+        elif current:
+            current, current_sep = current + current_sep + chunk, sep
+        else:
+            current, current_sep = chunk, sep
+    segments.append((current, current_sep))
+    return segments
+
+
+def stitch(segments: list[str], separators: list[str]) -> str:
+    """Join back the translated segments of a text split with `split_text`."""
+    return "".join(s + sep for s, sep in zip(segments, separators))
+
+
+class PackedPieces:
+    """Pieces of a document packed in batches under a character budget.
+
+    Args:
+        pieces (list[str]): Texts to translate, in order.
+        max_chars (int): Maximum number of characters per batch.
+    """
+
+    def __init__(self, pieces: list[str], max_chars: int) -> None:
+        if max_chars < 1:
+            raise ValueError(f"max_chars must be a positive integer: {max_chars}")
+        self._n_pieces = len(pieces)
+        # For every segment, the piece it belongs to and the whitespace after it.
+        self._owner: list[int] = []
+        self._separators: list[str] = []
+        self.batches: list[list[str]] = []
+        self._batch_start: list[int] = []
+
+        size = 0
+        for i, piece in enumerate(pieces):
+            for segment, sep in split_text(piece, max_chars):
+                if not self.batches or size + len(segment) > max_chars:
+                    self._batch_start.append(len(self._owner))
+                    self.batches.append([])
+                    size = 0
+                self.batches[-1].append(segment)
+                self._owner.append(i)
+                self._separators.append(sep)
+                size += len(segment)
+
+    def piece_index(self, batch: int) -> int:
+        """Index of the (first) piece contained in a batch."""
+        return self._owner[self._batch_start[batch]]
+
+    def unpack(self, translations: list[list[str]]) -> list[str]:
+        """Rebuild the pieces from the translated batches.
+
+        Args:
+            translations (list[list[str]]): The translation of each batch.
+
+        Returns:
+            list[str]: One translated text per piece.
+        """
+        pieces: list[list[str]] = [[] for _ in range(self._n_pieces)]
+        separators: list[list[str]] = [[] for _ in range(self._n_pieces)]
+        segments = (s for batch in translations for s in batch)
+        for owner, sep, segment in zip(self._owner, self._separators, segments):
+            pieces[owner].append(segment)
+            separators[owner].append(sep)
+        return [stitch(p, s) for p, s in zip(pieces, separators)]
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"({self._n_pieces}, {len(self.batches)})"
@@ -0,0 +1,36 @@
+"""Progress bars for the CLI, built on rich. """
+
+from rich.progress import (
+    BarColumn,
+    MofNCompleteColumn,
+    Progress,
+    ProgressColumn,
+    Task,
+    TextColumn,
+    TimeElapsedColumn,
+)
+from rich.text import Text
+
+
+class RateColumn(ProgressColumn):
+    """Speed of a task, in units (the task's `unit` field) per second."""
+
+    def render(self, task: Task) -> Text:
+        speed = task.finished_speed or task.speed or 0.0
+        return Text(f"{speed:.1f} {task.fields.get('unit', 'it')}/s")
+
+
+def spinner() -> Progress:
+    """Progress without a known total, for a single file."""
+    return Progress(transient=True)
+
+
+def batch_progress() -> Progress:
+    """Progress with the count and speed of each task, for many files."""
+    return Progress(
+        TextColumn("{task.description}"),
+        BarColumn(),
+        MofNCompleteColumn(),
+        RateColumn(),
+        TimeElapsedColumn(),
+    )
@@ -0,0 +1,260 @@
+"""Instrumentation of a translation run.
+
+A `Stats` object collects the time spent in each stage (reading, parsing,
+extracting the pieces, translating, rendering), the latency of every
+request to the service, the bytes sent and received and the number of
+pieces per file. It can be exported as JSON or in the text format of
+Prometheus.
+
+Clients are created with `NULL_STATS` by default, whose methods do
+nothing, so the instrumentation costs a method call when it's off.
+
+Examples:
+    ```python
+    >>> stats = Stats()
+    >>> with SpanglishClient(stats=stats) as client:
+    ...     client.translate_file(filename)
+    >>> print(stats.to_json())
+    {"stages": {"read_file": {"count": 1, "seconds": 0.0001}, ...
+    ```
+"""
+
+import bisect
+import json
+import threading
+from contextlib import contextmanager, nullcontext
+from time import perf_counter
+from typing import Any, Callable, ContextManager, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Upper bounds of the buckets, in seconds for the latencies.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PIECES_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+def timed_call(func: Callable[..., T], *args: Any) -> tuple[T, float]:
+    """Call a function returning its result and the seconds it took.
+
+    Used to time the stages that run in a pool of processes.
+    """
+    start = perf_counter()
+    result = func(*args)
+    return result, perf_counter() - start
+
+
+class Histogram:
+    """Counts of observations in cumulative buckets, as in Prometheus.
+
+    Args:
+        buckets (tuple[float, ...]): Upper bounds of the buckets, sorted.
+    """
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last one is +Inf.
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Estimate of the quantile `q` (0 to 1): the upper bound of the
+        bucket that contains it, or the last bound if it's over all of them.
+        """
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+
+    def to_dict(self) -> dict[str, Any]:
+        cumulative, seen = {}, 0
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            seen += count
+            cumulative[str(bound)] = seen
+        return {"count": self.count, "sum": self.sum, "buckets": cumulative}
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"(count={self.count}, sum={self.sum:.3f})"
+
+
+class Stats:
+    """Metrics of the translations made by a client, safe to share
+    among threads.
+
+    Attributes:
+        stages (dict[str, list]): Calls and seconds spent per stage.
+        latency (Histogram): Seconds per request to the service.
+        pieces (Histogram): Pieces per file translated.
+        requests (int): Number of requests sent.
+        bytes_sent (int): Bytes of the urls and bodies of the requests.
+        bytes_received (int): Bytes of the bodies of the responses.
+        chars_original (int): Characters of the pieces of the files.
+        chars_sent (int): Characters of those pieces once masked, see
+            `translate_md.masking`. Equal to `chars_original` without masking.
+    """
+
+    enabled = True
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.stages: dict[str, list] = {}
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.pieces = Histogram(PIECES_BUCKETS)
+        self.requests = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.chars_original = 0
+        self.chars_sent = 0
+
+    def timer(self, stage: str) -> ContextManager[None]:
+        """Context manager adding the time spent inside to a stage."""
+        return self._timer(stage)
+
+    @contextmanager
+    def _timer(self, stage: str) -> Iterator[None]:
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, perf_counter() - start)
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        """Add the time of a stage measured elsewhere (i.e. in other process)."""
+        with self._lock:
+            stage_stats = self.stages.setdefault(stage, [0, 0.0])
+            stage_stats[0] += 1
+            stage_stats[1] += seconds
+
+    def observe_request(self, seconds: float, sent: int, received: int) -> None:
+        """Record a request to the service.
+
+        Args:
+            seconds (float): Time until the whole response was received.
+            sent (int): Bytes sent.
+            received (int): Bytes received.
+        """
+        with self._lock:
+            self.latency.observe(seconds)
+            self.requests += 1
+            self.bytes_sent += sent
+            self.bytes_received += received
+
+    def observe_file(self, n_pieces: int) -> None:
+        """Record the number of pieces of a file translated."""
+        with self._lock:
+            self.pieces.observe(n_pieces)
+
+    def observe_chars(self, original: int, sent: int) -> None:
+        """Record the characters of the pieces of a file, before and after
+        masking them."""
+        with self._lock:
+            self.chars_original += original
+            self.chars_sent += sent
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "stages": {
+                    name: {"count": count, "seconds": seconds}
+                    for name, (count, seconds) in self.stages.items()
+                },
+                "requests": self.requests,
+                "bytes_sent": self.bytes_sent,
+                "bytes_received": self.bytes_received,
+                "chars_original": self.chars_original,
+                "chars_sent": self.chars_sent,
+                "latency_seconds": self.latency.to_dict(),
+                "pieces_per_file": self.pieces.to_dict(),
+            }
+
+    def to_json(self, indent: Optional[int] = None) -> str:
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def to_prometheus(self, prefix: str = "translate_md") -> str:
+        """The metrics in the text exposition format of Prometheus."""
+        data = self.to_dict()
+        lines = [
+            f"# TYPE {prefix}_stage_seconds_total counter",
+            *(
+                f'{prefix}_stage_seconds_total{{stage="{name}"}} {stage["seconds"]}'
+                for name, stage in data["stages"].items()
+            ),
+            f"# TYPE {prefix}_stage_calls_total counter",
+            *(
+                f'{prefix}_stage_calls_total{{stage="{name}"}} {stage["count"]}'
+                for name, stage in data["stages"].items()
+            ),
+        ]
+        for name in (
+            "requests",
+            "bytes_sent",
+            "bytes_received",
+            "chars_original",
+            "chars_sent",
+        ):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {data[name]}")
+        for name in ("latency_seconds", "pieces_per_file"):
+            histogram = data[name]
+            lines.append(f"# TYPE {prefix}_{name} histogram")
+            for bound, count in histogram["buckets"].items():
+                lines.append(f'{prefix}_{name}_bucket{{le="{bound}"}} {count}')
+            lines.append(f"{prefix}_{name}_sum {histogram['sum']}")
+            lines.append(f"{prefix}_{name}_count {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """Human readable summary, one line per stage plus the requests."""
+        data = self.to_dict()
+        lines = [
+            f"{name:>10}: {stage['seconds']:8.3f}s in {stage['count']} calls"
+            for name, stage in data["stages"].items()
+        ]
+        lines.append(
+            f"  requests: {self.requests}, p50 <= {self.latency.quantile(0.5)}s, "
+            f"p99 <= {self.latency.quantile(0.99)}s, "
+            f"{self.bytes_sent} bytes sent, {self.bytes_received} received"
+        )
+        if self.chars_sent < self.chars_original:
+            files = self.pieces.count or 1
+            saved = self.chars_original - self.chars_sent
+            lines.append(
+                f"    masked: {saved} of {self.chars_original} characters "
+                f"({saved / self.chars_original:.1%}), {saved / files:.0f} per file"
+            )
+        return "\n".join(lines)
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"(requests={self.requests})"
+
+
+class NullStats(Stats):
+    """Stats that record nothing, used when the instrumentation is off."""
+
+    enabled = False
+
+    def timer(self, stage: str) -> ContextManager[None]:
+        return nullcontext()
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        pass
+
+    def observe_request(self, seconds: float, sent: int, received: int) -> None:
+        pass
+
+    def observe_file(self, n_pieces: int) -> None:
+        pass
+
+    def observe_chars(self, original: int, sent: int) -> None:
+        pass
+
+
+NULL_STATS = NullStats()
@@ -0,0 +1,133 @@
+"""Transport of the bulk payloads (`/batched`) to the service.
+
+By default every payload is sent as query parameters of a GET request,
+which URL-encodes the json list of texts, can't be compressed and hits
+the limits of the servers on the length of the URL for big batches. A
+`Transport` POSTs the same parameters as a json body instead, optionally
+compressed with gzip or zstd (the latter needs `zstandard`, install it
+with `pip install translate_md[zstd]`).
+
+The service may not support it: a response rejecting the request (400,
+405, 415, 422 or 501) makes the transport fall back, for the rest of
+the requests, to the next option: from compressed to plain POST, and
+from plain POST to GET.
+
+Examples:
+    ```python
+    >>> client = SpanglishClient(batch_chars=20_000, transport=Transport("gzip"))
+    >>> client.translate_file(filename)
+    >>> client.transport
+    Transport(POST gzip)
+    ```
+"""
+
+import gzip
+import json
+import threading
+from typing import Any, Optional
+
+import requests
+
+from translate_md.logger import get_logger
+
+try:
+    import zstandard  # type: ignore[import-not-found]
+except ImportError:  # pragma: no cover
+    zstandard = None  # type: ignore
+
+logger = get_logger("transport")
+
+# Responses of a service that doesn't understand the request.
+REJECTED_STATUS = (400, 405, 415, 422, 501)
+# Smaller bodies aren't worth compressing.
+COMPRESSION_MIN_BYTES = 1024
+
+Mode = tuple[str, Optional[str]]
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """Compress a body with the given content encoding (gzip or zstd)."""
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=6)
+    return zstandard.ZstdCompressor().compress(data)
+
+
+class Transport:
+    """Sends the payloads POSTing json, falling back to GET if the
+    service doesn't support it.
+
+    Args:
+        compression (Optional[str], optional):
+            Content encoding of the bodies, "gzip" or "zstd". Defaults to
+            None, not compressed.
+        min_size (int, optional):
+            Bodies smaller than this number of bytes aren't compressed.
+            Defaults to COMPRESSION_MIN_BYTES.
+    """
+
+    def __init__(
+        self, compression: Optional[str] = None, min_size: int = COMPRESSION_MIN_BYTES
+    ) -> None:
+        if compression not in (None, "gzip", "zstd"):
+            raise ValueError(f"compression must be gzip or zstd: {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise ImportError(
+                "zstd compression needs zstandard, install it with: "
+                "pip install translate_md[zstd]"
+            )
+        self._modes: list[Mode] = [("POST", None), ("GET", None)]
+        if compression is not None:
+            self._modes.insert(0, ("POST", compression))
+        self._min_size = min_size
+        self._lock = threading.Lock()
+
+    @property
+    def mode(self) -> Mode:
+        """Method and compression currently used."""
+        return self._modes[0]
+
+    def send(
+        self,
+        session: requests.Session,
+        url: str,
+        params: dict[str, str],
+        timeout: float,
+    ) -> requests.Response:
+        """Send the parameters to the url, falling back to the next mode
+        while the service rejects the request."""
+        while True:
+            mode = self._modes[0]
+            response = session.request(
+                **self._build(mode, url, params), timeout=timeout
+            )
+            if response.status_code not in REJECTED_STATUS or mode == self._modes[-1]:
+                return response
+            self._fall_back(mode, response.status_code)
+
+    def _build(self, mode: Mode, url: str, params: dict[str, str]) -> dict[str, Any]:
+        method, compression = mode
+        if method == "GET":
+            return {"method": "GET", "url": url, "params": params}
+        body = json.dumps(params).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if compression is not None and len(body) >= self._min_size:
+            body = compress(body, compression)
+            headers["Content-Encoding"] = compression
+        return {"method": "POST", "url": url, "data": body, "headers": headers}
+
+    def _fall_back(self, mode: Mode, status: int) -> None:
+        with self._lock:
+            # Another thread may have fallen back already.
+            if self._modes[0] == mode and len(self._modes) > 1:
+                self._modes.pop(0)
+                logger.warning(
+                    f"the service rejected {_name(mode)} ({status}), "
+                    f"falling back to {_name(self._modes[0])}"
+                )
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"({_name(self.mode)})"
+
+
+def _name(mode: Mode) -> str:
+    return " ".join(m for m in mode if m)
@@ -0,0 +1,149 @@
+"""Translation of the markdown files of a tree as they are edited.
+
+A `Watcher` polls the files every `interval` seconds, comparing their
+modification time and size, so it works the same on every platform with
+no dependency on its filesystem events. A file changed is translated once
+it stays untouched for `debounce` seconds, so an editor saving in several
+writes, or a `git checkout` of many files, triggers a single translation
+per file.
+
+The files are translated with `translate_file(incremental=True)`, only
+the pieces edited are sent, and the same client is kept while watching:
+its connections to the service and its cache stay warm between changes.
+
+Examples:
+    ```python
+    >>> with SpanglishClient(cache=LRUCache()) as client:
+    ...     Watcher(client, [Path("content")]).run()
+    ```
+"""
+
+import threading
+from pathlib import Path
+from time import monotonic, perf_counter
+from typing import Callable, Iterable, Optional
+
+from translate_md.batch import collect_files, is_up_to_date
+from translate_md.client import SpanglishClient, translated_filename
+from translate_md.logger import get_logger
+
+logger = get_logger("watch")
+
+# Modification time (ns) and size of a file.
+FileState = tuple[int, int]
+
+
+def scan(paths: Iterable[Path]) -> dict[Path, FileState]:
+    """State of the markdown files found in the paths, see `collect_files`."""
+    states = {}
+    for filename in collect_files(paths):
+        try:
+            stat = filename.stat()
+        except FileNotFoundError:
+            continue  # Removed while scanning.
+        states[filename] = (stat.st_mtime_ns, stat.st_size)
+    return states
+
+
+class Watcher:
+    """Translates the markdown files of some paths each time they change.
+
+    Args:
+        client (SpanglishClient): Client used to translate the files.
+        paths (Iterable[Path]): Files, directories or glob patterns.
+        interval (float, optional):
+            Seconds between two scans of the files. Defaults to 0.2.
+        debounce (float, optional):
+            Seconds a file must stay untouched after a change to be
+            translated. Defaults to 0.3.
+        on_translated (Optional[Callable[[Path, float], None]], optional):
+            Called with each file translated and the seconds it took.
+            Defaults to None.
+    """
+
+    def __init__(
+        self,
+        client: SpanglishClient,
+        paths: Iterable[Path],
+        interval: float = 0.2,
+        debounce: float = 0.3,
+        on_translated: Optional[Callable[[Path, float], None]] = None,
+    ) -> None:
+        self._client = client
+        self._paths = list(paths)
+        self._interval = interval
+        self._debounce = debounce
+        self._on_translated = on_translated
+        self._states: dict[Path, FileState] = {}
+        # Time each changed file was last seen changing.
+        self._changed: dict[Path, float] = {}
+
+    def start(self) -> list[Path]:
+        """Take the first state of the files.
+
+        Returns:
+            list[Path]: Files whose translation is missing or out of date.
+        """
+        self._states = scan(self._paths)
+        self._changed.clear()
+        return [f for f in self._states if not is_up_to_date(f, translated_filename(f))]
+
+    def poll(self) -> list[Path]:
+        """Scan the files again.
+
+        Returns:
+            list[Path]: Files changed (or created) since they were last
+                translated, and untouched for `debounce` seconds.
+        """
+        now = monotonic()
+        states = scan(self._paths)
+        for filename, state in states.items():
+            if self._states.get(filename) != state:
+                self._changed[filename] = now
+        for filename in self._changed.keys() - states.keys():
+            del self._changed[filename]
+        self._states = states
+        ready = sorted(
+            f for f, seen in self._changed.items() if now - seen >= self._debounce
+        )
+        for filename in ready:
+            del self._changed[filename]
+        return ready
+
+    def translate(self, files: list[Path]) -> int:
+        """Translate the files, logging the ones that fail.
+
+        Returns:
+            int: Number of files translated.
+        """
+        translated = 0
+        for filename in files:
+            start = perf_counter()
+            try:
+                self._client.translate_file(filename, incremental=True)
+            except (ValueError, OSError) as exc:
+                logger.error(f"failed translating {filename}: {exc}")
+                continue
+            translated += 1
+            if self._on_translated is not None:
+                self._on_translated(filename, perf_counter() - start)
+        return translated
+
+    def run(self, stop: Optional[threading.Event] = None) -> None:
+        """Translate the files out of date, then the files changed until
+        `stop` is set (or forever).
+
+        Args:
+            stop (Optional[threading.Event], optional):
+                Event to stop watching. Defaults to None.
+        """
+        stop = stop or threading.Event()
+        self.translate(self.start())
+        logger.info(f"watching {len(self._states)} files")
+        while not stop.wait(self._interval):
+            files = self.poll()
+            if files:
+                self.translate(files)
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"({[str(p) for p in self._paths]})"
@@ -0,0 +1,113 @@
+"""Tests for translate_md/async_client.py. """
+
+import asyncio
+import json
+import tempfile
+import threading
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from translate_md import async_client, client  # noqa: E402
+
+filename = (
+    Path(__file__).parent
+    / "data"
+    / "a-NER-model-for-command-line-help-messages-part1.en.md"
+)
+
+
+def fake_transport(fail_on=None):
+    def handler(request):
+        params = {k: v[0] for k, v in parse_qs(urlparse(str(request.url)).query).items()}
+        if request.url.path == "/batched":
+            texts = json.loads(params["texts"])
+            return httpx.Response(200, json=json.dumps([f"es: {t}" for t in texts]))
+        if params["text"] == fail_on:
+            return httpx.Response(500, text="Internal Server Error")
+        if params["text"] == "overloaded":
+            return httpx.Response(503, json={"detail": "overloaded"})
+        return httpx.Response(200, json=f"es: {params['text']}")
+
+    return httpx.MockTransport(handler)
+
+
+def make_client(**kwargs):
+    spanglish = async_client.AsyncSpanglishClient(**kwargs)
+    spanglish._client = httpx.AsyncClient(transport=fake_transport("boom"))
+    return spanglish
+
+
+class TestAsyncClient:
+    def test_repr(self):
+        assert repr(make_client()).startswith("AsyncSpanglishClient(")
+
+    def test_invalid_max_concurrency(self):
+        with pytest.raises(ValueError):
+            async_client.AsyncSpanglishClient(max_concurrency=0)
+
+    def test_translate(self):
+        async def run():
+            async with make_client() as spanglish:
+                return await spanglish.translate("hello")
+
+        assert asyncio.run(run()) == "es: hello"
+
+    def test_translate_error_status(self):
+        with pytest.raises(ValueError, match="answered 503"):
+            asyncio.run(make_client().translate("overloaded"))
+
+    def test_translate_batch(self):
+        async def run():
+            async with make_client() as spanglish:
+                return await spanglish.translate_batch(["one", "two"])
+
+        assert asyncio.run(run()) == ["es: one", "es: two"]
+
+    def test_translate_batch_error(self, mocker):
+        mocker.patch(
+            "translate_md.async_client.AsyncSpanglishClient._request",
+            return_value="['one text', 'one err'",
+        )
+        with pytest.raises(ValueError):
+            asyncio.run(make_client().translate_batch(["one", "two"]))
+
+    def test_multi_request_error_index(self):
+        async def run():
+            async with make_client(max_concurrency=2) as spanglish:
+                await spanglish._multi_request("/single", ["one", "boom", "three"])
+
+        with pytest.raises(client.TranslationError) as excinfo:
+            asyncio.run(run())
+        assert excinfo.value.index == 1
+
+    def test_translate_file(self):
+        async def run(new_filename):
+            async with make_client() as spanglish:
+                await spanglish.translate_file(filename, new_filename=new_filename)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            asyncio.run(run(Path(tmp) / "testfile.md"))
+            content = (Path(tmp) / "testfile.md").read_text()
+            assert "es: " in content
+
+    def test_translate_file_off_the_loop(self, mocker):
+        threads = []
+        read_file = async_client.md.read_file
+
+        def record_thread(*args):
+            threads.append(threading.current_thread())
+            return read_file(*args)
+
+        mocker.patch("translate_md.async_client.md.read_file", side_effect=record_thread)
+
+        async def run(new_filename):
+            async with make_client() as spanglish:
+                await spanglish.translate_file(filename, new_filename=new_filename)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            asyncio.run(run(Path(tmp) / "testfile.md"))
+        assert threads and threads[0] is not threading.main_thread()
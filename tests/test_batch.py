@@ -0,0 +1,148 @@
+"""Tests for translate_md/batch.py. """
+
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from translate_md import batch, client
+from translate_md.journal import Journal
+from translate_md.masking import Masker
+from translate_md.parse_cache import ParseCache
+from translate_md.stats import Stats
+
+
+@pytest.fixture
+def docs_tree():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        (root / "posts").mkdir()
+        (root / "posts" / "one.md").write_text("First post.\n\nSecond paragraph.\n")
+        (root / "posts" / "two.md").write_text("Second post.\n")
+        (root / "posts" / "two.es.md").write_text("Segundo post.\n")
+        (root / "about.md").write_text("About.\n")
+        (root / "notes.txt").write_text("Not markdown.\n")
+        yield root
+
+
+@pytest.fixture
+def fake_translation(mocker):
+    return mocker.patch(
+        "translate_md.client.SpanglishClient._multi_request",
+        side_effect=lambda endpoint, texts, **kwargs: [f"es: {t}" for t in texts],
+    )
+
+
+def test_collect_files(docs_tree):
+    assert batch.collect_files([docs_tree]) == [
+        docs_tree / "about.md",
+        docs_tree / "posts" / "one.md",
+        docs_tree / "posts" / "two.md",
+    ]
+    assert batch.collect_files([docs_tree / "posts" / "t*.md"]) == [
+        docs_tree / "posts" / "two.md"
+    ]
+    assert batch.collect_files([docs_tree / "about.md", docs_tree / "*.md"]) == [
+        docs_tree / "about.md"
+    ]
+
+
+def test_is_up_to_date(docs_tree):
+    original, translated = docs_tree / "posts" / "two.md", docs_tree / "posts" / "two.es.md"
+    os.utime(original, (0, 0))
+    assert batch.is_up_to_date(original, translated)
+    assert not batch.is_up_to_date(translated, original.with_name("missing.md"))
+    os.utime(translated, (0, 0))
+    os.utime(original, None)
+    assert not batch.is_up_to_date(original, translated)
+
+
+class TestBatchTranslator:
+    @pytest.mark.parametrize("processes", [1, 2])
+    def test_run(self, docs_tree, fake_translation, processes):
+        os.utime(docs_tree / "posts" / "two.md", (0, 0))
+        translator = batch.BatchTranslator(client.SpanglishClient(), processes=processes)
+        written = []
+        result = translator.run(
+            [docs_tree], progress=lambda f, n: written.append((f.name, n))
+        )
+        assert (result.files, result.skipped, result.failed, result.pieces) == (2, 1, 0, 3)
+        assert sorted(written) == [("about.md", 1), ("one.md", 2)]
+        assert "es: Second paragraph." in (docs_tree / "posts" / "one.es.md").read_text()
+
+        assert translator.run([docs_tree]).files == 0
+        forced = batch.BatchTranslator(client.SpanglishClient(), processes=1, force=True)
+        assert forced.run([docs_tree]).files == 3
+
+    def test_run_stats(self, docs_tree, fake_translation):
+        spanglish = client.SpanglishClient(stats=Stats())
+        batch.BatchTranslator(spanglish, processes=1).run([docs_tree])
+        stages = spanglish.stats.to_dict()["stages"]
+        assert {name: s["count"] for name, s in stages.items()} == {
+            "extract": 2, "translate": 2, "render": 2
+        }
+        assert spanglish.stats.pieces.count == 2
+
+    @pytest.mark.parametrize("processes", [1, 2])
+    def test_run_masked(self, docs_tree, fake_translation, processes):
+        about = docs_tree / "about.md"
+        about.write_text("Run `translate-md --help` or see https://example.com/docs.\n")
+        spanglish = client.SpanglishClient(stats=Stats(), masker=Masker())
+        batch.BatchTranslator(spanglish, processes=processes).run([about])
+        sent = fake_translation.call_args.args[1]
+        assert sent == ["Run {0} or see {1}."]
+        assert (docs_tree / "about.es.md").read_text() == (
+            "es: Run `translate-md --help` or see https://example.com/docs.\n"
+        )
+        assert spanglish.stats.chars_sent == len(sent[0])
+
+    def test_run_parse_cache(self, docs_tree, fake_translation):
+        parsed = ParseCache(docs_tree / ".parsed")
+        spanglish = client.SpanglishClient(parse_cache=parsed)
+        batch.BatchTranslator(spanglish, processes=1).run([docs_tree / "posts"])
+        # The render loads the tokens stored when extracting the pieces.
+        assert (parsed.misses, parsed.hits, len(parsed)) == (1, 1, 1)
+        assert "es: Second paragraph." in (docs_tree / "posts" / "one.es.md").read_text()
+
+    def test_run_counts_failures(self, docs_tree, mocker):
+        mocker.patch(
+            "translate_md.client.SpanglishClient._multi_request",
+            side_effect=client.TranslationError(0, "failed"),
+        )
+        translator = batch.BatchTranslator(client.SpanglishClient(), processes=1)
+        result = translator.run([docs_tree / "about.md"])
+        assert (result.files, result.failed) == (0, 1)
+
+    def test_run_incremental(self, docs_tree, fake_translation):
+        translator = batch.BatchTranslator(
+            client.SpanglishClient(), processes=1, force=True, incremental=True
+        )
+        translator.run([docs_tree / "posts" / "one.md"])
+        translator.run([docs_tree / "posts" / "one.md"])
+        assert fake_translation.call_count == 1
+
+    def test_run_journal(self, docs_tree, fake_translation):
+        journal_path = docs_tree / "journal.jsonl"
+        with Journal(journal_path) as journal:
+            journal.record(docs_tree / "about.md", 0, "About.", "Acerca de.")
+            spanglish = client.SpanglishClient(journal=journal)
+            result = batch.BatchTranslator(spanglish, processes=1).run([docs_tree])
+            assert (result.files, result.failed) == (2, 0)
+            assert journal.pending() == {}
+        assert (docs_tree / "about.es.md").read_text() == "Acerca de.\n"
+        sent = [t for call in fake_translation.call_args_list for t in call.args[1]]
+        assert "About." not in sent
+
+
+def test_run_dedups_across_files(fake_translation):
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        (root / "one.md").write_text("Table of contents\n\nFirst post.\n")
+        (root / "two.md").write_text("Table of contents\n\nSecond post.\n")
+        translator = batch.BatchTranslator(client.SpanglishClient(), processes=1)
+        result = translator.run([root])
+        assert (result.pieces, result.unique_pieces) == (4, 3)
+        sent = [t for call in fake_translation.call_args_list for t in call.args[1]]
+        assert sorted(sent) == ["First post.", "Second post.", "Table of contents"]
+        assert "es: Table of contents" in (root / "two.es.md").read_text()
@@ -0,0 +1,132 @@
+"""Tests for translate_md/bulk.py. """
+
+import io
+import json
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from translate_md import bulk
+from translate_md.errors import InvalidRecordError
+from translate_md.masking import Masker
+from translate_md.parse_cache import ParseCache
+
+
+@pytest.fixture
+def docs_tree():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        (root / "posts").mkdir()
+        (root / "posts" / "one.md").write_text("# Título\n\nFirst post.\n")
+        (root / "posts" / "two.md").write_text("Second post, run `make docs`.\n")
+        (root / "posts" / "two.es.md").write_text("Segundo post.\n")
+        yield root
+
+
+def extract_records(paths, **kwargs) -> list[dict]:
+    output = io.StringIO()
+    bulk.extract(paths, output, **kwargs)
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def translate(records: list[dict]) -> list[str]:
+    return [json.dumps({**r, "text": f"es: {r['text']}"}) + "\n" for r in records]
+
+
+def test_extract(docs_tree):
+    output = io.StringIO()
+    result = bulk.extract([docs_tree], output)
+    assert result == bulk.ExtractResult(files=2, pieces=3)
+    first = json.loads(output.getvalue().splitlines()[0])
+    assert first == {
+        "file": str(docs_tree / "posts" / "one.md"),
+        "position": 0,
+        "hash": bulk.piece_hash("# Título"),
+        "text": "# Título",
+    }
+    # Not escaped, the translators get the text as it is.
+    assert "Título" in output.getvalue()
+
+
+def test_apply(docs_tree):
+    records = extract_records([docs_tree])
+    assert bulk.apply(translate(records)) == bulk.ApplyResult(files=2, pieces=3)
+    assert (docs_tree / "posts" / "one.es.md").read_text() == (
+        "es: # Título\n\nes: First post.\n"
+    )
+    assert (docs_tree / "posts" / "two.es.md").read_text() == (
+        "es: Second post, run `make docs`.\n"
+    )
+
+
+def test_apply_file_without_pieces(docs_tree):
+    empty = docs_tree / "posts" / "empty.md"
+    empty.write_text("---\ntitle: Draft\n---\n")
+    records = extract_records([docs_tree])
+    assert {"file": str(empty), "pieces": 0} in records
+    lines = [
+        json.dumps(r) + "\n" if "text" not in r else translate([r])[0]
+        for r in records
+    ]
+    assert bulk.apply(lines) == bulk.ApplyResult(files=3, pieces=3)
+    assert (docs_tree / "posts" / "empty.es.md").read_text() == empty.read_text()
+
+
+def test_apply_translation_field_any_order(docs_tree):
+    records = extract_records([docs_tree / "posts" / "one.md"])
+    lines = [json.dumps({**r, "translation": "traducido"}) for r in reversed(records)]
+    assert bulk.apply(lines).files == 1
+    assert (docs_tree / "posts" / "one.es.md").read_text() == (
+        "traducido\n\ntraducido\n"
+    )
+
+
+def test_apply_masked(docs_tree):
+    two = docs_tree / "posts" / "two.md"
+    records = extract_records([two], masker=Masker())
+    assert records[0]["text"] == "Second post, run {0}."
+    assert bulk.apply(translate(records), masker=Masker()).files == 1
+    assert (docs_tree / "posts" / "two.es.md").read_text() == (
+        "es: Second post, run `make docs`.\n"
+    )
+    # Applied without the masker, the pieces don't match.
+    assert bulk.apply(translate(records)).failed == 1
+
+
+def test_apply_parse_cache(docs_tree):
+    parsed = ParseCache(docs_tree / ".parsed")
+    records = extract_records([docs_tree], parse_cache=parsed)
+    assert bulk.apply(translate(records), parse_cache=parsed).files == 2
+    assert (parsed.misses, parsed.hits) == (2, 2)
+
+
+def test_apply_edited_file(docs_tree, caplog):
+    records = extract_records([docs_tree])
+    (docs_tree / "posts" / "one.md").write_text("# Título\n\nEdited post.\n")
+    result = bulk.apply(translate(records))
+    assert (result.files, result.failed) == (1, 1)
+    assert "piece 1 changed since it was extracted" in caplog.text
+
+
+def test_apply_missing_pieces(docs_tree, caplog):
+    lines = translate(extract_records([docs_tree / "posts" / "one.md"]))
+    assert bulk.apply(lines[1:]).failed == 1
+    assert "1 translations for 2 pieces" in caplog.text
+
+
+def test_apply_lines_not_consecutive(docs_tree, caplog):
+    posts = docs_tree / "posts"
+    one, two = (translate(extract_records([posts / f])) for f in ("one.md", "two.md"))
+    result = bulk.apply([one[0], *two, one[1]])
+    assert (result.files, result.failed) == (1, 2)
+    assert "aren't consecutive" in caplog.text
+
+
+def test_apply_invalid_line(docs_tree):
+    records = extract_records([docs_tree])
+    lines = translate(records)
+    lines.append("not json\n")
+    with pytest.raises(InvalidRecordError, match="line 4"):
+        bulk.apply(lines)
+    assert (docs_tree / "posts" / "one.es.md").exists()
@@ -0,0 +1,72 @@
+"""Tests for translate_md/cache.py. """
+
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from translate_md import cache
+
+
+def test_cache_key():
+    key = cache.cache_key("hello", "http://localhost:8000/")
+    assert key == cache.cache_key("hello", "http://localhost:8000/")
+    assert key != cache.cache_key("hello", "http://localhost:8001/")
+    assert key != cache.cache_key("hello", "http://localhost:8000/", model="other")
+    assert key != cache.cache_key("hello ", "http://localhost:8000/")
+
+
+def test_incomplete_subclass():
+    class GetOnly(cache.TranslationCache):
+        def _get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnly()
+
+
+class TestLRUCache:
+    def test_get_set(self):
+        lru = cache.LRUCache()
+        assert lru.get("a") is None
+        lru.set("a", "uno")
+        assert lru.get("a") == "uno"
+        assert lru.stats == cache.CacheStats(hits=1, misses=1, saved_characters=3)
+        assert lru.stats.hit_rate == 0.5
+
+    def test_eviction(self):
+        lru = cache.LRUCache(maxsize=2)
+        lru.set("a", "1")
+        lru.set("b", "2")
+        lru.get("a")
+        lru.set("c", "3")
+        assert len(lru) == 2
+        assert lru.get("b") is None
+        assert lru.get("a") == "1"
+
+
+class TestSQLiteCache:
+    def test_persists(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "cache.db"
+            db = cache.SQLiteCache(path)
+            db.set("a", "uno")
+            db.close()
+            db = cache.SQLiteCache(path)
+            assert db.get("a") == "uno"
+            assert db.get("b") is None
+            assert len(db) == 1
+            db.close()
+
+
+class TestTieredCache:
+    def test_backfills_faster_tiers(self):
+        fast, slow = cache.LRUCache(), cache.LRUCache()
+        tiered = cache.TieredCache([fast, slow])
+        slow.set("a", "uno")
+        assert tiered.get("a") == "uno"
+        assert fast.get("a") == "uno"
+        tiered.set("b", "dos")
+        assert slow.get("b") == "dos"
+        assert tiered.stats.hits == 1
+        assert repr(tiered).startswith("TieredCache(")
@@ -0,0 +1,110 @@
+"""Tests for translate_md/classifier.py. """
+
+import re
+
+import pytest
+
+from translate_md import classifier
+from translate_md import markdown as md
+
+
+@pytest.mark.parametrize(
+    "text, reason",
+    [
+        ('---\ntitle: "A title"\n---', "front_matter"),
+        ("![helpner](/images/helpner-arch-part1.png)", "figure"),
+        ("```console\n$ pip install helpner\n```", "code"),
+        ("```", "code"),
+        ("<!-- ### Related posts\nadd here -->", "comment"),
+        ("  <!--more-->  ", "comment"),
+        ("Some text to translate.", None),
+        ("---\nNot front matter", None),
+    ],
+)
+def test_default_rules(text, reason):
+    assert classifier.default_classifier.skip_reason(text) == reason
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        '---\ntitle: "A NER Model"\n---',
+        "![helpner](/images/helpner-arch-part1.png)",
+        "```console\n$ pip install helpner\n```",
+        "<!-- ### Related posts\nadd here -->",
+        "Plain text",
+        "![not closed",
+    ],
+)
+def test_same_as_helpers(text):
+    expected = any(
+        (md.is_front_matter(text), md.is_figure(text), md.is_code(text), md.is_comment(text))
+    )
+    assert classifier.default_classifier.is_skipped(text) is expected
+
+
+class TestPieceClassifier:
+    def test_register(self):
+        clf = classifier.PieceClassifier()
+        clf.register("shortcode", classifier.SHORTCODE)
+        clf.register("math", re.compile(classifier.MATH_BLOCK))
+        clf.register("html", classifier.HTML_BLOCK)
+        clf.register("short", lambda text: len(text) < 3)
+        assert clf.rules == [
+            "front_matter", "figure", "code", "comment", "shortcode", "math", "html", "short"
+        ]
+        assert clf.skip_reason("{{< youtube w7Ft2ymGmfc >}}") == "shortcode"
+        assert clf.skip_reason("$$\nx^2\n$$") == "math"
+        assert clf.skip_reason('<div class="note">\nHello\n</div>') == "html"
+        assert clf.skip_reason("<div>Hello</span>") is None
+        assert clf.skip_reason("ok") == "short"
+        assert clf.skip_reason("Some text") is None
+
+    def test_unregister(self):
+        clf = classifier.PieceClassifier()
+        clf.unregister("figure")
+        assert clf.skip_reason("![helpner](/images/helpner.png)") is None
+        assert repr(clf) == "PieceClassifier(['front_matter', 'code', 'comment'])"
+
+    def test_fingerprint(self):
+        clf = classifier.PieceClassifier()
+        fingerprint = clf.fingerprint
+        clf.register("short", lambda text: len(text) < 3)
+        assert "test_classifier.TestPieceClassifier.test_fingerprint" in clf.fingerprint
+        clf.unregister("short")
+        assert clf.fingerprint == fingerprint
+
+    def test_fingerprint_same_name_functions(self):
+        def shorter_than(n):
+            return lambda text: len(text) < n
+
+        fingerprints = set()
+        for rule in (
+            lambda text: len(text) < 3,
+            lambda text: len(text) < 4,
+            lambda text: text.startswith("<"),
+            shorter_than(3),
+            shorter_than(4),
+        ):
+            clf = classifier.PieceClassifier()
+            clf.register("short", rule)
+            fingerprints.add(clf.fingerprint)
+        assert len(fingerprints) == 5
+        # The same rule gives the same fingerprint.
+        assert classifier.function_fingerprint(
+            shorter_than(3)
+        ) == classifier.function_fingerprint(shorter_than(3))
+
+    def test_no_rules(self):
+        clf = classifier.PieceClassifier(rules={})
+        assert not clf.is_skipped("```code```")
+
+    def test_invalid_pattern(self):
+        with pytest.raises(re.error):
+            classifier.PieceClassifier().register("bad", "(")
+
+    def test_markdown_processor(self):
+        clf = classifier.PieceClassifier()
+        clf.register("shortcode", classifier.SHORTCODE)
+        mdproc = md.MarkdownProcessor("Text.\n\n{{< youtube w7Ft2ymGmfc >}}\n", classifier=clf)
+        assert mdproc.get_pieces() == ["Text."]
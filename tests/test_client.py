@@ -1,9 +1,19 @@
 """Tests for translate_md/client.py. """
 
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from translate_md import client
+from translate_md.cache import LRUCache
+from translate_md.concurrency import ConcurrencyLimiter
+from translate_md.journal import Journal
+from translate_md.masking import Masker
+from translate_md.stats import Stats
+from translate_md.transport import Transport
 import json
+import time
+from unittest import mock
+
 import pytest
 
 filename = (
@@ -63,3 +73,547 @@ class TestClient:
             (filename.parent / f"{filename.stem}.es{filename.suffix}").unlink()
             spanglish_client.translate_file(filename, new_filename=Path(tmp) / "testfile.md")
             assert (Path(tmp) / "testfile.md").is_file()
+
+
+def _fake_response(text):
+    response = mock.Mock(status_code=200)
+    response.json.return_value = f"es: {text}"
+    return response
+
+
+class TestMultiRequest:
+    def test_invalid_max_workers(self):
+        with pytest.raises(ValueError):
+            client.SpanglishClient(max_workers=0)
+
+    def test_keeps_order(self, mocker):
+        def request(method, url, params=None, **kwargs):
+            # Make the first pieces slower so they finish last.
+            time.sleep(0.01 * (5 - len(params["text"])))
+            return _fake_response(params["text"])
+
+        mocker.patch("translate_md.client.requests.Session.request", side_effect=request)
+        texts = ["a", "bb", "ccc", "dddd"]
+        result = client.SpanglishClient(max_workers=4)._multi_request("/single", texts)
+        assert result == [f"es: {t}" for t in texts]
+
+    def test_error_index(self, mocker):
+        def request(method, url, params=None, **kwargs):
+            response = _fake_response(params["text"])
+            if params["text"] == "boom":
+                response.json.side_effect = ValueError("not json")
+            return response
+
+        mocker.patch("translate_md.client.requests.Session.request", side_effect=request)
+        with pytest.raises(client.TranslationError) as excinfo:
+            client.SpanglishClient(max_workers=2)._multi_request(
+                "/single", ["one", "two", "boom", "four"]
+            )
+        assert excinfo.value.index == 2
+
+
+class TestSession:
+    def test_session_is_reused(self):
+        spanglish = client.SpanglishClient()
+        assert spanglish.session is spanglish.session
+
+    def test_pool_size(self):
+        spanglish = client.SpanglishClient(max_workers=8)
+        adapter = spanglish.session.get_adapter("http://localhost:8000/")
+        assert adapter._pool_maxsize == 8
+        assert adapter.max_retries.total == 3
+
+    def test_context_manager_closes(self):
+        with client.SpanglishClient() as spanglish:
+            session = spanglish.session
+        assert spanglish._session is None
+        assert spanglish.session is not session
+
+
+class TestCache:
+    def test_translate_uses_cache(self, mocker):
+        request = mocker.patch(
+            "translate_md.client.SpanglishClient._request",
+            return_value="texto traducido"
+        )
+        spanglish = client.SpanglishClient(cache=LRUCache())
+        assert spanglish.translate("text") == "texto traducido"
+        assert spanglish.translate("text") == "texto traducido"
+        assert request.call_count == 1
+        assert spanglish.cache.stats.hits == 1
+
+    def test_translate_batch_sends_missing(self, mocker):
+        request = mocker.patch(
+            "translate_md.client.SpanglishClient._request",
+            return_value=json.dumps(["texto dos"])
+        )
+        spanglish = client.SpanglishClient(cache=LRUCache())
+        spanglish.cache.set(spanglish._cache_key("text one"), "texto uno")
+        assert spanglish.translate_batch(["text one", "text two"]) == ["texto uno", "texto dos"]
+        assert json.loads(request.call_args.kwargs["payload"]["texts"]) == ["text two"]
+
+    def test_translate_pieces_error_index(self, mocker):
+        mocker.patch(
+            "translate_md.client.SpanglishClient._multi_request",
+            side_effect=client.TranslationError(1, "failed")
+        )
+        spanglish = client.SpanglishClient(cache=LRUCache())
+        spanglish.cache.set(spanglish._cache_key("b"), "B")
+        with pytest.raises(client.TranslationError) as excinfo:
+            spanglish._translate_pieces(["a", "b", "c"])
+        assert excinfo.value.index == 2
+
+    def test_translate_file(self, mocker):
+        multi_request = mocker.patch(
+            "translate_md.client.SpanglishClient._multi_request",
+            side_effect=lambda endpoint, texts: ["hola"] * len(texts)
+        )
+        spanglish = client.SpanglishClient(cache=LRUCache())
+        with tempfile.TemporaryDirectory() as tmp:
+            spanglish.translate_file(filename, new_filename=Path(tmp) / "testfile.md")
+            spanglish.translate_file(filename, new_filename=Path(tmp) / "testfile.md")
+        assert multi_request.call_count == 1
+        assert spanglish.cache.stats.hits == 16
+
+
+class TestIncremental:
+    def test_only_changed_pieces_are_sent(self, mocker):
+        multi_request = mocker.patch(
+            "translate_md.client.SpanglishClient._multi_request",
+            side_effect=lambda endpoint, texts: [f"es: {t}" for t in texts]
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            source = Path(tmp) / "post.md"
+            source.write_text("First paragraph.\n\nSecond paragraph.\n\nThird one.\n")
+            spanglish_client.translate_file(source, incremental=True)
+            assert len(multi_request.call_args.args[1]) == 3
+
+            source.write_text("First paragraph.\n\nSecond paragraph, edited.\n\nThird one.\n")
+            spanglish_client.translate_file(source, incremental=True)
+            assert multi_request.call_args.args[1] == ["Second paragraph, edited."]
+            content = (Path(tmp) / "post.es.md").read_text()
+            assert "es: First paragraph." in content
+            assert "es: Second paragraph, edited." in content
+
+            multi_request.reset_mock()
+            spanglish_client.translate_file(source, incremental=True)
+            multi_request.assert_not_called()
+
+
+class TestPacking:
+    def test_translate_batch_packed(self, mocker):
+        def request(endpoint, payload):
+            texts = json.loads(payload["texts"])
+            return json.dumps([t.upper() for t in texts])
+
+        request = mocker.patch(
+            "translate_md.client.SpanglishClient._request", side_effect=request
+        )
+        spanglish = client.SpanglishClient(batch_chars=10)
+        assert spanglish.translate_batch(["one.", "two.", "three. four."]) == [
+            "ONE.", "TWO.", "THREE. FOUR."
+        ]
+        assert request.call_count == 3
+
+    def test_fallback_to_single(self, mocker):
+        def request(endpoint, payload):
+            if endpoint == "/batched":
+                return "['undecodable'"
+            return payload["text"].upper()
+
+        request = mocker.patch(
+            "translate_md.client.SpanglishClient._request", side_effect=request
+        )
+        spanglish = client.SpanglishClient(batch_chars=100)
+        assert spanglish._translate_pieces(["one", "two"]) == ["ONE", "TWO"]
+        assert [c.args[0] for c in request.call_args_list] == ["/batched", "/single", "/single"]
+
+    def test_error_index(self, mocker):
+        def request(endpoint, payload):
+            if endpoint == "/batched" and "three" in payload["texts"]:
+                raise ConnectionError("down")
+            return json.dumps(json.loads(payload["texts"]))
+
+        mocker.patch("translate_md.client.SpanglishClient._request", side_effect=request)
+        spanglish = client.SpanglishClient(batch_chars=8)
+        with pytest.raises(client.TranslationError) as excinfo:
+            spanglish._translate_pieces(["one", "two", "three"])
+        assert excinfo.value.index == 2
+
+
+def test_translate_pieces_dedup(mocker):
+    multi_request = mocker.patch(
+        "translate_md.client.SpanglishClient._multi_request",
+        side_effect=lambda endpoint, texts: [t.upper() for t in texts]
+    )
+    assert spanglish_client._translate_pieces(["note:", "text", "note:"]) == ["NOTE:", "TEXT", "NOTE:"]
+    assert multi_request.call_args.args[1] == ["note:", "text"]
+
+
+class TestStream:
+    def test_same_output(self, mocker):
+        mocker.patch(
+            "translate_md.client.SpanglishClient._multi_request",
+            side_effect=lambda endpoint, texts: [f"es: {t}" for t in texts]
+        )
+        mocker.patch("translate_md.client.STREAM_SECTION_PIECES", 3)
+        with tempfile.TemporaryDirectory() as tmp:
+            spanglish_client.translate_file(filename, new_filename=Path(tmp) / "full.md")
+            spanglish_client.translate_file(
+                filename, new_filename=Path(tmp) / "stream.md", stream=True
+            )
+            assert (Path(tmp) / "full.md").read_text() == (Path(tmp) / "stream.md").read_text()
+
+    def test_error_index(self, mocker):
+        def multi_request(endpoint, texts):
+            if "boom" in texts:
+                raise client.TranslationError(texts.index("boom"), "failed")
+            return texts
+
+        mocker.patch(
+            "translate_md.client.SpanglishClient._multi_request", side_effect=multi_request
+        )
+        mocker.patch("translate_md.client.STREAM_SECTION_PIECES", 2)
+        with tempfile.TemporaryDirectory() as tmp:
+            source = Path(tmp) / "post.md"
+            source.write_text("one\n\ntwo\n\nthree\n\nboom\n\nfive\n")
+            with pytest.raises(client.TranslationError) as excinfo:
+                spanglish_client.translate_file(source, stream=True)
+            assert excinfo.value.index == 3
+            # The sections before the failure were written.
+            assert (Path(tmp) / "post.es.md").read_text() == "one\n\ntwo"
+
+    def test_incremental_not_allowed(self):
+        with pytest.raises(ValueError):
+            spanglish_client.translate_file(filename, incremental=True, stream=True)
+
+
+class TestStats:
+    def test_translate_file(self, mocker):
+        mocker.patch(
+            "translate_md.client.SpanglishClient._multi_request",
+            side_effect=lambda endpoint, texts: [f"es: {t}" for t in texts]
+        )
+        spanglish = client.SpanglishClient(stats=Stats())
+        with tempfile.TemporaryDirectory() as tmp:
+            spanglish.translate_file(filename, new_filename=Path(tmp) / "new.md")
+        stages = spanglish.stats.to_dict()["stages"]
+        assert list(stages) == ["read_file", "parse", "get_pieces", "translate", "render"]
+        assert spanglish.stats.pieces.sum == 16
+
+    def test_requests(self, mocker):
+        def request(method, url, params=None, **kwargs):
+            response = _fake_response(params["text"])
+            response.request.url = f"{url}?text={params['text']}"
+            response.request.body = None
+            response.content = b'"es: text"'
+            return response
+
+        mocker.patch("translate_md.client.requests.Session.request", side_effect=request)
+        spanglish = client.SpanglishClient(url="http://spanglish/", stats=Stats())
+        spanglish._multi_request("/single", ["one", "two"])
+        assert spanglish.stats.requests == 2
+        assert spanglish.stats.bytes_sent == 2 * len("http://spanglish/single?text=one")
+        assert spanglish.stats.bytes_received == 20
+        assert spanglish.stats.stages["network"][0] == 1
+
+    def test_off_by_default(self):
+        assert not client.SpanglishClient().stats.enabled
+
+    def test_masked_chars(self, mocker):
+        mocker.patch(
+            "translate_md.client.SpanglishClient._multi_request",
+            side_effect=lambda endpoint, texts: [f"es: {t}" for t in texts]
+        )
+        spanglish = client.SpanglishClient(stats=Stats(), masker=Masker())
+        with tempfile.TemporaryDirectory() as tmp:
+            spanglish.translate_file(filename, new_filename=Path(tmp) / "new.md")
+            translated = (Path(tmp) / "new.md").read_text()
+        run_stats = spanglish.stats
+        assert run_stats.chars_sent < run_stats.chars_original
+        assert "masked:" in run_stats.summary()
+        assert "{0}" not in translated
+
+
+class TestLimiter:
+    def test_concurrency_limit(self):
+        assert client.SpanglishClient(max_workers=3).concurrency_limit == 3
+        limiter = ConcurrencyLimiter(initial=2, max_limit=16)
+        spanglish = client.SpanglishClient(max_workers=4, limiter=limiter)
+        assert spanglish.concurrency_limit == 2
+        assert spanglish._max_workers == 16
+
+    def test_overload_retried(self, mocker):
+        statuses = iter([503, 429, 200])
+
+        def request(method, url, params=None, **kwargs):
+            response = _fake_response(params["text"])
+            response.status_code = next(statuses)
+            response.headers = {"Retry-After": "0"}
+            return response
+
+        mocker.patch("translate_md.client.requests.Session.request", side_effect=request)
+        limiter = ConcurrencyLimiter(initial=4)
+        spanglish = client.SpanglishClient(limiter=limiter, backoff_factor=0)
+        assert spanglish.translate("text") == "es: text"
+        # Halved twice, then grown by one with the successful response.
+        assert limiter.limit == 2
+        assert limiter.in_flight == 0
+
+    def test_overload_gives_up(self, mocker):
+        def request(method, url, params=None, **kwargs):
+            response = _fake_response(params["text"])
+            response.status_code = 503
+            response.headers = {}
+            return response
+
+        request_mock = mocker.patch(
+            "translate_md.client.requests.Session.request", side_effect=request
+        )
+        limiter = ConcurrencyLimiter()
+        cache = LRUCache()
+        spanglish = client.SpanglishClient(
+            limiter=limiter, retries=2, backoff_factor=0, cache=cache
+        )
+        with pytest.raises(client.TranslationError, match=r"overloaded \(503\)"):
+            spanglish.translate("a")
+        assert request_mock.call_count == 3
+        assert limiter.in_flight == 0
+        assert len(cache) == 0
+
+    def test_error_not_translated(self, mocker):
+        def request(method, url, params=None, **kwargs):
+            response = _fake_response(params["text"])
+            response.status_code = 503
+            response.json.return_value = {"detail": "overloaded"}
+            return response
+
+        mocker.patch("translate_md.client.requests.Session.request", side_effect=request)
+        cache = LRUCache()
+        spanglish = client.SpanglishClient(cache=cache)
+        with pytest.raises(ValueError, match="answered 503"):
+            spanglish.translate("a")
+        assert len(cache) == 0
+        with pytest.raises(client.TranslationError):
+            spanglish._multi_request("/single", ["a", "b"])
+
+    def test_session_retries(self):
+        retry = client.SpanglishClient()._new_session().get_adapter("http://").max_retries
+        assert 503 in retry.status_forcelist
+        spanglish = client.SpanglishClient(limiter=ConcurrencyLimiter())
+        retry = spanglish._new_session().get_adapter("http://").max_retries
+        assert 503 not in retry.status_forcelist
+
+
+class TestReplicas:
+    urls = ["http://one/", "http://two/"]
+
+    def test_single_url(self):
+        spanglish = client.SpanglishClient("http://one/")
+        assert spanglish.endpoints is None
+        assert spanglish.check_endpoints() == {}
+
+    def test_balanced(self, mocker):
+        hosts = []
+
+        def request(method, url, params=None, **kwargs):
+            hosts.append(url.split("/")[2])
+            return _fake_response(params["text"])
+
+        mocker.patch("translate_md.client.requests.Session.request", side_effect=request)
+        spanglish = client.SpanglishClient(self.urls, max_workers=1)
+        assert repr(spanglish) == "SpanglishClient(http://one/, http://two/)"
+        spanglish._multi_request("/single", ["a", "b", "c", "d"])
+        assert hosts == ["one", "two", "one", "two"]
+        retry = spanglish._new_session().get_adapter("http://").max_retries
+        assert retry.total == 0
+
+    def test_retry_on_another_replica(self, mocker):
+        def request(method, url, params=None, **kwargs):
+            if url.startswith("http://one/"):
+                raise client.requests.ConnectionError("down")
+            return _fake_response(params["text"])
+
+        mocker.patch("translate_md.client.requests.Session.request", side_effect=request)
+        spanglish = client.SpanglishClient(self.urls, max_workers=1)
+        assert spanglish._multi_request("/single", ["a", "b"]) == ["es: a", "es: b"]
+        assert spanglish.endpoints.endpoints[0].failures == 2
+
+    def test_all_replicas_fail(self, mocker):
+        def request(method, url, params=None, **kwargs):
+            response = _fake_response(params["text"])
+            response.status_code = 500
+            return response
+
+        request_mock = mocker.patch(
+            "translate_md.client.requests.Session.request", side_effect=request
+        )
+        spanglish = client.SpanglishClient(self.urls, retries=2)
+        with pytest.raises(ValueError, match="answered 500"):
+            spanglish._get(spanglish.session, "/single", {"text": "a"})
+        assert request_mock.call_count == 3
+        with pytest.raises(client.TranslationError):
+            spanglish._multi_request("/single", ["a"])
+
+    def test_connection_errors(self, mocker):
+        mocker.patch(
+            "translate_md.client.requests.Session.request",
+            side_effect=client.requests.ConnectionError("down"),
+        )
+        spanglish = client.SpanglishClient(self.urls, retries=1)
+        with pytest.raises(client.requests.ConnectionError):
+            spanglish._get(spanglish.session, "/single", {"text": "a"})
+
+    def test_check_endpoints(self, mocker):
+        def get(url, **kwargs):
+            if url.startswith("http://one/"):
+                raise client.requests.ConnectionError("down")
+            return mock.Mock(status_code=404)
+
+        mocker.patch("translate_md.client.requests.Session.get", side_effect=get)
+        spanglish = client.SpanglishClient(self.urls)
+        assert spanglish.check_endpoints() == {"http://one/": False, "http://two/": True}
+
+    def test_scheduled_health_checks(self, mocker):
+        def get(url, **kwargs):
+            if url.startswith("http://one/"):
+                raise client.requests.ConnectionError("down")
+            return mock.Mock(status_code=200)
+
+        get_mock = mocker.patch(
+            "translate_md.client.requests.Session.get", side_effect=get
+        )
+        spanglish = client.SpanglishClient(self.urls, health_interval=0.01)
+        one = spanglish.endpoints.endpoints[0]
+        spanglish.session  # The checks start with the session.
+        deadline = time.monotonic() + 5
+        while not one.ejections and time.monotonic() < deadline:
+            time.sleep(0.01)
+        spanglish.close()
+        assert not one.admitted
+        calls = get_mock.call_count
+        time.sleep(0.05)
+        assert get_mock.call_count == calls
+
+
+class TestJournal:
+    def test_resume(self, mocker):
+        sent = []
+
+        def request(method, url, params=None, **kwargs):
+            sent.append(params["text"])
+            response = _fake_response(params["text"])
+            if params["text"] == "Second paragraph.":
+                response.json.side_effect = ValueError("not json")
+            return response
+
+        mocker.patch("translate_md.client.requests.Session.request", side_effect=request)
+        with tempfile.TemporaryDirectory() as tmp:
+            source = Path(tmp) / "post.md"
+            source.write_text("First paragraph.\n\nSecond paragraph.\n\nFirst paragraph.\n")
+            journal_path = Path(tmp) / "journal.jsonl"
+            with Journal(journal_path) as journal:
+                spanglish = client.SpanglishClient(max_workers=1, journal=journal)
+                with pytest.raises(client.TranslationError):
+                    spanglish.translate_file(source)
+            assert sent == ["First paragraph.", "Second paragraph."]
+
+            sent.clear()
+            mocker.patch(
+                "translate_md.client.requests.Session.request",
+                side_effect=lambda method, url, params=None, **kwargs: (
+                    sent.append(params["text"]) or _fake_response(params["text"])
+                ),
+            )
+            with Journal(journal_path) as journal:
+                spanglish = client.SpanglishClient(max_workers=1, journal=journal)
+                spanglish.translate_file(source)
+                assert journal.pending() == {}
+            assert sent == ["Second paragraph."]
+            assert (Path(tmp) / "post.es.md").read_text().count("es: First") == 2
+
+    def test_stream_records_document_index(self, mocker):
+        mocker.patch("translate_md.client.STREAM_SECTION_PIECES", 2)
+        mocker.patch(
+            "translate_md.client.requests.Session.request",
+            side_effect=lambda method, url, params=None, **kwargs: _fake_response(
+                params["text"]
+            ),
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            source = Path(tmp) / "post.md"
+            source.write_text("\n\n".join(f"Paragraph {i}." for i in range(5)) + "\n")
+            journal_path = Path(tmp) / "journal.jsonl"
+            with Journal(journal_path) as journal:
+                spanglish = client.SpanglishClient(max_workers=1, journal=journal)
+                spanglish.translate_file(source, stream=True)
+            lines = journal_path.read_text().splitlines()
+            records = [r for r in map(json.loads, lines) if "index" in r]
+            assert sorted((r["index"], r["translation"]) for r in records) == [
+                (i, f"es: Paragraph {i}.") for i in range(5)
+            ]
+
+    def test_incremental_records_document_index(self, mocker):
+        mocker.patch(
+            "translate_md.client.requests.Session.request",
+            side_effect=lambda method, url, params=None, **kwargs: _fake_response(
+                params["text"]
+            ),
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            source = Path(tmp) / "post.md"
+            source.write_text("\n\n".join(f"Paragraph {i}." for i in range(5)) + "\n")
+            spanglish_client.translate_file(source, incremental=True)
+            source.write_text(source.read_text().replace("Paragraph 3.", "Changed."))
+            journal_path = Path(tmp) / "journal.jsonl"
+            with Journal(journal_path) as journal:
+                spanglish = client.SpanglishClient(max_workers=1, journal=journal)
+                spanglish.translate_file(source, incremental=True)
+            lines = journal_path.read_text().splitlines()
+            records = [r for r in map(json.loads, lines) if "index" in r]
+            assert [(r["index"], r["translation"]) for r in records] == [
+                (3, "es: Changed.")
+            ]
+
+
+class TestTransport:
+    def test_post_batched_only(self, mocker):
+        calls = []
+
+        def request(method, url, params=None, data=None, **kwargs):
+            calls.append((method, url.rsplit("/", 1)[1]))
+            if method == "GET":
+                return _fake_response(params["text"])
+            texts = json.loads(json.loads(data)["texts"])
+            response = mock.Mock(status_code=200)
+            response.json.return_value = json.dumps([f"es: {t}" for t in texts])
+            return response
+
+        mocker.patch("translate_md.client.requests.Session.request", side_effect=request)
+        spanglish = client.SpanglishClient(transport=Transport())
+        assert spanglish.translate_batch(["a", "b"]) == ["es: a", "es: b"]
+        assert spanglish.translate("c") == "es: c"
+        assert calls == [("POST", "batched"), ("GET", "single")]
+        retry = spanglish._new_session().get_adapter("http://").max_retries
+        assert "POST" in retry.allowed_methods
+
+    def test_get_by_default(self):
+        assert client.SpanglishClient().transport is None
+
+
+class TestCoalesce:
+    def test_translate_coalesced(self, mocker):
+        batched = mocker.patch(
+            "translate_md.client.SpanglishClient._batched_request",
+            side_effect=lambda texts: [f"es: {t}" for t in texts],
+        )
+        spanglish = client.SpanglishClient(coalesce_delay=1.0, coalesce_max_batch=3)
+        with ThreadPoolExecutor(3) as executor:
+            results = list(executor.map(spanglish.translate, ["a", "b", "c"]))
+        spanglish.close()
+        assert results == ["es: a", "es: b", "es: c"]
+        batched.assert_called_once()
+        assert spanglish.coalescer.batches == 1
+
+    def test_off_by_default(self):
+        assert client.SpanglishClient().coalescer is None
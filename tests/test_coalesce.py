@@ -0,0 +1,88 @@
+"""Tests for translate_md/coalesce.py. """
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import pytest
+
+from translate_md import coalesce
+
+
+def fake_batch(texts):
+    return [f"es: {t}" for t in texts]
+
+
+def test_invalid_max_batch():
+    with pytest.raises(ValueError):
+        coalesce.Coalescer(fake_batch, max_batch=0)
+
+
+def test_single_call():
+    coalescer = coalesce.Coalescer(fake_batch, max_delay=0.001)
+    assert coalescer.translate("hello") == "es: hello"
+    coalescer.close()
+    assert repr(coalescer) == "Coalescer(batches=1, texts=1)"
+
+
+def test_concurrent_calls_batched():
+    batches = []
+
+    def translate_batch(texts):
+        batches.append(texts)
+        return fake_batch(texts)
+
+    coalescer = coalesce.Coalescer(translate_batch, max_delay=1.0, max_batch=4)
+    texts = [str(i) for i in range(8)]
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(coalescer.translate, texts))
+    coalescer.close()
+    assert results == fake_batch(texts)
+    # Full batches are sent without waiting for the delay.
+    assert sorted(len(b) for b in batches) == [4, 4]
+    assert coalescer.mean_batch == 4
+
+
+def test_batches_grow_while_busy():
+    release = threading.Event()
+    batches = []
+
+    def translate_batch(texts):
+        batches.append(texts)
+        release.wait(5)
+        return fake_batch(texts)
+
+    coalescer = coalesce.Coalescer(translate_batch, max_delay=0, max_in_flight=1)
+    first = coalescer.submit("first")
+    while not batches:
+        pass
+    futures = [coalescer.submit(str(i)) for i in range(5)]
+    release.set()
+    assert first.result() == "es: first"
+    assert [f.result() for f in futures] == fake_batch([str(i) for i in range(5)])
+    coalescer.close()
+    assert batches == [["first"], [str(i) for i in range(5)]]
+
+
+def test_failed_batch():
+    translate_batch = mock.Mock(side_effect=[ValueError("down"), ["es: a"]])
+    coalescer = coalesce.Coalescer(translate_batch, max_delay=60, max_batch=2)
+    futures = [coalescer.submit("a"), coalescer.submit("b")]
+    for future in futures:
+        with pytest.raises(ValueError, match="down"):
+            future.result()
+    # A response with a different number of texts fails too.
+    futures = [coalescer.submit("a"), coalescer.submit("b")]
+    with pytest.raises(ValueError, match="expected 2 texts"):
+        futures[1].result()
+    coalescer.close()
+
+
+def test_close_sends_pending_and_restarts():
+    coalescer = coalesce.Coalescer(fake_batch, max_delay=60)
+    future = coalescer.submit("late")
+    coalescer.close()
+    assert future.result(timeout=0) == "es: late"
+    again = coalescer.submit("again")
+    coalescer.close()
+    assert again.result(timeout=0) == "es: again"
@@ -0,0 +1,84 @@
+"""Tests for translate_md/concurrency.py. """
+
+import threading
+import time
+
+import pytest
+
+from translate_md import concurrency
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [(None, None), ("", None), ("2", 2.0), ("-1", 0.0), ("soon", None)],
+)
+def test_retry_after(value, expected):
+    assert concurrency.retry_after(value) == expected
+
+
+def test_retry_after_date():
+    assert concurrency.retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+@pytest.mark.parametrize(
+    "kwargs", [{"initial": 0}, {"initial": 8, "max_limit": 4}, {"decrease": 1.0}]
+)
+def test_invalid_limits(kwargs):
+    with pytest.raises(ValueError):
+        concurrency.ConcurrencyLimiter(**kwargs)
+
+
+class TestConcurrencyLimiter:
+    def test_additive_increase(self):
+        limiter = concurrency.ConcurrencyLimiter(initial=2, max_limit=3)
+        for _ in range(10):
+            starts = [limiter.acquire(), limiter.acquire()]
+            for start in starts:
+                limiter.release(start)
+        assert limiter.limit == 3
+        assert limiter.in_flight == 0
+
+    def test_no_increase_below_the_limit(self):
+        limiter = concurrency.ConcurrencyLimiter(initial=2)
+        for _ in range(10):
+            limiter.release(limiter.acquire())
+        assert limiter.limit == 2
+
+    def test_multiplicative_decrease(self):
+        limiter = concurrency.ConcurrencyLimiter(initial=8, min_limit=3)
+        starts = [limiter.acquire() for _ in range(4)]
+        for start in starts:
+            limiter.release(start, overloaded=True)
+        # A single decrease for the requests sent before the first one.
+        assert limiter.limit == 4
+        limiter.release(limiter.acquire(), overloaded=True)
+        assert limiter.limit == 3
+        assert repr(limiter) == "ConcurrencyLimiter(limit=3, in_flight=0)"
+
+    def test_slow_responses_decrease(self):
+        limiter = concurrency.ConcurrencyLimiter(initial=4, target_latency=0.0)
+        limiter.release(limiter.acquire())
+        assert limiter.limit == 2
+
+    def test_pause(self):
+        limiter = concurrency.ConcurrencyLimiter()
+        limiter.release(limiter.acquire(), overloaded=True, pause=0.05)
+        start = time.monotonic()
+        limiter.release(limiter.acquire())
+        assert time.monotonic() - start >= 0.04
+
+    def test_blocks_at_the_limit(self):
+        limiter = concurrency.ConcurrencyLimiter(initial=1)
+        first = limiter.acquire()
+        acquired = threading.Event()
+
+        def second():
+            limiter.release(limiter.acquire())
+            acquired.set()
+
+        thread = threading.Thread(target=second)
+        thread.start()
+        assert not acquired.wait(0.05)
+        limiter.release(first)
+        assert acquired.wait(1)
+        thread.join()
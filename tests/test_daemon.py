@@ -0,0 +1,215 @@
+"""Tests for translate_md/daemon.py and translate_md/daemon_client.py. """
+
+import json
+import os
+import socket
+import stat
+import tempfile
+import threading
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+from translate_md import daemon
+from translate_md.daemon_client import (
+    DaemonClient,
+    client_options,
+    default_socket_path,
+)
+from translate_md.errors import DaemonError
+
+
+@pytest.fixture
+def tree():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        (root / "posts").mkdir()
+        (root / "posts" / "one.md").write_text("First post.\n")
+        (root / "posts" / "two.md").write_text("Second post.\n")
+        yield root
+
+
+@pytest.fixture
+def serving(tree):
+    """A daemon with a mocked client, running in a thread."""
+    client = mock.Mock()
+    server = daemon.Daemon(client, tree / "daemon.sock", options={"workers": 4})
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    assert server.wait_ready(5)
+    yield server, client
+    server.shutdown()
+    thread.join()
+
+
+def test_scheduler_priorities():
+    release, order = threading.Event(), []
+    scheduler = daemon.Scheduler(workers=1)
+    blocker = scheduler.submit(daemon.BULK, release.wait, 5)
+    futures = [
+        scheduler.submit(daemon.BULK, order.append, "bulk 1"),
+        scheduler.submit(daemon.BULK, order.append, "bulk 2"),
+        scheduler.submit(daemon.INTERACTIVE, order.append, "interactive"),
+    ]
+    failing = scheduler.submit(daemon.BULK, int, "not a number")
+    assert scheduler.pending >= 4
+    release.set()
+    scheduler.close()
+    assert blocker.result() is True
+    assert all(f.done() for f in futures)
+    assert order == ["interactive", "bulk 1", "bulk 2"]
+    with pytest.raises(ValueError):
+        failing.result()
+
+
+def test_scheduler_invalid_workers():
+    with pytest.raises(ValueError):
+        daemon.Scheduler(workers=0)
+
+
+def test_not_running(tree):
+    assert not DaemonClient(tree / "missing.sock").is_running()
+
+
+def test_ping_and_shutdown(tree):
+    server = daemon.Daemon(mock.Mock(), tree / "daemon.sock")
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    assert server.wait_ready(5)
+    remote = DaemonClient(tree / "daemon.sock")
+    assert remote.is_running()
+    assert remote.request({"command": "ping"})["pending"] == 0
+    assert "unknown command" in remote.request({"command": "nope"})["error"]
+    remote.shutdown()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert not (tree / "daemon.sock").exists()
+
+
+def test_socket_private(serving):
+    server, _ = serving
+    assert stat.S_IMODE(server.socket_path.stat().st_mode) == 0o600
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        b"[]",
+        b'"x"',
+        b"null",
+        b"not json",
+        b'{"command": "translate"}',
+        b'{"command": "translate", "cwd": "/", "paths": "posts"}',
+        b'{"command": "translate", "cwd": "/", "paths": [1]}',
+    ],
+)
+def test_invalid_request(serving, line):
+    server, client = serving
+    with socket.socket(socket.AF_UNIX) as sock:
+        sock.settimeout(5)
+        sock.connect(str(server.socket_path))
+        with sock.makefile("rwb") as f:
+            f.write(line + b"\n")
+            f.flush()
+            answer = json.loads(f.readline())
+    assert answer["error"].startswith("invalid request")
+    assert DaemonClient(server.socket_path).is_running()
+    client.translate_file.assert_not_called()
+
+
+def test_default_socket_path(tree, monkeypatch):
+    monkeypatch.delenv("TRANSLATE_MD_SOCKET", raising=False)
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tree))
+    assert default_socket_path() == tree / "translate-md.sock"
+
+    monkeypatch.delenv("XDG_RUNTIME_DIR")
+    monkeypatch.setattr(tempfile, "gettempdir", lambda: str(tree))
+    path = default_socket_path()
+    assert path.parent == tree / f"translate-md-{os.getuid()}"
+    assert stat.S_IMODE(path.parent.stat().st_mode) == 0o700
+    assert default_socket_path() == path
+
+    monkeypatch.setenv("TRANSLATE_MD_SOCKET", str(tree / "other.sock"))
+    assert default_socket_path() == tree / "other.sock"
+
+
+def test_default_socket_path_unsafe(tree, monkeypatch):
+    monkeypatch.delenv("TRANSLATE_MD_SOCKET", raising=False)
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    monkeypatch.setattr(tempfile, "gettempdir", lambda: str(tree))
+    directory = tree / f"translate-md-{os.getuid()}"
+    directory.mkdir(mode=0o755)
+    directory.chmod(0o755)
+    with pytest.raises(DaemonError, match="unsafe directory"):
+        default_socket_path()
+    with pytest.raises(DaemonError):
+        daemon.Daemon(mock.Mock())
+
+    directory.rmdir()
+    directory.symlink_to(tree)
+    with pytest.raises(DaemonError, match="unsafe directory"):
+        DaemonClient()
+
+
+def test_translate_single_file(serving, tree, monkeypatch):
+    server, client = serving
+    monkeypatch.chdir(tree)
+    remote = DaemonClient(server.socket_path)
+    events = list(remote.translate([Path("posts/one.md")], incremental=True))
+    client.translate_file.assert_called_once_with(
+        tree / "posts" / "one.md", new_filename=None, incremental=True, stream=False
+    )
+    assert events[0]["file"] == str(tree / "posts" / "one.md")
+    assert {k: events[1][k] for k in ("done", "files", "skipped", "failed")} == {
+        "done": True, "files": 1, "skipped": 0, "failed": 0
+    }
+
+
+def test_translate_tree(serving, tree):
+    server, client = serving
+    (tree / "posts" / "two.es.md").write_text("Segundo post.\n")
+    client.translate_file.side_effect = [ValueError("down"), None, None]
+    remote = DaemonClient(server.socket_path)
+    *files, done = remote.translate([tree], options={"workers": 4})
+    assert len(files) == 1 and files[0]["error"] == "ValueError('down')"
+    assert (done["files"], done["skipped"], done["failed"]) == (0, 1, 1)
+
+    *files, done = remote.translate([tree], force=True)
+    assert client.translate_file.call_count == 3
+
+
+def test_translate_other_options_rejected(serving, tree):
+    server, client = serving
+    remote = DaemonClient(server.socket_path)
+    with pytest.raises(DaemonError, match="configured as"):
+        list(remote.translate([tree], options={"workers": 8}))
+    with pytest.raises(DaemonError, match="require a single file"):
+        list(remote.translate([tree], stream=True))
+    client.translate_file.assert_not_called()
+
+
+def test_already_running(serving):
+    server, _ = serving
+    with pytest.raises(DaemonError, match="already listening"):
+        daemon.Daemon(mock.Mock(), server.socket_path).serve_forever()
+
+
+def test_stale_socket_replaced(tree):
+    path = tree / "daemon.sock"
+    stale = socket.socket(socket.AF_UNIX)
+    stale.bind(str(path))
+    stale.close()
+    server = daemon.Daemon(mock.Mock(), path)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    assert server.wait_ready(5)
+    assert DaemonClient(path).is_running()
+    server.shutdown()
+    thread.join()
+
+
+def test_client_options(tree):
+    options = client_options(["u"], 4, None, False, "gzip", False, Path("cache"))
+    assert options["post"] is True
+    assert Path(options["parse_cache"]).is_absolute()
@@ -0,0 +1,95 @@
+"""Tests for translate_md/dedup.py. """
+
+import threading
+
+import pytest
+
+from translate_md import dedup
+from translate_md.errors import TranslationError
+
+
+def upper(texts):
+    return [t.upper() for t in texts]
+
+
+class TestDeduplicator:
+    def test_translate(self):
+        sent = []
+        deduplicator = dedup.Deduplicator()
+        translate = lambda texts: sent.extend(texts) or upper(texts)  # noqa: E731
+        assert deduplicator.translate(["a", "b", "a"], translate) == ["A", "B", "A"]
+        assert deduplicator.translate(["b", "c"], translate) == ["B", "C"]
+        assert sent == ["a", "b", "c"]
+        assert (deduplicator.total, deduplicator.unique) == (5, 3)
+        assert deduplicator.ratio == 5 / 3
+        assert repr(deduplicator) == "Deduplicator(total=5, unique=3)"
+
+    def test_ratio_empty(self):
+        assert dedup.Deduplicator().ratio == 1.0
+
+    def test_error_index_and_retry(self):
+        def fail(texts):
+            raise TranslationError(1, "failed")
+
+        deduplicator = dedup.Deduplicator()
+        with pytest.raises(TranslationError) as excinfo:
+            deduplicator.translate(["a", "a", "b"], fail)
+        assert excinfo.value.index == 2
+        # The failed pieces can be sent again.
+        assert deduplicator.translate(["b"], upper) == ["B"]
+
+    def test_waits_for_other_threads(self):
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def slow(texts):
+            calls.append(texts)
+            started.set()
+            release.wait()
+            return upper(texts)
+
+        deduplicator = dedup.Deduplicator()
+        results = {}
+        first = threading.Thread(
+            target=lambda: results.update(first=deduplicator.translate(["a"], slow))
+        )
+        first.start()
+        started.wait()
+        second = threading.Thread(
+            target=lambda: results.update(second=deduplicator.translate(["a", "b"], slow))
+        )
+        second.start()
+        release.set()
+        first.join()
+        second.join()
+        assert results == {"first": ["A"], "second": ["A", "B"]}
+        assert calls == [["a"], ["b"]]
+
+    def test_failure_in_other_thread(self):
+        started, release = threading.Event(), threading.Event()
+
+        def fail(texts):
+            started.set()
+            release.wait()
+            raise ConnectionError("down")
+
+        deduplicator = dedup.Deduplicator()
+        first = threading.Thread(target=lambda: pytest.raises(
+            ConnectionError, deduplicator.translate, ["a"], fail
+        ))
+        first.start()
+        started.wait()
+        errors = []
+
+        def second():
+            try:
+                deduplicator.translate(["b", "a"], upper)
+            except TranslationError as exc:
+                errors.append(exc.index)
+
+        thread = threading.Thread(target=second)
+        thread.start()
+        release.set()
+        first.join()
+        thread.join()
+        assert errors == [1]
@@ -0,0 +1,57 @@
+"""Tests for translate_md/endpoints.py. """
+
+import pytest
+
+from translate_md import endpoints
+
+
+def test_no_urls():
+    with pytest.raises(ValueError):
+        endpoints.EndpointPool([])
+
+
+def test_least_outstanding():
+    pool = endpoints.EndpointPool(["http://a/", "http://b/", "http://a/"])
+    assert pool.urls == ["http://a/", "http://b/"]
+    first, second, third = pool.acquire(), pool.acquire(), pool.acquire()
+    assert (first.url, second.url, third.url) == ("http://a/", "http://b/", "http://a/")
+    pool.release(second, ok=True)
+    assert pool.acquire().url == "http://b/"
+    assert repr(pool) == "EndpointPool(['http://a/', 'http://b/'])"
+
+
+def test_exclude():
+    pool = endpoints.EndpointPool(["http://a/", "http://b/"])
+    a, b = pool.endpoints
+    assert pool.acquire(exclude=[a]) is b
+    assert pool.acquire(exclude=[a, b]) is a
+
+
+class TestEjection:
+    def test_eject_and_readmit(self, mocker):
+        now = mocker.patch("translate_md.endpoints.monotonic", return_value=100.0)
+        pool = endpoints.EndpointPool(["http://a/", "http://b/"], eject_after=2)
+        a, b = pool.endpoints
+        for _ in range(2):
+            pool.release(pool.acquire(exclude=[b]), ok=False)
+        assert not a.admitted
+        assert all(pool.acquire() is b for _ in range(3))
+
+        # Failures of requests sent before the ejection don't count.
+        pool.report(a, ok=False)
+        assert a.ejections == 1
+
+        now.return_value = 106.0
+        assert a.admitted
+        # On probation, a single failure ejects it again, for longer.
+        pool.release(pool.acquire(exclude=[b]), ok=False)
+        assert a.ejected_until == 116.0
+
+        now.return_value = 117.0
+        pool.release(pool.acquire(exclude=[b]), ok=True)
+        assert (a.admitted, a.failures, a.ejections) == (True, 0, 0)
+
+    def test_all_ejected(self):
+        pool = endpoints.EndpointPool(["http://a/"], eject_after=1)
+        pool.release(pool.acquire(), ok=False)
+        assert pool.acquire() is pool.endpoints[0]
@@ -0,0 +1,53 @@
+"""Startup cost of the CLI, measured with `python -X importtime`. """
+
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = ("requests", "urllib3", "markdown_it", "mdformat", "rich")
+
+
+def import_times(module: str) -> dict[str, int]:
+    """Cumulative import time (microseconds) of every module imported."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_cli_imports_lazily(record_property):
+    times = import_times("translate_md.main")
+    record_property("import_time_us", times["translate_md.main"])
+    heavy = [m for m in times if m.split(".")[0] in HEAVY_MODULES]
+    assert heavy == []
+
+
+@pytest.mark.parametrize("module", ["translate_md.client", "translate_md.main"])
+def test_import_leaves_logging_alone(module):
+    code = f"import logging, {module}; print(len(logging.getLogger().handlers))"
+    proc = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert proc.stdout.strip() == "0"
+
+
+def test_configure_logging_keeps_module_loggers():
+    code = (
+        "from translate_md import client; "
+        "from translate_md.logger import configure_logging; "
+        "configure_logging(); client.logger.info('configured')"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert "| client - configured" in proc.stdout
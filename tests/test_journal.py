@@ -0,0 +1,61 @@
+"""Tests for translate_md/journal.py. """
+
+import json
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from translate_md.journal import Journal
+
+
+@pytest.fixture
+def journal_path():
+    with tempfile.TemporaryDirectory() as tmp:
+        yield Path(tmp) / "journal.jsonl"
+
+
+def test_record_and_resume(journal_path):
+    with Journal(journal_path) as journal:
+        journal.record(Path("post.md"), 0, "Hello.", "Hola.")
+        journal.record(Path("post.md"), 0, "Hello.", "Hola.")  # Not written twice.
+        journal.record(Path("other.md"), 3, "Bye.", "Adiós.")
+        assert journal.get(Path("post.md"), "Hello.") == "Hola."
+        assert journal.get(Path("post.md"), "Bye.") is None
+    lines = journal_path.read_text().splitlines()
+    assert len(lines) == 2
+    assert json.loads(lines[1])["index"] == 3
+
+    journal = Journal(journal_path)
+    assert journal.get(Path("post.md").absolute(), "Hello.") == "Hola."
+    assert journal.pending() == {
+        str(Path("post.md").resolve()): 1,
+        str(Path("other.md").resolve()): 1,
+    }
+    assert repr(journal) == f"Journal({journal_path}, files=2)"
+
+
+def test_finished_files_are_compacted(journal_path):
+    with Journal(journal_path) as journal:
+        journal.record(Path("post.md"), 0, "Hello.", "Hola.")
+        journal.record(Path("other.md"), 0, "Bye.", "Adiós.")
+        journal.finish(Path("post.md"))
+        journal.finish(Path("missing.md"))
+        assert journal.get(Path("post.md"), "Hello.") is None
+    assert len(journal_path.read_text().splitlines()) == 3
+
+    with Journal(journal_path) as journal:
+        assert list(journal.pending().values()) == [1]
+    assert len(journal_path.read_text().splitlines()) == 1
+
+
+def test_truncated_line(journal_path):
+    with Journal(journal_path) as journal:
+        journal.record(Path("post.md"), 0, "Hello.", "Hola.")
+    with open(journal_path, "a") as f:
+        f.write('{"file": "post.md", "ind')
+    with Journal(journal_path) as journal:
+        assert journal.get(Path("post.md"), "Hello.") == "Hola."
+        journal.record(Path("post.md"), 1, "Bye.", "Adiós.")
+    with Journal(journal_path, fsync=True) as journal:
+        assert journal.get(Path("post.md"), "Bye.") == "Adiós."
@@ -0,0 +1,78 @@
+"""Tests for translate_md/main.py, running the CLI in a subprocess."""
+
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from translate_md import main
+
+runner = CliRunner()
+
+
+def run_cli(*args: str, stdin: str = "") -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-m", "translate_md.main", *args],
+        input=stdin,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+@pytest.fixture
+def docs_tree():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        (root / "one.md").write_text("First post.\n\nSecond paragraph.\n")
+        (root / "two.md").write_text("Second post.\n")
+        yield root
+
+
+def test_extract_to_stdout_only_records(docs_tree):
+    proc = run_cli("extract", str(docs_tree))
+    records = [json.loads(line) for line in proc.stdout.splitlines()]
+    assert [r["text"] for r in records] == [
+        "First post.",
+        "Second paragraph.",
+        "Second post.",
+    ]
+    # The logs and the summary go to stderr.
+    assert "3 pieces extracted from 2 files" in proc.stderr
+    assert "| bulk - extracted" in proc.stderr
+
+
+def test_extract_apply_pipeline(docs_tree):
+    extracted = run_cli("extract", str(docs_tree)).stdout
+    translated = "".join(
+        json.dumps({**record, "text": f"es: {record['text']}"}) + "\n"
+        for record in map(json.loads, extracted.splitlines())
+    )
+    proc = run_cli("apply", "-", stdin=translated)
+    assert "2 files written (3 pieces), 0 failed" in proc.stdout
+    assert (docs_tree / "two.es.md").read_text() == "es: Second post.\n"
+
+
+def test_translate_in_daemon_options(docs_tree, mocker):
+    mocker.patch("translate_md.main.configure_logging")
+    in_daemon = mocker.patch("translate_md.main._translate_in_daemon", return_value=True)
+    one = str(docs_tree / "one.md")
+    result = runner.invoke(main.app, [one, "--url", "http://a/", "--url", "http://b/"])
+    assert result.exit_code == 0
+    options = in_daemon.call_args.args[-1]
+    assert (options["url"], options["workers"]) == (["http://a/", "http://b/"], 4)
+
+
+def test_processes_not_sent_to_daemon(docs_tree, mocker):
+    mocker.patch("translate_md.main.configure_logging")
+    in_daemon = mocker.patch("translate_md.main._translate_in_daemon", return_value=True)
+    translate_file = mocker.patch("translate_md.client.SpanglishClient.translate_file")
+    one = str(docs_tree / "one.md")
+    result = runner.invoke(main.app, ["translate", one, "--processes", "2"])
+    assert result.exit_code == 0
+    in_daemon.assert_not_called()
+    translate_file.assert_called_once()
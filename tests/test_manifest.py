@@ -0,0 +1,34 @@
+"""Tests for translate_md/manifest.py. """
+
+import tempfile
+from pathlib import Path
+
+from translate_md import manifest
+
+
+def test_manifest_filename():
+    assert manifest.manifest_filename(Path("posts/post.es.md")) == Path(
+        "posts/.post.es.md.manifest.json"
+    )
+
+
+class TestManifest:
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "manifest.json"
+            m = manifest.Manifest()
+            m.set("hello", "hola")
+            m.save(path)
+            loaded = manifest.Manifest.load(path)
+            assert loaded.get("hello") == "hola"
+            assert loaded.get("world") is None
+            assert repr(loaded) == "Manifest(1)"
+
+    def test_load_missing_or_invalid(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "manifest.json"
+            assert len(manifest.Manifest.load(path)) == 0
+            path.write_text("{not json")
+            assert len(manifest.Manifest.load(path)) == 0
+            path.write_text('{"version": 0, "translations": {}}')
+            assert len(manifest.Manifest.load(path)) == 0
@@ -1,5 +1,7 @@
 """Tests for translate_md/markdown.py. """
 
+import io
+
 import pytest
 from pathlib import Path
 from translate_md import markdown as md
@@ -38,6 +40,13 @@ class TestMarkdownProcessor:
         assert len(mdproc.get_pieces()) == 16
         assert all([isinstance(p, str) and len(p) > 0 for p in mdproc.get_pieces()])
 
+    def test_get_pieces_idempotent(self, mdprocessor):
+        pieces = mdprocessor.get_pieces()
+        positions = list(mdprocessor._positions)
+        assert mdprocessor.get_pieces() == pieces
+        assert mdprocessor._positions == positions
+        assert len(positions) == len(pieces)
+
     def test_update(self, mdprocessor):
         pieces = mdprocessor.get_pieces()
         with pytest.raises(ValueError):
@@ -57,7 +66,7 @@ class TestMarkdownProcessor:
         mdprocessor.update(new_pieces)
  
         out = mdprocessor.render()
-        assert len(out) == 1615
+        assert len(out) == 1735
         assert "hola" in out
 
     def test_write_to(self, mdprocessor):
@@ -69,7 +78,7 @@ class TestMarkdownProcessor:
         with tempfile.TemporaryDirectory() as tmp:
             mdprocessor.write_to(Path(tmp) / "testfile.md")
             assert (Path(tmp) / "testfile.md").is_file()
-            assert len(md.read_file(Path(tmp) / "testfile.md")) == 1615
+            assert len(md.read_file(Path(tmp) / "testfile.md")) == 1735
  
 
 def test_is_front_matter():
@@ -94,3 +103,68 @@ def test_is_comment():
     text = '<!-- ### Related posts\nadd here -->'
     assert md.is_comment(text) is True
     assert md.is_comment(text.replace("<!--", "-")) is False
+
+
+def test_render_sections(mdprocessor):
+    pieces = mdprocessor.get_pieces()
+    sections = list(mdprocessor.iter_sections(4))
+    assert [i for _, _, indices in sections for i in indices] == list(range(len(pieces)))
+    assert all(len(indices) >= 4 for _, _, indices in sections[:-1])
+    mdprocessor.update_pieces([0], ["hola"])
+    rendered = [mdprocessor.render_section(start, end) for start, end, _ in sections]
+    assert "\n\n".join(r for r in rendered if r) + "\n" == mdprocessor.render()
+
+
+class TestProcessorFactory:
+    def test_shares_parser_and_renderer(self):
+        factory = md.ProcessorFactory()
+        first, second = factory.from_file(filename), factory("Some text.\n")
+        assert first.md is second.md is md.md
+        assert first._renderer is second._renderer is md.md_renderer
+        assert second.get_pieces() == ["Some text."]
+
+    def test_custom_parts(self):
+        parser = md.MarkdownIt("zero")
+        clf = md.PieceClassifier(rules={})
+        mdproc = md.ProcessorFactory(parser=parser, classifier=clf)("```code```\n")
+        assert mdproc.md is parser
+        assert mdproc.get_pieces() == ["```code```"]
+
+
+def test_masked_pieces_restored():
+    mdproc = md.MarkdownProcessor(md.read_file(filename), masker=md.Masker())
+    pieces = mdproc.get_pieces()
+    assert sum(len(p) for p in pieces) < mdproc.original_chars
+    assert any("{0}" in p for p in pieces)
+    # Translating the masked pieces as they are gives back the original.
+    mdproc.update(pieces)
+    original = md.MarkdownProcessor(md.read_file(filename))
+    original.get_pieces()
+    assert mdproc.render() == original.render()
+
+
+@pytest.mark.parametrize(
+    "name", ["post-example.md", "a-NER-model-for-command-line-help-messages-part1.en.md"]
+)
+def test_render_round_trip(name):
+    content = md.read_file(Path(__file__).parent / "data" / name)
+    rendered = md.MarkdownProcessor(content).render()
+    reparsed = md.MarkdownProcessor(rendered)
+    assert reparsed.get_pieces() == md.MarkdownProcessor(content).get_pieces()
+    assert reparsed.render() == rendered
+
+
+def test_render_keeps_backslashes():
+    content = '```python\nprint("a\\\\nb")\n```\n\nA path: C:\\Users\\*name*\n'
+    mdproc = md.MarkdownProcessor(content)
+    assert mdproc.render() == content
+    assert len(mdproc.get_pieces()) == 1
+    mdproc.update(["Una ruta:\n\nC:\\Usuarios"])
+    assert mdproc.render().endswith("```\n\nUna ruta:\nC:\\Usuarios\n")
+
+
+def test_render_to_buffer(mdprocessor):
+    mdprocessor.update(["hola"] * len(mdprocessor.get_pieces()))
+    buffer = io.StringIO()
+    mdprocessor.render_to(buffer, block_tokens=5)
+    assert buffer.getvalue() == mdprocessor.render()
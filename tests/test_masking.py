@@ -0,0 +1,54 @@
+"""Tests for translate_md/masking.py. """
+
+import pickle
+
+import pytest
+
+from translate_md import masking
+
+
+@pytest.mark.parametrize(
+    "text, masked, originals",
+    [
+        (
+            "See [the docs](https://example.com/docs) or run `pip install it`.",
+            "See [the docs]{0} or run {1}.",
+            ["(https://example.com/docs)", "`pip install it`"],
+        ),
+        (
+            'A figure ![a cat](/images/cat.png "Cat") here.',
+            "A figure ![a cat]{0} here.",
+            ['(/images/cat.png "Cat")'],
+        ),
+        (
+            "Go to <https://example.com> or https://example.com/page.",
+            "Go to {0} or {1}.",
+            ["<https://example.com>", "https://example.com/page"],
+        ),
+        (
+            "A [link with `some code` inside](https://a.io) ends.",
+            "A [link with {0} inside]{1} ends.",
+            ["`some code`", "(https://a.io)"],
+        ),
+        ("Short `x` spans stay.", "Short `x` spans stay.", []),
+        ("Plain [brackets] and *emphasis*.", "Plain [brackets] and *emphasis*.", []),
+        ("Already has {0} in it `code`.", "Already has {0} in it `code`.", []),
+    ],
+)
+def test_mask(text, masked, originals):
+    assert masking.Masker().mask(text) == (masked, originals)
+    assert masking.restore(masked, originals) == text
+
+
+def test_restore_reordered():
+    assert masking.restore("{1} y {0}", ["`a`", "`b`"]) == "`b` y `a`"
+
+
+def test_restore_lost_placeholder(caplog):
+    assert masking.restore("es: {0} {7}", ["`a`", "`b`"]) == "es: `a` {7}"
+    assert "lost in the translation" in caplog.text
+
+
+def test_picklable():
+    masker = pickle.loads(pickle.dumps(masking.Masker(min_length=10)))
+    assert repr(masker) == "Masker(min_length=10)"
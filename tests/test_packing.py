@@ -0,0 +1,52 @@
+"""Tests for translate_md/packing.py. """
+
+import pytest
+
+from translate_md import packing
+
+
+def test_split_text_short():
+    assert packing.split_text("Short text.", 100) == [("Short text.", "")]
+
+
+def test_split_text_sentences():
+    text = "First sentence. Second one!\nThird sentence?"
+    segments = packing.split_text(text, 30)
+    assert segments == [
+        ("First sentence. Second one!", "\n"),
+        ("Third sentence?", ""),
+    ]
+    assert "".join(s + sep for s, sep in segments) == text
+
+
+def test_split_text_long_sentence():
+    text = "a very long sentence without any stop in the middle"
+    segments = packing.split_text(text, 20)
+    assert all(len(s) <= 20 for s, _ in segments)
+    assert "".join(s + sep for s, sep in segments) == text
+
+
+class TestPackedPieces:
+    def test_invalid_budget(self):
+        with pytest.raises(ValueError):
+            packing.PackedPieces(["text"], 0)
+
+    def test_batches_under_budget(self):
+        pieces = ["a" * 4, "b" * 4, "c" * 4, "d" * 10]
+        packed = packing.PackedPieces(pieces, max_chars=10)
+        assert packed.batches == [["aaaa", "bbbb"], ["cccc"], ["dddddddddd"]]
+        assert [packed.piece_index(i) for i in range(3)] == [0, 2, 3]
+        assert repr(packed) == "PackedPieces(4, 3)"
+
+    def test_empty_first_piece(self):
+        packed = packing.PackedPieces(["", "abcd", ""], max_chars=10)
+        assert packed.batches == [["", "abcd", ""]]
+        assert packed.unpack(packed.batches) == ["", "abcd", ""]
+        assert packing.PackedPieces([""], max_chars=10).batches == [[""]]
+
+    def test_unpack_round_trip(self):
+        pieces = ["One.", "Two. Three.\nFour.", "Five."]
+        packed = packing.PackedPieces(pieces, max_chars=6)
+        assert packed.unpack(packed.batches) == pieces
+        translated = [[s.upper() for s in batch] for batch in packed.batches]
+        assert packed.unpack(translated) == [p.upper() for p in pieces]
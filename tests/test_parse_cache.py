@@ -0,0 +1,130 @@
+"""Tests for translate_md/parse_cache.py. """
+
+import os
+import pickle
+import tempfile
+from pathlib import Path
+
+import pytest
+from markdown_it import MarkdownIt
+
+from translate_md import markdown as md
+from translate_md import parse_cache
+from translate_md.classifier import SHORTCODE, PieceClassifier, default_classifier
+
+DATA = Path(__file__).parent / "data"
+
+
+@pytest.fixture
+def cache():
+    with tempfile.TemporaryDirectory() as tmp:
+        yield parse_cache.ParseCache(Path(tmp) / "parsed")
+
+
+@pytest.mark.parametrize(
+    "name",
+    ["post-example.md", "a-NER-model-for-command-line-help-messages-part1.en.md"],
+)
+def test_encode_round_trip(name):
+    tokens = md.md.parse(md.read_file(DATA / name))
+    assert parse_cache.decode(parse_cache.encode(tokens, [1, 2])) == (tokens, [1, 2])
+
+
+def test_encode_nested_children():
+    tokens = MarkdownIt("commonmark").parse("Some *emphasis* and `code`.\n")
+    assert parse_cache.decode(parse_cache.encode(tokens, []))[0] == tokens
+
+
+def test_fingerprint_changes():
+    fingerprint = parse_cache.parser_fingerprint(md.md, default_classifier)
+    clf = PieceClassifier()
+    assert parse_cache.parser_fingerprint(md.md, clf) == fingerprint
+    clf.register("shortcode", SHORTCODE)
+    assert parse_cache.parser_fingerprint(md.md, clf) != fingerprint
+    parser = MarkdownIt("zero").enable("table")
+    assert parse_cache.parser_fingerprint(parser, default_classifier) != fingerprint
+
+
+def test_fingerprint_computed_once(cache, mocker):
+    fingerprint = mocker.spy(parse_cache, "parser_fingerprint")
+    keys = [cache.key(text, md.md, default_classifier) for text in ("a", "b", "a")]
+    assert keys[0] == keys[2] != keys[1]
+    assert fingerprint.call_count == 1
+    clf = PieceClassifier()
+    cache.key("a", md.md, clf)
+    assert fingerprint.call_count == 2
+
+
+def test_processor_hit(cache, mocker):
+    content = md.read_file(DATA / "post-example.md")
+    first = md.MarkdownProcessor(content, parse_cache=cache)
+    pieces = first.get_pieces()
+    assert (cache.hits, cache.misses, len(cache)) == (0, 1, 1)
+    first.update([f"es: {p}" for p in pieces])
+
+    parse = mocker.spy(md.md, "parse")
+    is_skipped = mocker.spy(default_classifier, "is_skipped")
+    second = md.MarkdownProcessor(content, parse_cache=cache)
+    # The cache keeps the tokens as they were before the update.
+    assert second.get_pieces() == pieces
+    assert cache.hits == 1
+    assert parse.call_count == 0 and is_skipped.call_count == 0
+    second.update([f"es: {p}" for p in pieces])
+    assert second.render() == first.render()
+
+
+def test_processor_other_classifier_misses(cache):
+    content = "Text.\n\n{{< youtube w7Ft2ymGmfc >}}\n"
+    assert md.MarkdownProcessor(content, parse_cache=cache).get_pieces() == [
+        "Text.", "{{< youtube w7Ft2ymGmfc >}}"
+    ]
+    clf = PieceClassifier()
+    clf.register("shortcode", SHORTCODE)
+    mdproc = md.MarkdownProcessor(content, classifier=clf, parse_cache=cache)
+    assert mdproc.get_pieces() == ["Text."]
+    assert (cache.hits, len(cache)) == (0, 2)
+
+
+def test_damaged_entry(cache, caplog):
+    tokens = md.md.parse("Text.\n")
+    cache.set("key", tokens, [1])
+    (cache.directory / f"key{parse_cache.SUFFIX}").write_bytes(b"not zlib")
+    assert cache.get("key") is None
+    assert "damaged" in caplog.text
+    assert len(cache) == 0
+
+
+def test_eviction(cache):
+    tokens = md.md.parse(md.read_file(DATA / "post-example.md"))
+    cache.set("0", tokens, [])
+    entry_size = cache.size
+    cache.max_bytes = int(entry_size * 3.5)
+    for i in range(1, 4):
+        path = cache.directory / f"{i - 1}{parse_cache.SUFFIX}"
+        os.utime(path, (i, i))
+        cache.set(str(i), tokens, [])
+    # Down to 80% of max_bytes, the least recently used first.
+    assert len(cache) == 2
+    assert cache.get("0") is None and cache.get("1") is None
+    assert cache.get("3") is not None
+
+
+def test_overwrite_counted_once(cache, mocker):
+    tokens = md.md.parse(md.read_file(DATA / "post-example.md"))
+    cache.set("0", tokens, [])
+    cache.max_bytes = int(cache.size * 1.5)
+    evict = mocker.spy(cache, "_evict")
+    for _ in range(3):
+        cache.set("0", tokens, [])
+    cache.set("1", md.md.parse("Text.\n"), [])
+    assert evict.call_count == 0
+    assert len(cache) == 2
+
+
+def test_clear_and_pickle(cache):
+    cache.set("key", md.md.parse("Text.\n"), [1])
+    copy = pickle.loads(pickle.dumps(cache))
+    assert copy.get("key") is not None
+    copy.clear()
+    assert len(cache) == 0
+    assert repr(copy).endswith("parsed, hits=1, misses=0)")
@@ -0,0 +1,64 @@
+"""Tests for translate_md/stats.py. """
+
+import json
+
+import pytest
+
+from translate_md import stats
+
+
+def test_histogram():
+    histogram = stats.Histogram((1, 2, 5))
+    for value in (0.5, 1, 1.5, 3, 10):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1, 1]
+    assert (histogram.count, histogram.sum) == (5, 16.0)
+    assert histogram.to_dict()["buckets"] == {"1": 2, "2": 3, "5": 4, "+Inf": 5}
+    assert histogram.quantile(0.5) == 2
+    assert histogram.quantile(1.0) == 5
+    assert stats.Histogram((1,)).quantile(0.5) == 0.0
+
+
+def test_stats():
+    run_stats = stats.Stats()
+    with run_stats.timer("parse"):
+        pass
+    with pytest.raises(RuntimeError), run_stats.timer("parse"):
+        raise RuntimeError
+    run_stats.observe_request(0.02, sent=10, received=20)
+    run_stats.observe_file(12)
+    data = json.loads(run_stats.to_json())
+    assert data["stages"]["parse"]["count"] == 2
+    assert (data["requests"], data["bytes_sent"], data["bytes_received"]) == (1, 10, 20)
+    assert data["latency_seconds"]["count"] == 1
+    assert data["pieces_per_file"]["sum"] == 12
+    assert "parse:" in run_stats.summary()
+    assert repr(run_stats) == "Stats(requests=1)"
+
+
+def test_prometheus():
+    run_stats = stats.Stats()
+    run_stats.add_time("render", 0.5)
+    run_stats.observe_request(0.02, sent=10, received=20)
+    text = run_stats.to_prometheus()
+    assert 'translate_md_stage_seconds_total{stage="render"} 0.5' in text
+    assert "translate_md_bytes_sent_total 10" in text
+    assert 'translate_md_latency_seconds_bucket{le="0.025"} 1' in text
+    assert "translate_md_latency_seconds_count 1" in text
+    assert text.endswith("\n")
+
+
+def test_null_stats():
+    with stats.NULL_STATS.timer("parse"):
+        pass
+    stats.NULL_STATS.add_time("parse", 1.0)
+    stats.NULL_STATS.observe_request(0.02, sent=10, received=20)
+    stats.NULL_STATS.observe_file(12)
+    assert not stats.NULL_STATS.enabled
+    assert stats.NULL_STATS.to_dict()["stages"] == {}
+
+
+def test_timed_call():
+    result, seconds = stats.timed_call(sum, [1, 2])
+    assert result == 3
+    assert seconds >= 0
@@ -0,0 +1,65 @@
+"""Tests for translate_md/transport.py. """
+
+import gzip
+import json
+from unittest import mock
+
+import pytest
+
+from translate_md import transport
+
+
+def _session(*statuses):
+    session = mock.Mock()
+    session.request.side_effect = [mock.Mock(status_code=s) for s in statuses]
+    return session
+
+
+def test_invalid_compression():
+    with pytest.raises(ValueError):
+        transport.Transport("brotli")
+
+
+def test_post_json():
+    session = _session(200)
+    sender = transport.Transport()
+    params = {"texts": json.dumps(["hello"])}
+    assert sender.send(session, "http://spanglish/batched", params, 10).status_code == 200
+    kwargs = session.request.call_args.kwargs
+    assert kwargs["method"] == "POST"
+    assert json.loads(kwargs["data"]) == params
+    assert "Content-Encoding" not in kwargs["headers"]
+    assert repr(sender) == "Transport(POST)"
+
+
+def test_gzip_over_min_size():
+    session = _session(200, 200)
+    sender = transport.Transport("gzip", min_size=100)
+    sender.send(session, "http://spanglish/batched", {"texts": "short"}, 10)
+    assert "Content-Encoding" not in session.request.call_args.kwargs["headers"]
+    params = {"texts": json.dumps(["hello world"] * 20)}
+    sender.send(session, "http://spanglish/batched", params, 10)
+    kwargs = session.request.call_args.kwargs
+    assert kwargs["headers"]["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(kwargs["data"])) == params
+
+
+def test_fall_back():
+    session = _session(415, 405, 200, 200)
+    sender = transport.Transport("gzip", min_size=0)
+    response = sender.send(session, "http://spanglish/batched", {"texts": "[]"}, 10)
+    assert response.status_code == 200
+    methods = [c.kwargs["method"] for c in session.request.call_args_list]
+    assert methods == ["POST", "POST", "GET"]
+    assert sender.mode == ("GET", None)
+    # The next requests go straight to GET.
+    sender.send(session, "http://spanglish/batched", {"texts": "[]"}, 10)
+    assert session.request.call_args.kwargs["params"] == {"texts": "[]"}
+
+
+def test_get_rejected_is_returned():
+    session = _session(405, 400)
+    sender = transport.Transport()
+    response = sender.send(session, "http://spanglish/batched", {"texts": "[]"}, 10)
+    assert response.status_code == 400
+    assert session.request.call_count == 2
@@ -0,0 +1,96 @@
+"""Tests for translate_md/watch.py. """
+
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+from translate_md import watch
+
+
+def _touch(filename: Path, text: str, mtime: int) -> None:
+    filename.write_text(text)
+    os.utime(filename, ns=(mtime, mtime))
+
+
+def test_scan_skips_translations():
+    with tempfile.TemporaryDirectory() as tmp:
+        _touch(Path(tmp) / "post.md", "# Post\n", 1)
+        _touch(Path(tmp) / "post.es.md", "# es: Post\n", 2)
+        assert watch.scan([Path(tmp)]) == {Path(tmp) / "post.md": (1, 7)}
+
+
+def test_start_out_of_date():
+    with tempfile.TemporaryDirectory() as tmp:
+        _touch(Path(tmp) / "new.md", "# New\n", 10**9)
+        _touch(Path(tmp) / "done.md", "# Done\n", 10**9)
+        _touch(Path(tmp) / "done.es.md", "# es: Done\n", 2 * 10**9)
+        watcher = watch.Watcher(mock.Mock(), [Path(tmp)])
+        assert watcher.start() == [Path(tmp) / "new.md"]
+        assert watcher.poll() == []
+
+
+def test_poll_debounced(mocker):
+    now = mocker.patch("translate_md.watch.monotonic", return_value=100.0)
+    with tempfile.TemporaryDirectory() as tmp:
+        post = Path(tmp) / "post.md"
+        _touch(post, "# Post\n", 1)
+        watcher = watch.Watcher(mock.Mock(), [Path(tmp)], debounce=0.3)
+        watcher.start()
+        _touch(post, "# Post\n\nOne.\n", 2)
+        assert watcher.poll() == []
+        # Saved again before the debounce is over.
+        now.return_value = 100.2
+        _touch(post, "# Post\n\nOne. Two.\n", 3)
+        assert watcher.poll() == []
+        now.return_value = 100.4
+        assert watcher.poll() == []
+        now.return_value = 100.6
+        assert watcher.poll() == [post]
+        assert watcher.poll() == []
+
+
+def test_removed_before_debounce(mocker):
+    now = mocker.patch("translate_md.watch.monotonic", return_value=100.0)
+    with tempfile.TemporaryDirectory() as tmp:
+        watcher = watch.Watcher(mock.Mock(), [Path(tmp)])
+        watcher.start()
+        _touch(Path(tmp) / "draft.md", "# Draft\n", 1)
+        assert watcher.poll() == []
+        (Path(tmp) / "draft.md").unlink()
+        now.return_value = 101.0
+        assert watcher.poll() == []
+
+
+def test_translate_failures():
+    client = mock.Mock()
+    client.translate_file.side_effect = [None, ValueError("down"), None]
+    on_translated = mock.Mock()
+    watcher = watch.Watcher(client, [], on_translated=on_translated)
+    files = [Path("a.md"), Path("b.md"), Path("c.md")]
+    assert watcher.translate(files) == 2
+    client.translate_file.assert_called_with(Path("c.md"), incremental=True)
+    assert [c.args[0] for c in on_translated.call_args_list] == [files[0], files[2]]
+
+
+def test_run():
+    translated = threading.Event()
+    client = mock.Mock()
+    client.translate_file.side_effect = lambda *args, **kwargs: translated.set()
+    stop = threading.Event()
+    with tempfile.TemporaryDirectory() as tmp:
+        post = Path(tmp) / "post.md"
+        _touch(post, "# Post\n", 10**9)
+        _touch(Path(tmp) / "post.es.md", "# es: Post\n", 2 * 10**9)
+        watcher = watch.Watcher(client, [Path(tmp)], interval=0.01, debounce=0.0)
+        thread = threading.Thread(target=watcher.run, args=(stop,))
+        thread.start()
+        time.sleep(0.05)
+        assert not translated.is_set()
+        post.write_text("# Post\n\nEdited.\n")
+        assert translated.wait(5)
+        stop.set()
+        thread.join()
+    client.translate_file.assert_called_once_with(post, incremental=True)